@@ -0,0 +1,66 @@
+"""
+Build a Django CACHES entry from a URL, in the spirit of dj_database_url.
+
+    locmem://[name]             per-process memory (the default; not shared between workers)
+    file:///var/tmp/django      FileBasedCache in a directory shared by the workers
+    db://[table]                DatabaseCache table (create it with `manage.py createcachetable`)
+    redis://host:6379/0         RedisCache (rediss:// for TLS; needs the redis package)
+    dummy://                    no caching
+
+Query parameters become OPTIONS (numbers converted), e.g.
+file:///var/tmp/django?MAX_ENTRIES=5000, except `timeout`, which sets the
+default TIMEOUT in seconds.
+"""
+import os
+from urllib.parse import parse_qsl, urlsplit
+from django.core.exceptions import ImproperlyConfigured
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'rediss': 'django.core.cache.backends.redis.RedisCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def _option(value):
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def parse(url, key_prefix='', version=1):
+    """The CACHES entry for a cache URL"""
+    parts = urlsplit(url)
+    if parts.scheme not in BACKENDS:
+        raise ImproperlyConfigured(f"Unsupported cache URL scheme '{parts.scheme}' (expected one of: {', '.join(BACKENDS)})")
+
+    config = {
+        'BACKEND': BACKENDS[parts.scheme],
+        'KEY_PREFIX': key_prefix,
+        'VERSION': version,
+    }
+
+    if parts.scheme == 'locmem':
+        config['LOCATION'] = parts.netloc or 'unique-snowflake'
+    elif parts.scheme == 'file':
+        config['LOCATION'] = parts.netloc + parts.path
+    elif parts.scheme == 'db':
+        config['LOCATION'] = parts.netloc or parts.path.lstrip('/') or 'django_cache'
+    elif parts.scheme in ('redis', 'rediss'):
+        config['LOCATION'] = f"{parts.scheme}://{parts.netloc}{parts.path}"
+
+    options = dict(parse_qsl(parts.query))
+    if 'timeout' in options:
+        config['TIMEOUT'] = _option(options.pop('timeout'))
+    if options:
+        config['OPTIONS'] = {key: _option(value) for key, value in options.items()}
+    return config
+
+
+def config(env='CACHE_URL', default='locmem://', key_prefix='', version=1):
+    """The CACHES entry for the URL in an environment variable"""
+    return parse(os.environ.get(env, default), key_prefix=key_prefix, version=version)
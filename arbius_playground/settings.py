@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 import dj_database_url
+from . import cache_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -131,14 +132,45 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-# Cache configuration for rate limiting
+# Cache used for rate limiting and gallery caching. The per-process default
+# is not shared between gunicorn workers; set CACHE_URL to a file, db or
+# redis URL in production (see arbius_playground/cache_url.py). Bump
+# CACHE_VERSION to retire every cached entry, e.g. after model changes.
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-    }
+    'default': cache_url.config(
+        default='locmem://unique-snowflake',
+        key_prefix=os.environ.get('CACHE_KEY_PREFIX', 'arbius'),
+        version=int(os.environ.get('CACHE_VERSION', '1')),
+    )
 }
 
+# Cached gallery pages expire after this long even if the gallery generation is not bumped
+GALLERY_CACHE_SECONDS = int(os.environ.get('GALLERY_CACHE_SECONDS', '120'))
+
+# Blockchain scanning
+ARBITRUM_RPC_URL = os.environ.get('ARBITRUM_RPC_URL', 'https://arb1.arbitrum.io/rpc')
+RPC_BATCH_SIZE = int(os.environ.get('RPC_BATCH_SIZE', '50'))  # Calls per JSON-RPC batch request
+RPC_BATCH_WINDOW = int(os.environ.get('RPC_BATCH_WINDOW', '500'))  # Blocks fetched per scan chunk
+LOG_CHUNK_SIZE = int(os.environ.get('LOG_CHUNK_SIZE', '5000'))  # Initial eth_getLogs block range
+LOG_MAX_CHUNK_SIZE = int(os.environ.get('LOG_MAX_CHUNK_SIZE', '100000'))  # Upper bound for adaptive growth
+SCAN_LEASE_SECONDS = int(os.environ.get('SCAN_LEASE_SECONDS', '600'))  # Expiry of a scan's ScanStatus lease
+ARBIUS_ENGINE_ADDRESS = os.environ.get('ARBIUS_ENGINE_ADDRESS', '0x5FbDB2315678afecb367f032d93F642f64180aa3')
+TASK_CACHE_SIZE = int(os.environ.get('TASK_CACHE_SIZE', '10000'))  # Recent tasks kept in memory for solution lookups
+
+# Gallery keyword chips show keywords trending over this many days (0 = all time)
+POPULAR_KEYWORDS_DAYS = int(os.environ.get('POPULAR_KEYWORDS_DAYS', '0'))
+
+# IPFS gateways tried by the accessibility checker, fastest first (comma-separated)
+IPFS_GATEWAYS = [
+    url.strip() for url in os.environ.get(
+        'IPFS_GATEWAYS',
+        'https://ipfs.io/ipfs/,https://cloudflare-ipfs.com/ipfs/,https://gateway.pinata.cloud/ipfs/',
+    ).split(',') if url.strip()
+]
+IPFS_RECHECK_SUCCESS_SECONDS = int(os.environ.get('IPFS_RECHECK_SUCCESS_SECONDS', str(7 * 24 * 3600)))  # Recheck interval for accessible images
+IPFS_RECHECK_BASE_SECONDS = int(os.environ.get('IPFS_RECHECK_BASE_SECONDS', '600'))  # First retry after a failed check, doubled per failure
+IPFS_RECHECK_MAX_SECONDS = int(os.environ.get('IPFS_RECHECK_MAX_SECONDS', str(7 * 24 * 3600)))  # Upper bound for the retry backoff
+
 # Security settings for production
 if not DEBUG:
     SECURE_BROWSER_XSS_FILTER = True
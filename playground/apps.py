@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def install_search_index(sender, using, **kwargs):
+    """Restore the SQLite prompt search index after migrations that rebuilt the image table"""
+    from django.db import connections
+    from .search import install_sqlite_fts
+
+    install_sqlite_fts(connections[using])
 
 
 class PlaygroundConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'playground'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects the MinerAddress receivers)
+        post_migrate.connect(install_search_index, sender=self)
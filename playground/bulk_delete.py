@@ -0,0 +1,76 @@
+"""
+Chunked deletion for the maintenance commands.
+
+delete_in_batches() walks a queryset in primary key order and deletes a
+bounded batch at a time, each in its own transaction, so no statement
+locks the whole table and nothing is collected in memory beyond one
+batch. Each batch goes through QuerySet.delete(): Django's collector
+loads only the batch's own rows and issues cascades to child tables
+without delete signals or children of their own as one DELETE ... IN
+per table, while anything else is collected so its handlers still run.
+count_deletions() gives the same per-model totals with COUNT queries
+only, for --dry-run.
+"""
+import logging
+import time
+from collections import Counter
+from django.db import transaction
+from django.db.models import CASCADE, DO_NOTHING
+from .bulk_import import ImportProgress
+
+logger = logging.getLogger(__name__)
+
+
+def _child_relations(model):
+    # Reverse foreign keys whose rows go along with a deleted row
+    return [relation for relation in model._meta.related_objects if relation.on_delete is not DO_NOTHING]
+
+
+def delete_in_batches(queryset, batch_size=1000, pause=0.0, on_batch=None, write=None):
+    """
+    Delete the rows of `queryset` and their cascades in primary key batches.
+
+    Each batch is one transaction; `on_batch`, if given, is called with
+    the batch's primary keys inside it before anything is deleted (to
+    note which dashboard days change, say). Sleeps `pause` seconds
+    between batches. Returns {model: rows deleted}.
+    """
+    model = queryset.model
+    progress = ImportProgress(f'Deleted {model._meta.verbose_name_plural}', write or (lambda line: None), every=batch_size * 10)
+    deleted = Counter()
+    last_pk = None
+
+    while True:
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        pks = list(batch.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        last_pk = pks[-1]
+
+        with transaction.atomic():
+            if on_batch:
+                on_batch(pks)
+            _, counts = model._base_manager.filter(pk__in=pks).delete()
+            for label, count in counts.items():
+                deleted[model._meta.apps.get_model(label)] += count
+        progress.advance(len(pks))
+
+        if pause and len(pks) == batch_size:
+            time.sleep(pause)
+
+    progress.finish()
+    return {model: count for model, count in deleted.items() if count}
+
+
+def count_deletions(queryset):
+    """{model: rows} that delete_in_batches(queryset) would remove, counted with subqueries"""
+    counts = {queryset.model: queryset.count()}
+    for relation in _child_relations(queryset.model):
+        if relation.on_delete is not CASCADE:
+            continue
+        children = relation.related_model._base_manager.filter(**{f'{relation.field.name}__in': queryset.values('pk')})
+        for model, count in count_deletions(children).items():
+            counts[model] = counts.get(model, 0) + count
+    return counts
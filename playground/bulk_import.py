@@ -0,0 +1,459 @@
+"""
+Shared plumbing for the bulk import commands.
+
+Sources are streamed (server-side cursors on PostgreSQL, fetchmany on
+SQLite, an incremental parser for JSON fixtures), rows become unsaved
+model instances with model_from_row(), and insert_batch() writes them
+with one bulk_create per batch. Bulk inserts bypass save() and signals,
+so commands call refresh_derived_data() once they are done.
+"""
+import functools
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import timezone as dt_timezone
+from urllib.parse import urlsplit
+import psycopg2
+import requests
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .daily_stats import rebuild_daily_stats
+from .gallery_cache import bump_gallery_generation
+from .keywords import rebuild_keyword_index
+from .miners import sync_automine_flags
+from .models import ArbiusImage, ImageComment, ImageReaction, ImageUpvote, MinerAddress, UserProfile
+
+logger = logging.getLogger(__name__)
+
+_cursor_names = itertools.count()
+
+
+class SourceDatabase:
+    """
+    Read-only connection to the database an import reads from.
+
+    Accepts a PostgreSQL URL or an SQLite file as a path or sqlite:/// URL
+    (the same forms as DATABASE_URL). Queries use %s placeholders on both.
+    """
+
+    def __init__(self, url, itersize=2000):
+        self.itersize = itersize
+        parts = urlsplit(url)
+        if parts.scheme in ('postgres', 'postgresql'):
+            self.vendor = 'postgresql'
+            self.connection = psycopg2.connect(url)
+            self.connection.set_session(readonly=True)
+        elif parts.scheme in ('sqlite', ''):
+            # sqlite:////abs/path.db and sqlite:///relative.db, as in dj_database_url
+            path = parts.path[1:] if parts.scheme else url
+            self.vendor = 'sqlite'
+            self.connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        else:
+            raise ValueError(f"Unsupported source database URL scheme '{parts.scheme}'")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def stream(self, sql, params=()):
+        """Yield the rows of a query as dicts, holding at most `itersize` rows in memory"""
+        if self.vendor == 'postgresql':
+            # A named cursor keeps the result set on the server and fetches itersize rows per round trip
+            with self.connection.cursor(name=f'bulk_import_{next(_cursor_names)}') as cursor:
+                cursor.itersize = self.itersize
+                cursor.execute(sql, params)
+                columns = None
+                for row in cursor:
+                    if columns is None:
+                        columns = [column.name for column in cursor.description]
+                    yield dict(zip(columns, row))
+            return
+
+        cursor = self.connection.execute(sql.replace('%s', '?'), params)
+        columns = [column[0] for column in cursor.description]
+        while True:
+            rows = cursor.fetchmany(self.itersize)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(zip(columns, row))
+
+    def count(self, table):
+        """Number of rows in a source table"""
+        return next(self.stream(f'SELECT COUNT(*) AS count FROM {table}'))['count']
+
+
+def batched(iterable, size):
+    """Split an iterable into lists of at most `size` items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _clean(field, value):
+    if isinstance(field, models.DateTimeField):
+        if isinstance(value, str):
+            value = parse_datetime(value)
+        # SQLite sources store UTC without an offset
+        if value is not None and timezone.is_naive(value):
+            value = timezone.make_aware(value, dt_timezone.utc)
+    elif isinstance(field, models.JSONField) and isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = {}
+    return value
+
+
+@functools.lru_cache(maxsize=None)
+def _row_fields(model, columns):
+    # The concrete, non-key model fields among a source query's columns
+    fields = []
+    for column in columns:
+        try:
+            field = model._meta.get_field(column)
+        except FieldDoesNotExist:
+            continue
+        if field.concrete and not field.primary_key:
+            fields.append((column, field))
+    return fields
+
+
+def model_from_row(model, row, **fallbacks):
+    """
+    An unsaved `model` instance from a source row dict.
+
+    Columns that aren't fields of the model are ignored. Missing values
+    (None) take the matching keyword fallback (a value or a callable) or,
+    for non-null fields, the field default. Dates given as text are parsed
+    and made aware, JSON given as text is decoded.
+    """
+    values = {}
+    for column, field in _row_fields(model, tuple(row)):
+        value = row[column]
+        if value is None:
+            fallback = fallbacks.get(column)
+            if fallback is not None:
+                value = fallback() if callable(fallback) else fallback
+            elif not field.null and field.has_default():
+                value = field.get_default()
+        values[field.attname] = _clean(field, value)
+    return model(**values)
+
+
+def insert_batch(model, objects, match_fields=None):
+    """
+    Insert a batch of unsaved instances in one transaction; returns the number sent.
+
+    Rows that collide with a unique constraint are skipped by the database.
+    For models without one, `match_fields` names the fields that identify
+    a row: objects matching an existing row (or an earlier object in the
+    batch) on all of them are dropped first, with one query.
+    """
+    if match_fields:
+        first = match_fields[0]
+        existing = set(model.objects.filter(**{
+            f'{first}__in': {getattr(obj, first) for obj in objects}
+        }).values_list(*match_fields))
+        unique = []
+        for obj in objects:
+            identity = tuple(getattr(obj, name) for name in match_fields)
+            if identity not in existing:
+                existing.add(identity)
+                unique.append(obj)
+        objects = unique
+
+    with transaction.atomic():
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+    return len(objects)
+
+
+def _is_unique(model, fields):
+    if len(fields) == 1:
+        return model._meta.get_field(fields[0]).unique
+    names = {model._meta.get_field(name).name for name in fields}
+    return any(set(together) == names for together in model._meta.unique_together)
+
+
+def upsert_batch(model, objects, unique_fields, update_fields):
+    """
+    Insert or update a batch of unsaved instances in one transaction; returns the number sent.
+
+    Objects are matched to existing rows on `unique_fields`, and matches
+    get their `update_fields` overwritten. With a unique constraint on
+    those fields this is one INSERT ... ON CONFLICT DO UPDATE; otherwise
+    (ImageComment) the matches are looked up with one query and written
+    with bulk_update. Later objects in the batch win over earlier ones.
+    """
+    latest = {}
+    for obj in objects:
+        latest[tuple(getattr(obj, name) for name in unique_fields)] = obj
+    objects = list(latest.values())
+
+    with transaction.atomic():
+        if _is_unique(model, unique_fields):
+            model.objects.bulk_create(
+                objects, update_conflicts=True, unique_fields=unique_fields, update_fields=update_fields,
+            )
+            return len(objects)
+
+        first = unique_fields[0]
+        existing = {
+            tuple(row[:-1]): row[-1]
+            for row in model.objects.filter(**{
+                f'{first}__in': {getattr(obj, first) for obj in objects}
+            }).values_list(*unique_fields, 'pk')
+        }
+        matched = []
+        created = []
+        for obj in objects:
+            pk = existing.get(tuple(getattr(obj, name) for name in unique_fields))
+            if pk is None:
+                created.append(obj)
+            else:
+                obj.pk = pk
+                matched.append(obj)
+        model.objects.bulk_create(created)
+        model.objects.bulk_update(matched, update_fields)
+    return len(objects)
+
+
+class ImportProgress:
+    """Row counts and rows/sec for a long import step, reported through `write` every `every` rows"""
+
+    def __init__(self, label, write, total=None, every=10000):
+        self.label = label
+        self.write = write
+        self.total = total
+        self.every = every
+        self.rows = 0
+        self.started = time.monotonic()
+        self._next_report = every
+
+    @property
+    def rate(self):
+        return self.rows / max(time.monotonic() - self.started, 1e-9)
+
+    def _status(self):
+        of_total = f'/{self.total}' if self.total is not None else ''
+        return f'{self.label}: {self.rows}{of_total} rows ({self.rate:.0f} rows/sec)'
+
+    def advance(self, rows):
+        self.rows += rows
+        if self.rows >= self._next_report:
+            self.write(f'   {self._status()}')
+            self._next_report = self.rows + self.every
+
+    def finish(self):
+        """Report and log the final count; returns the number of rows"""
+        status = f'{self._status()} in {time.monotonic() - self.started:.1f}s'
+        self.write(f'   {status}')
+        logger.info(status)
+        return self.rows
+
+
+def download_to_file(url, write=None, chunk_size=1 << 20, timeout=60):
+    """
+    Download a URL to a temporary file in chunks and return its path.
+
+    The caller removes the file. `write`, if given, gets a line per 10 MB.
+    """
+    with requests.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        fd, path = tempfile.mkstemp(suffix=os.path.splitext(urlsplit(url).path)[1])
+        try:
+            written = 0
+            reported = 0
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    written += len(chunk)
+                    if write and written - reported >= 10 << 20:
+                        write(f'   Downloaded {written / (1 << 20):.0f} MB')
+                        reported = written
+        except BaseException:
+            os.remove(path)
+            raise
+    return path
+
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """
+    Yield the items of a top-level JSON array from a text file one at a time.
+
+    Reads `chunk_size` characters at a time and decodes each item with
+    raw_decode as soon as it is complete, so memory holds one chunk and
+    one item rather than the whole document.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and separators between items
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError('Expected a JSON array')
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield item
+                pos = end
+                continue
+        elif eof:
+            raise ValueError('Unexpected end of JSON array')
+
+        # Need more input: drop what has been consumed and read the next chunk
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+class FixtureLoader:
+    """
+    Bulk loader for Django JSON fixtures of the gallery models.
+
+    Objects are collected per model and inserted with insert_batch() every
+    `batch_size` objects. Rows are matched on their unique keys
+    (transaction_hash, wallet_address, one vote or reaction per wallet),
+    so loading the same fixture twice adds nothing. Votes, comments and
+    reactions point at the fixture's image pks, which are mapped to local
+    ids by transaction hash; those whose image has not been loaded yet
+    wait until it has. Objects of other models are counted and skipped.
+    """
+
+    MODELS = {model._meta.model_name: model for model in (MinerAddress, ArbiusImage, UserProfile, ImageUpvote, ImageComment, ImageReaction)}
+    RELATED = (ImageUpvote, ImageComment, ImageReaction)
+    # ImageComment has no unique constraint to skip duplicates on
+    MATCH_FIELDS = {ImageComment: ('image_id', 'wallet_address', 'content')}
+
+    def __init__(self, batch_size=1000, write=None):
+        self.batch_size = batch_size
+        self.write = write or (lambda line: None)
+        self.pending = {model: [] for model in self.MODELS.values()}
+        self.image_ids = {}
+        self.waiting = []
+        self.loaded = {model: 0 for model in self.MODELS.values()}
+        self.skipped = {}
+        self.progress = ImportProgress('Fixture objects', self.write)
+
+    def add(self, obj):
+        """Queue one fixture object ({'model': ..., 'pk': ..., 'fields': {...}})"""
+        self.progress.advance(1)
+        # Match on the model name, so fixtures dumped under the old `gallery` app label load too
+        model = self.MODELS.get(obj['model'].rsplit('.', 1)[-1])
+        if model is None:
+            self.skipped[obj['model']] = self.skipped.get(obj['model'], 0) + 1
+            return
+
+        self.pending[model].append(obj)
+        if len(self.pending[model]) >= self.batch_size:
+            self.flush(model)
+
+    def flush(self, model):
+        batch, self.pending[model] = self.pending[model], []
+        if not batch:
+            return
+        if model in self.RELATED:
+            # Their images may still be queued
+            self.flush(ArbiusImage)
+            self._insert_related(model, batch)
+        elif model is ArbiusImage:
+            self._insert_images(batch)
+        else:
+            insert_batch(model, [model_from_row(model, obj['fields']) for obj in batch])
+            self.loaded[model] += len(batch)
+
+    def _insert_images(self, batch):
+        insert_batch(ArbiusImage, [model_from_row(ArbiusImage, obj['fields']) for obj in batch])
+        local_ids = dict(ArbiusImage.objects.filter(
+            transaction_hash__in=[obj['fields']['transaction_hash'] for obj in batch]
+        ).values_list('transaction_hash', 'id'))
+        for obj in batch:
+            self.image_ids[obj['pk']] = local_ids.get(obj['fields']['transaction_hash'])
+        self.loaded[ArbiusImage] += len(batch)
+
+    def _insert_related(self, model, batch, final=False):
+        """Insert objects whose image is known; returns the number left unresolved"""
+        objects = []
+        unresolved = 0
+        for obj in batch:
+            image_id = self.image_ids.get(obj['fields']['image'])
+            if image_id is None:
+                unresolved += 1
+                if not final:
+                    self.waiting.append((model, obj))
+                continue
+            objects.append(model_from_row(model, {**obj['fields'], 'image': image_id}))
+        if objects:
+            insert_batch(model, objects, match_fields=self.MATCH_FIELDS.get(model))
+            self.loaded[model] += len(objects)
+        return unresolved
+
+    def finish(self):
+        """Flush every queued object; returns {model: objects loaded}"""
+        for model in self.MODELS.values():
+            self.flush(model)
+
+        # Objects that came before their image in the fixture
+        waiting, self.waiting = self.waiting, []
+        orphans = 0
+        for model in self.RELATED:
+            for batch in batched((obj for waiting_model, obj in waiting if waiting_model is model), self.batch_size):
+                orphans += self._insert_related(model, batch, final=True)
+        if orphans:
+            self.write(f'   Skipped {orphans} votes, comments and reactions of images missing from the fixture')
+        for label, count in self.skipped.items():
+            self.write(f'   Skipped {count} {label} objects (not a gallery model)')
+
+        self.progress.finish()
+        return self.loaded
+
+
+def load_fixture(path, batch_size=1000, write=None):
+    """Stream a JSON fixture file into the gallery tables; returns {model: objects loaded}"""
+    loader = FixtureLoader(batch_size=batch_size, write=write)
+    with open(path, encoding='utf-8') as f:
+        for obj in iter_json_array(f):
+            loader.add(obj)
+    return loader.finish()
+
+
+def refresh_derived_data():
+    """
+    Recompute what bulk-inserted rows bypass: automine flags, engagement
+    counters, the keyword index and dashboard rollup, and cached gallery pages.
+    """
+    sync_automine_flags()
+    ArbiusImage.rebuild_counters()
+    rebuild_keyword_index()
+    rebuild_daily_stats()
+    bump_gallery_generation()
@@ -0,0 +1,146 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import Lower, TruncDate
+from django.utils import timezone
+from .hll import HyperLogLog
+from .models import GALLERY_MODEL_IDS, ArbiusImage, DailyImageStats
+
+logger = logging.getLogger(__name__)
+
+# Placeholder solution provider of images whose solver is unknown
+NULL_ADDRESS = '0x' + '0' * 40
+
+# Rollup sketch name -> the ArbiusImage address field it counts
+ADDRESS_FIELDS = {'submitter': 'task_submitter', 'provider': 'solution_provider'}
+
+
+def stats_images():
+    """The images the dashboard counts: accessible images of the gallery models, automine included"""
+    return ArbiusImage.objects.filter(is_accessible=True, model_id__in=GALLERY_MODEL_IDS)
+
+
+def day_start(day):
+    """The aware datetime at which a local day begins"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _day_ranges(days):
+    # Consecutive days merge into one timestamp range, so a refresh stays on the timestamp index
+    ranges = []
+    for day in sorted(days):
+        if ranges and ranges[-1][1] == day:
+            ranges[-1][1] = day + timedelta(days=1)
+        else:
+            ranges.append([day, day + timedelta(days=1)])
+    return ranges
+
+
+def _with_address(images, address):
+    return images.exclude(Q(**{f'{address}__isnull': True}) | Q(**{f'{address}__in': ['', NULL_ADDRESS]}))
+
+
+def _compute(images):
+    # Images per day and model, then each day's distinct submitters and providers,
+    # which give the exact daily counts and the day's HyperLogLog sketches
+    stats = {}
+    per_model = images.annotate(day=TruncDate('timestamp')).values('day', 'model_id').annotate(count=Count('id'))
+    for row in per_model:
+        rollup = stats.setdefault(row['day'], DailyImageStats(day=row['day'], model_counts={}))
+        rollup.model_counts[row['model_id']] = row['count']
+        rollup.image_count += row['count']
+
+    for field, address in ADDRESS_FIELDS.items():
+        addresses = defaultdict(set)
+        known = _with_address(images, address)
+        for day, value in known.annotate(day=TruncDate('timestamp')).values_list('day', address).distinct():
+            addresses[day].add(value.lower())
+        for day, values in addresses.items():
+            setattr(stats[day], f'{field}_count', len(values))
+            setattr(stats[day], f'{field}_sketch', HyperLogLog().update(values).to_bytes())
+    return stats
+
+
+def refresh_daily_stats(days):
+    """
+    Recompute the rollup rows of the given days from the image table.
+
+    Each day is counted in full, so new images, accessibility changes and
+    deletions are all picked up exactly; days left without images lose
+    their row. Returns the number of rows written.
+    """
+    days = {day.date() if isinstance(day, datetime) else day for day in days}
+    if not days:
+        return 0
+
+    in_days = Q()
+    for first, end in _day_ranges(days):
+        in_days |= Q(timestamp__gte=day_start(first), timestamp__lt=day_start(end))
+    stats = _compute(stats_images().filter(in_days))
+
+    with transaction.atomic():
+        DailyImageStats.objects.filter(day__in=days).delete()
+        DailyImageStats.objects.bulk_create([stats[day] for day in sorted(stats)])
+    return len(stats)
+
+
+def refresh_image_days(images):
+    """Recompute the rollup rows of the days the given images fall on"""
+    return refresh_daily_stats(timezone.localdate(image.timestamp) for image in images)
+
+
+def rebuild_daily_stats(days=None):
+    """
+    Recompute the rollup from the image table, for the last `days` days
+    (today included) or for all of history. Returns the number of rows written.
+    """
+    if days is not None:
+        today = timezone.localdate()
+        return refresh_daily_stats(today - timedelta(days=offset) for offset in range(days))
+
+    stats = _compute(stats_images())
+    with transaction.atomic():
+        DailyImageStats.objects.all().delete()
+        DailyImageStats.objects.bulk_create([stats[day] for day in sorted(stats)], batch_size=500)
+
+    logger.info(f"Rebuilt daily image stats: {len(stats)} days")
+    return len(stats)
+
+
+def images_since(since, rollups):
+    """
+    Images from `since` until now: whole days from the rollup rows plus
+    one bounded count over the partial day `since` falls in.
+
+    `rollups` maps days to DailyImageStats rows.
+    """
+    first_day = timezone.localdate(since)
+    next_day = first_day + timedelta(days=1)
+    partial = stats_images().filter(timestamp__gte=since, timestamp__lt=day_start(next_day)).count()
+    return partial + sum(rollup.image_count for day, rollup in rollups.items() if day >= next_day)
+
+
+def distinct_addresses(rollups, field='submitter', since=None):
+    """
+    Approximate distinct submitters (or providers, with field='provider')
+    over the rollup rows, all of them or those from the day `since` falls on.
+
+    Merges the rows' HyperLogLog sketches, so the cost depends on the
+    number of days, not images.
+    """
+    first_day = timezone.localdate(since) if since else None
+    return HyperLogLog.union(
+        getattr(rollup, f'{field}_sketch')
+        for day, rollup in rollups.items()
+        if first_day is None or day >= first_day
+    ).count()
+
+
+def exact_distinct_addresses(field='submitter', since=None):
+    """The exact count distinct_addresses() approximates, counted from the image table"""
+    images = _with_address(stats_images(), ADDRESS_FIELDS[field])
+    if since:
+        images = images.filter(timestamp__gte=day_start(timezone.localdate(since)))
+    return images.annotate(address=Lower(ADDRESS_FIELDS[field])).values('address').distinct().count()
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+from collections import namedtuple
+from eth_abi import decode as abi_decode
+from eth_abi.exceptions import DecodingError
+from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+# Engine functions the scanner understands, as (name, argument types, argument names)
+ENGINE_FUNCTIONS = [
+    ('submitSolution', ('bytes32', 'bytes'), ('taskid', 'cid')),
+    ('signalCommitment', ('bytes32',), ('commitment',)),
+    ('submitTask', ('uint8', 'address', 'bytes32', 'uint256', 'bytes'), ('version', 'owner', 'model', 'fee', 'input')),
+]
+
+EngineFunction = namedtuple('EngineFunction', ['name', 'selector', 'types', 'fields'])
+DecodedCall = namedtuple('DecodedCall', ['name', 'args'])
+
+
+def _build_selector_table(functions):
+    """Map '0x'-prefixed 4-byte selectors to their EngineFunction"""
+    table = {}
+    for name, types, fields in functions:
+        signature = f"{name}({','.join(types)})"
+        selector = Web3.keccak(text=signature)[:4].hex()
+        table[selector] = EngineFunction(name, selector, types, fields)
+    return table
+
+
+# Built once at import; decoding never parses an ABI per transaction
+SELECTOR_TABLE = _build_selector_table(ENGINE_FUNCTIONS)
+SELECTORS = {function.name: function.selector for function in SELECTOR_TABLE.values()}
+
+# str.startswith accepts a tuple, so one call rejects a transaction against every selector
+_SELECTOR_PREFIXES = tuple(SELECTOR_TABLE)
+
+_BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+
+def base58_encode(data):
+    """Encode bytes with the Bitcoin base58 alphabet used by IPFS CIDv0"""
+    number = int.from_bytes(data, 'big')
+    encoded = ''
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = _BASE58_ALPHABET[remainder] + encoded
+
+    # Leading zero bytes are kept as leading '1's
+    padding = len(data) - len(data.lstrip(b'\0'))
+    return '1' * padding + encoded
+
+
+def cid_to_string(cid):
+    """Render CID bytes from calldata: sha2-256 multihashes as 'Qm...', anything else as hex"""
+    if len(cid) == 34 and cid[:2] == b'\x12\x20':
+        return base58_encode(cid)
+    return '0x' + cid.hex()
+
+
+def _varint(value):
+    encoded = bytearray()
+    while value > 0x7f:
+        encoded.append((value & 0x7f) | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def ipfs_cid_v0(data):
+    """
+    CIDv0 that `ipfs add` gives `data` as a single-chunk file.
+
+    The bytes are wrapped in a UnixFS file node inside a dag-pb node and
+    hashed with sha2-256, which is how the engine derives task input CIDs.
+    """
+    content = b'\x12' + _varint(len(data)) + data if data else b''
+    unixfs = b'\x08\x02' + content + b'\x18' + _varint(len(data))
+    node = b'\x0a' + _varint(len(unixfs)) + unixfs
+    return base58_encode(b'\x12\x20' + hashlib.sha256(node).digest())
+
+
+def decode_input_parameters(data):
+    """Decode a task's JSON input bytes, returning None when they are not a JSON object"""
+    try:
+        parameters = json.loads(data.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError):
+        return None
+    return parameters if isinstance(parameters, dict) else None
+
+
+def _normalize_arg(value, abi_type):
+    if abi_type == 'bytes32':
+        return '0x' + value.hex()
+    if abi_type == 'address':
+        return Web3.to_checksum_address(value)
+    return value
+
+
+def decode_call(data):
+    """
+    Decode engine calldata into a DecodedCall, or None for any other function.
+
+    bytes32 arguments come back as '0x' hex strings and addresses checksummed,
+    like the transaction senders from playground.rpc;
+    dynamic bytes (solution CIDs, task inputs) are left as raw bytes.
+    """
+    if not data or not data.startswith(_SELECTOR_PREFIXES):
+        return None
+
+    function = SELECTOR_TABLE[data[:10]]
+    try:
+        values = abi_decode(function.types, bytes.fromhex(data[10:]))
+    except (DecodingError, ValueError) as e:
+        logger.debug(f"Could not decode {function.name} calldata: {e}")
+        return None
+
+    return DecodedCall(function.name, {
+        field: _normalize_arg(value, abi_type)
+        for field, abi_type, value in zip(function.fields, function.types, values)
+    })
+
+
+def decode_engine_calls(transactions, contract_address, names=None):
+    """
+    Decode the engine calls among a block's transactions.
+
+    Returns (tx, DecodedCall) pairs for transactions sent to contract_address
+    whose function is in `names` (all known functions by default). Every
+    transaction is first checked with a single startswith against the selector
+    table, so the bulk of a block is rejected without allocating anything;
+    only the survivors have their recipient compared and calldata decoded.
+    """
+    contract_address = contract_address.lower()
+    prefixes = _SELECTOR_PREFIXES if names is None else tuple(SELECTORS[name] for name in names)
+
+    calls = []
+    for tx in transactions:
+        data = tx['input']
+        if not data.startswith(prefixes):
+            continue
+        to = tx['to']
+        if not to or to.lower() != contract_address:
+            continue
+
+        call = decode_call(data)
+        if call is not None:
+            calls.append((tx, call))
+    return calls
@@ -0,0 +1,46 @@
+import hashlib
+import json
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Counter embedded in every gallery cache key; bumping it retires all cached pages at once
+GENERATION_KEY = 'gallery:generation'
+
+
+def gallery_generation():
+    """The current gallery generation"""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Seeded from the clock, so an evicted counter never comes back as an old generation
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+        generation = cache.get(GENERATION_KEY, 0)
+    return generation
+
+
+def bump_gallery_generation():
+    """Invalidate every cached gallery page"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        gallery_generation()
+
+
+def bump_gallery_generation_on_commit():
+    """Invalidate cached gallery pages once the current transaction commits"""
+    transaction.on_commit(bump_gallery_generation)
+
+
+def cached_gallery_page(view, filters, build):
+    """
+    Return the cached result of build() for a view and normalized filter tuple.
+
+    Entries hold only data that is the same for every visitor; per-user
+    state such as upvotes is added after the lookup. They expire after
+    GALLERY_CACHE_SECONDS or when the generation is bumped, whichever is
+    first.
+    """
+    digest = hashlib.md5(json.dumps(filters, default=str).encode()).hexdigest()
+    key = f"gallery:{view}:{gallery_generation()}:{digest}"
+    return cache.get_or_set(key, build, settings.GALLERY_CACHE_SECONDS)
@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .daily_stats import refresh_image_days
+from .gallery_cache import bump_gallery_generation_on_commit
+from .keywords import is_indexed, reindex_images
+from .models import ArbiusImage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IPFS_GATEWAYS = [
+    'https://ipfs.io/ipfs/',
+    'https://cloudflare-ipfs.com/ipfs/',
+    'https://gateway.pinata.cloud/ipfs/',
+]
+
+
+def due_images(queryset=None, now=None):
+    """Images whose next accessibility check is due, most overdue first"""
+    queryset = ArbiusImage.objects.all() if queryset is None else queryset
+    return queryset.filter(next_check_at__lte=now or timezone.now()).order_by('next_check_at')
+
+
+def ipfs_path(image):
+    """Path of an image below /ipfs/, e.g. '<cid>/out-1.png'"""
+    if '/ipfs/' in image.image_url:
+        return image.image_url.split('/ipfs/', 1)[1]
+    return f"{image.cid}/out-1.png"
+
+
+class GatewayStats:
+    """Exponentially weighted latency of one gateway; failures count as a full timeout"""
+
+    def __init__(self, url, alpha=0.3):
+        self.url = url
+        self.alpha = alpha
+        self.latency = None
+        self.successes = 0
+        self.failures = 0
+
+    def record(self, seconds, ok):
+        if ok:
+            self.successes += 1
+        else:
+            self.failures += 1
+        self.latency = seconds if self.latency is None else self.alpha * seconds + (1 - self.alpha) * self.latency
+
+    def __repr__(self):
+        latency = 'n/a' if self.latency is None else f"{self.latency * 1000:.0f}ms"
+        return f"{self.url} ({latency}, {self.successes} ok, {self.failures} failed)"
+
+
+class IPFSChecker:
+    """
+    Concurrent IPFS accessibility checker with gateway failover.
+
+    Images are checked from a thread pool sharing one pooled requests
+    session. Each check tries the gateways fastest first, by their running
+    latency, and moves on to the next one on an error, timeout or non-200
+    answer; an image is only inaccessible when every gateway fails.
+
+    Every check also schedules the next one: accessible images come back
+    after a long fixed interval, and each consecutive failure doubles the
+    wait from the base interval up to a cap, so dead CIDs stop being
+    retried every run.
+    """
+
+    def __init__(self, gateways=None, max_workers=16, timeout=5, session=None):
+        self.success_interval = timedelta(seconds=getattr(settings, 'IPFS_RECHECK_SUCCESS_SECONDS', 7 * 24 * 3600))
+        self.retry_base = timedelta(seconds=getattr(settings, 'IPFS_RECHECK_BASE_SECONDS', 600))
+        self.retry_max = timedelta(seconds=getattr(settings, 'IPFS_RECHECK_MAX_SECONDS', 7 * 24 * 3600))
+
+        gateways = gateways or getattr(settings, 'IPFS_GATEWAYS', DEFAULT_IPFS_GATEWAYS)
+        self.gateways = [GatewayStats(url.rstrip('/') + '/') for url in gateways]
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.gateways), pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def ranked_gateways(self):
+        """Gateways ordered by running latency; ones not tried yet go first, in configured order"""
+        with self._lock:
+            return sorted(self.gateways, key=lambda gateway: -1 if gateway.latency is None else gateway.latency)
+
+    def retry_delay(self, failures):
+        """Wait before the next check after `failures` consecutive failed checks"""
+        # Cap the exponent too, so a long-dead image cannot overflow timedelta
+        return min(self.retry_base * 2 ** min(max(failures - 1, 0), 32), self.retry_max)
+
+    def schedule(self, image, accessible, now):
+        """Set the image's check result and when it is due again"""
+        image.is_accessible = accessible
+        image.last_checked = now
+        if accessible:
+            image.check_failures = 0
+            image.next_check_at = now + self.success_interval
+        else:
+            image.check_failures += 1
+            image.next_check_at = now + self.retry_delay(image.check_failures)
+
+    def _record(self, gateway, seconds, ok):
+        with self._lock:
+            gateway.record(seconds, ok)
+
+    def check(self, path):
+        """Return the base URL of the first gateway serving `path`, or None"""
+        for gateway in self.ranked_gateways():
+            started = time.monotonic()
+            try:
+                response = self.session.head(gateway.url + path, timeout=self.timeout, allow_redirects=True)
+                ok = response.status_code == 200
+            except requests.RequestException as e:
+                logger.debug(f"{gateway.url} failed for {path}: {e}")
+                ok = False
+
+            self._record(gateway, time.monotonic() - started if ok else self.timeout, ok)
+            if ok:
+                return gateway.url
+        return None
+
+    def check_images(self, images):
+        """
+        Check a batch of images concurrently and save the results.
+
+        Saves is_accessible, last_checked, the next check time and, for
+        accessible images, the gateway that served them, in one bulk_update,
+        and moves images whose accessibility flipped in or out of the
+        keyword index. Returns the number of accessible images.
+        """
+        images = list(images)
+        if not images:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self.check, [ipfs_path(image) for image in images]))
+
+        now = timezone.now()
+        was_accessible = [image.is_accessible for image in images]
+        was_indexed = [is_indexed(image) for image in images]
+        for image, gateway in zip(images, results):
+            self.schedule(image, gateway is not None, now)
+            if gateway:
+                image.ipfs_gateway = gateway
+
+        with transaction.atomic():
+            ArbiusImage.objects.bulk_update(
+                images,
+                ['is_accessible', 'last_checked', 'ipfs_gateway', 'next_check_at', 'check_failures'],
+                batch_size=500,
+            )
+            # Images appearing in or dropping out of the gallery invalidate its cached pages, their days' stats
+            # and their prompt keywords
+            changed = [image for image, before in zip(images, was_accessible) if image.is_accessible != before]
+            if changed:
+                reindex_images(images, was_indexed)
+                refresh_image_days(changed)
+                bump_gallery_generation_on_commit()
+        return sum(1 for gateway in results if gateway)
@@ -0,0 +1,304 @@
+import logging
+import re
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import GALLERY_MODEL_IDS, ArbiusImage, DailyKeywordCount, PromptKeyword
+
+logger = logging.getLogger(__name__)
+
+# Keywords longer than the PromptKeyword column are skipped rather than truncated
+MAX_KEYWORD_LENGTH = 64
+
+# The suffix some clients append to every prompt
+ADDITIONAL_INSTRUCTION = re.compile(r'additional instruction:[^.]*\.?', re.IGNORECASE)
+
+CAPITALIZED_WORD = re.compile(r'\b[A-Z][a-z]+\b')  # Proper nouns like "Pikachu"
+UNDERSCORE_WORD = re.compile(r'\b[a-z]+_[a-z]+\b')  # Tags like "blue_hair"
+LONG_WORD = re.compile(r'\b[a-z]{4,}\b')
+
+# Subjects that always count as keywords, even when they are also stop words
+SUBJECT_PATTERN = re.compile(r'\b(' + '|'.join([
+    # Characters
+    'pikachu', 'charizard', 'bulbasaur', 'squirtle', 'misty', 'ash', 'goku', 'naruto', 'sasuke', 'link',
+    'zelda', 'mario', 'luigi', 'peach', 'bowser',
+    # Fantasy
+    'dragon', 'phoenix', 'unicorn', 'griffin', 'wizard', 'witch', 'knight', 'princess', 'prince', 'queen', 'king',
+    # Machines
+    'robot', 'cyborg', 'android', 'mecha', 'gundam', 'evangelion', 'transformers',
+    # Animals
+    'cat', 'dog', 'wolf', 'fox', 'bear', 'tiger', 'lion', 'elephant', 'giraffe', 'penguin', 'owl', 'eagle',
+    # Places
+    'castle', 'tower', 'bridge', 'forest', 'mountain', 'ocean', 'desert', 'jungle', 'space', 'planet', 'star',
+    'moon', 'sun',
+    # Weapons and magic
+    'sword', 'shield', 'bow', 'arrow', 'gun', 'laser', 'lightsaber', 'magic', 'spell', 'fire', 'ice',
+    'lightning', 'thunder',
+    # Vehicles
+    'car', 'bike', 'plane', 'ship', 'spaceship', 'rocket', 'train', 'bus', 'helicopter',
+    # Plants
+    'flower', 'tree', 'grass', 'leaf', 'rose', 'tulip', 'sunflower', 'cherry', 'apple', 'orange', 'banana',
+]) + r')\b')
+
+# Common words that are never keywords on their own
+STOP_WORDS = frozenset({
+    'about', 'above', 'across', 'add', 'after', 'again', 'against', 'air', 'all', 'almost', 'along',
+    'also', 'always', 'america', 'and', 'animal', 'another', 'answer', 'any', 'are', 'area',
+    'around', 'ask', 'away', 'back', 'because', 'become', 'been', 'before', 'began', 'begin',
+    'being', 'below', 'best', 'better', 'between', 'big', 'birds', 'black', 'body', 'book', 'both',
+    'boy', 'but', 'call', 'came', 'can', 'car', 'carry', 'certain', 'change', 'children', 'city',
+    'close', 'cold', 'color', 'come', 'complete', 'could', 'country', 'covered', 'cried', 'cut',
+    'day', 'did', 'didn', 'different', 'do', 'does', 'dog', 'don', 'door', 'down', 'draw', 'during',
+    'each', 'early', 'earth', 'easy', 'eat', 'end', 'enough', 'even', 'ever', 'every', 'example',
+    'eye', 'face', 'fall', 'family', 'far', 'farm', 'fast', 'father', 'feet', 'few', 'field',
+    'figure', 'find', 'fire', 'first', 'fish', 'five', 'follow', 'food', 'for', 'form', 'found',
+    'four', 'friends', 'from', 'get', 'girl', 'give', 'go', 'good', 'got', 'great', 'ground',
+    'group', 'grow', 'had', 'hand', 'happened', 'hard', 'has', 'have', 'head', 'hear', 'heard',
+    'help', 'her', 'here', 'high', 'him', 'himself', 'his', 'hold', 'home', 'horse', 'hours',
+    'house', 'how', 'however', 'hundred', 'i', 'idea', 'if', 'important', 'indian', 'into', 'it',
+    'its', 'just', 'keep', 'kind', 'king', 'knew', 'know', 'land', 'large', 'last', 'late', 'learn',
+    'leave', 'left', 'let', 'letter', 'life', 'light', 'like', 'line', 'list', 'listen', 'little',
+    'live', 'long', 'low', 'made', 'make', 'man', 'many', 'map', 'mark', 'may', 'me', 'mean',
+    'measure', 'men', 'might', 'mile', 'miss', 'money', 'more', 'morning', 'most', 'mother',
+    'mountain', 'move', 'much', 'music', 'must', 'my', 'name', 'near', 'need', 'never', 'new',
+    'next', 'night', 'no', 'north', 'not', 'notice', 'now', 'numeral', 'off', 'often', 'old',
+    'once', 'one', 'only', 'open', 'order', 'other', 'our', 'out', 'over', 'own', 'page', 'paper',
+    'part', 'passed', 'pattern', 'people', 'picture', 'piece', 'place', 'plan', 'plant', 'play',
+    'point', 'problem', 'products', 'pulled', 'put', 'questions', 'reached', 'read', 'real', 'red',
+    'remember', 'right', 'river', 'rock', 'room', 'run', 'said', 'same', 'saw', 'say', 'school',
+    'sea', 'second', 'seem', 'seen', 'sentence', 'set', 'several', 'she', 'ship', 'short', 'should',
+    'show', 'side', 'since', 'sing', 'slowly', 'small', 'so', 'some', 'something', 'sometimes',
+    'song', 'soon', 'sound', 'south', 'space', 'spell', 'stand', 'start', 'state', 'step', 'still',
+    'stop', 'story', 'study', 'such', 'sun', 'sure', 'table', 'take', 'talk', 'tell', 'than',
+    'that', 'the', 'their', 'them', 'then', 'there', 'these', 'they', 'thing', 'think', 'this',
+    'those', 'thought', 'three', 'through', 'time', 'today', 'together', 'told', 'too', 'took',
+    'top', 'toward', 'town', 'travel', 'tree', 'true', 'try', 'turn', 'two', 'under', 'unit',
+    'until', 'up', 'upon', 'us', 'use', 'usually', 'very', 'voice', 'vowel', 'walk', 'want', 'war',
+    'was', 'watch', 'waves', 'way', 'well', 'went', 'what', 'when', 'where', 'which', 'while',
+    'white', 'who', 'whole', 'why', 'will', 'wind', 'with', 'without', 'wood', 'work', 'world',
+    'would', 'year', 'you', 'young', 'your'
+})
+
+
+def extract_keywords(prompt):
+    """The set of keywords in a prompt, lowercased"""
+    if not prompt:
+        return set()
+    
+    prompt = ADDITIONAL_INSTRUCTION.sub('', prompt)
+    clean_prompt = prompt.lower()
+    
+    keywords = {word.lower() for word in CAPITALIZED_WORD.findall(prompt)}
+    keywords.update(UNDERSCORE_WORD.findall(clean_prompt))
+    keywords.update(LONG_WORD.findall(clean_prompt))
+    keywords -= STOP_WORDS
+    keywords.update(SUBJECT_PATTERN.findall(clean_prompt))
+    return {keyword for keyword in keywords if 3 <= len(keyword) <= MAX_KEYWORD_LENGTH}
+
+
+def gallery_keyword_images(queryset=None):
+    """Images the keyword index covers: accessible gallery-model images with a prompt, excluding automine"""
+    queryset = ArbiusImage.objects.all() if queryset is None else queryset
+    return queryset.filter(
+        is_accessible=True,
+        is_automine=False,
+        model_id__in=GALLERY_MODEL_IDS,
+        prompt__isnull=False,
+    ).exclude(prompt='')
+
+
+class KeywordTally:
+    """
+    In-memory keyword counts for a batch of images.
+    
+    Each image counts once per distinct keyword in its prompt, both in the
+    all-time totals and in the day it was generated. apply() adds the
+    tallies to PromptKeyword and DailyKeywordCount with one insert for new
+    keywords and one F() update per distinct increment, instead of a row
+    write per keyword. A tally with sign=-1 subtracts instead, for images
+    leaving the gallery.
+    """
+    
+    def __init__(self, sign=1):
+        self.sign = sign
+        self.totals = Counter()
+        self.daily = defaultdict(Counter)
+    
+    def __bool__(self):
+        return bool(self.totals)
+    
+    def record(self, prompt, timestamp):
+        """Count the keywords of one image generated at timestamp"""
+        keywords = extract_keywords(prompt)
+        self.totals.update(keywords)
+        self.daily[timezone.localdate(timestamp)].update(keywords)
+    
+    def _increment(self, queryset, counts, **fields):
+        known = set(queryset.filter(keyword__in=list(counts)).values_list('keyword', flat=True))
+        
+        if self.sign > 0:
+            queryset.model.objects.bulk_create([
+                queryset.model(keyword=keyword, image_count=count, **fields)
+                for keyword, count in counts.items()
+                if keyword not in known
+            ], batch_size=500, ignore_conflicts=True)
+        
+        by_increment = defaultdict(list)
+        for keyword in known:
+            by_increment[counts[keyword]].append(keyword)
+        for increment, keywords in by_increment.items():
+            if self.sign > 0:
+                queryset.filter(keyword__in=keywords).update(image_count=F('image_count') + increment)
+            else:
+                # Never below zero, even if the index had drifted from the images
+                queryset.filter(keyword__in=keywords).update(image_count=Greatest(F('image_count') - increment, 0))
+    
+    def apply(self):
+        """Add the tallies to the keyword index, or subtract them with sign=-1"""
+        if not self:
+            return
+        
+        with transaction.atomic():
+            self._increment(PromptKeyword.objects.all(), self.totals)
+            for day, counts in self.daily.items():
+                self._increment(DailyKeywordCount.objects.filter(day=day), counts, day=day)
+
+
+# Fields is_indexed() and KeywordTally.record() read; load them with .only(*KEYWORD_FIELDS)
+KEYWORD_FIELDS = ('pk', 'prompt', 'timestamp', 'is_accessible', 'is_automine', 'model_id')
+
+
+def is_indexed(image):
+    """Whether gallery_keyword_images() would select an image, judged from its loaded fields"""
+    return bool(image.prompt) and image.is_accessible and not image.is_automine and image.model_id in GALLERY_MODEL_IDS
+
+
+def _tally_images(images, sign):
+    tally = KeywordTally(sign)
+    counted = 0
+    for image in images:
+        if is_indexed(image):
+            tally.record(image.prompt, image.timestamp)
+            counted += 1
+    tally.apply()
+    return counted
+
+
+def index_images(images):
+    """
+    Add newly stored images to the keyword index and return how many were counted.
+    
+    Only images that gallery_keyword_images() would select are counted.
+    """
+    return _tally_images(images, 1)
+
+
+def unindex_images(images):
+    """
+    Take images out of the keyword index and return how many were uncounted.
+    
+    Pass the images as they were while still in the gallery, i.e. before
+    they are flagged automine, marked inaccessible or deleted; images that
+    were not counted are skipped.
+    """
+    return _tally_images(images, -1)
+
+
+def unindex_image_ids(pks):
+    """Take the images with primary keys `pks` out of the keyword index before they are deleted"""
+    return unindex_images(gallery_keyword_images().filter(pk__in=pks).only(*KEYWORD_FIELDS).iterator())
+
+
+def reindex_images(images, was_indexed):
+    """
+    Move images whose gallery membership changed in or out of the keyword index.
+    
+    `was_indexed` holds is_indexed() of each image before its fields
+    changed. Returns (added, removed).
+    """
+    joined, left = [], []
+    for image, before in zip(images, was_indexed):
+        after = is_indexed(image)
+        if after and not before:
+            joined.append(image)
+        elif before and not after:
+            left.append(image)
+    
+    tally = KeywordTally()
+    for image in joined:
+        tally.record(image.prompt, image.timestamp)
+    tally.apply()
+    # left are no longer is_indexed() themselves, so they are tallied directly
+    tally = KeywordTally(-1)
+    for image in left:
+        tally.record(image.prompt, image.timestamp)
+    tally.apply()
+    return len(joined), len(left)
+
+
+def rebuild_keyword_index(batch_size=1000):
+    """
+    Recount the keyword index from scratch over gallery_keyword_images().
+    
+    Prompts are read in primary key batches and tallied in memory, then both
+    tables are replaced in one transaction. Returns (images, keywords).
+    """
+    images = gallery_keyword_images().order_by('pk').only('pk', 'prompt', 'timestamp')
+    tally = KeywordTally()
+    counted = 0
+    last_pk = 0
+    
+    while True:
+        batch = list(images.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        for image in batch:
+            tally.record(image.prompt, image.timestamp)
+        counted += len(batch)
+        last_pk = batch[-1].pk
+    
+    with transaction.atomic():
+        PromptKeyword.objects.all().delete()
+        DailyKeywordCount.objects.all().delete()
+        PromptKeyword.objects.bulk_create([
+            PromptKeyword(keyword=keyword, image_count=count)
+            for keyword, count in tally.totals.items()
+        ], batch_size=batch_size)
+        DailyKeywordCount.objects.bulk_create([
+            DailyKeywordCount(day=day, keyword=keyword, image_count=count)
+            for day, counts in tally.daily.items()
+            for keyword, count in counts.items()
+        ], batch_size=batch_size)
+    
+    logger.info(f"Rebuilt keyword index: {len(tally.totals)} keywords from {counted} images")
+    return counted, len(tally.totals)
+
+
+def prune_daily_counts(keep_days):
+    """Delete daily keyword counts older than keep_days; returns the number of rows removed"""
+    cutoff = timezone.localdate() - timedelta(days=keep_days)
+    deleted, _ = DailyKeywordCount.objects.filter(day__lt=cutoff).delete()
+    return deleted
+
+
+def top_keywords(limit=20, days=None, min_count=2):
+    """
+    The most common keywords, most frequent first.
+    
+    With days, only images generated in the last `days` days (today
+    included) are counted, giving trending rather than all-time keywords.
+    Keywords seen fewer than min_count times are left out.
+    """
+    if days:
+        since = timezone.localdate() - timedelta(days=days - 1)
+        keywords = DailyKeywordCount.objects.filter(day__gte=since).values('keyword').annotate(
+            count=Sum('image_count')
+        ).filter(count__gte=min_count).order_by('-count', 'keyword').values_list('keyword', flat=True)
+    else:
+        keywords = PromptKeyword.objects.filter(image_count__gte=min_count).order_by(
+            '-image_count', 'keyword'
+        ).values_list('keyword', flat=True)
+    return list(keywords[:limit])
@@ -0,0 +1,115 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from playground.ipfs import IPFSChecker, due_images
+from playground.models import ArbiusImage
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Check IPFS accessibility of gallery images that are due for a recheck, across the configured gateways'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Number of images loaded and checked per batch (default: 200)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=16,
+            help='Number of concurrent checks (default: 16)'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=5,
+            help='Seconds to wait for each gateway before failing over to the next (default: 5)'
+        )
+        parser.add_argument(
+            '--gateway',
+            action='append',
+            dest='gateways',
+            help='IPFS gateway base URL, e.g. https://ipfs.io/ipfs/ (repeatable; default: IPFS_GATEWAYS setting)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Check every image in primary key order, whether or not it is due'
+        )
+        parser.add_argument(
+            '--only-inaccessible',
+            action='store_true',
+            help='Only check images currently marked as not accessible'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Stop after checking this many images (default: 1000 due images, unlimited with --all)'
+        )
+        parser.add_argument(
+            '--quiet',
+            action='store_true',
+            help='Suppress output (for scheduled runs)'
+        )
+
+    def handle(self, *args, **options):
+        checker = IPFSChecker(
+            gateways=options['gateways'],
+            max_workers=options['workers'],
+            timeout=options['timeout'],
+        )
+
+        images = ArbiusImage.objects.all()
+        if options['only_inaccessible']:
+            images = images.filter(is_accessible=False)
+
+        limit = options['limit']
+        if options['all']:
+            images = images.order_by('pk')
+            description = 'images'
+        else:
+            # Checked images are rescheduled into the future, so this drains the due queue
+            images = due_images(images, now=timezone.now())
+            limit = 1000 if limit is None else limit
+            description = 'due images'
+
+        if not options['quiet']:
+            total = images.count() if limit is None else min(images.count(), limit)
+            self.stdout.write(f"🔍 Checking {total} {description} across {len(checker.gateways)} gateways...")
+
+        started = time.monotonic()
+        checked = accessible = 0
+        last_pk = 0
+        batch_size = options['batch_size']
+
+        while limit is None or checked < limit:
+            size = batch_size if limit is None else min(batch_size, limit - checked)
+            if options['all']:
+                # Walk the table by primary key so each batch is one indexed range query
+                batch = list(images.filter(pk__gt=last_pk)[:size])
+            else:
+                batch = list(images[:size])
+            if not batch:
+                break
+
+            accessible += checker.check_images(batch)
+            checked += len(batch)
+            last_pk = batch[-1].pk
+
+            if not options['quiet']:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"   • {checked} checked, {accessible} accessible ({checked / elapsed:.1f} images/sec)")
+
+        summary = f'{accessible} of {checked} images accessible in {time.monotonic() - started:.1f}s'
+        if not options['quiet']:
+            self.stdout.write(self.style.SUCCESS(f'✅ IPFS check complete! {summary}'))
+            self.stdout.write('📡 Gateways:')
+            for gateway in checker.ranked_gateways():
+                self.stdout.write(f'   • {gateway}')
+        else:
+            logger.info(f'IPFS check: {summary}')
@@ -0,0 +1,298 @@
+from datetime import timedelta
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from playground.bulk_import import ImportProgress, SourceDatabase, batched, model_from_row, upsert_batch
+from playground.daily_stats import refresh_image_days
+from playground.gallery_cache import bump_gallery_generation
+from playground.keywords import KEYWORD_FIELDS, index_images, is_indexed, reindex_images, unindex_images
+from playground.miners import flag_automine, invalidate_miner_wallets, is_automine_submitter
+from playground.models import ArbiusImage, ImageComment, ImageReaction, ImageUpvote, MinerAddress, SyncCheckpoint, UserProfile
+
+# (table, model, mark column, unique fields, columns read besides id and the mark)
+# Images are marked on last_checked rather than discovered_at, so accessibility changes travel too.
+# Votes and reactions are never edited, so their id is enough.
+TABLES = [
+    ('mineraddress', MinerAddress, 'last_seen', ('wallet_address',),
+     'wallet_address, first_seen, total_solutions, total_commitments, is_active'),
+    ('arbiusimage', ArbiusImage, 'last_checked', ('transaction_hash',),
+     'transaction_hash, task_id, block_number, timestamp, cid, ipfs_url, image_url, model_id, prompt, '
+     'input_parameters, solution_provider, task_submitter, miner_address, owner_address, gas_used, '
+     'discovered_at, is_accessible, ipfs_gateway'),
+    ('userprofile', UserProfile, 'updated_at', ('wallet_address',),
+     'wallet_address, display_name, bio, avatar_url, website, twitter_handle, '
+     'total_images_created, total_upvotes_received, created_at'),
+    ('imageupvote', ImageUpvote, 'id', ('image_id', 'wallet_address'), 'image_id, wallet_address, created_at'),
+    ('imagereaction', ImageReaction, 'id', ('image_id', 'wallet_address', 'emoji'), 'image_id, wallet_address, emoji, created_at'),
+    # Comments have no unique constraint; author and creation time identify one across deployments
+    ('imagecomment', ImageComment, 'updated_at', ('image_id', 'wallet_address', 'created_at'),
+     'image_id, wallet_address, content, created_at'),
+]
+
+# Engagement counters and the automine flag are derived locally
+DERIVED_FIELDS = {'upvote_count', 'comment_count', 'reaction_counts', 'is_automine', 'next_check_at', 'check_failures'}
+
+
+def source_key(url):
+    """How a source is named in SyncCheckpoint rows: host and database, or the SQLite file, without credentials"""
+    parts = urlsplit(url)
+    if parts.scheme in ('postgres', 'postgresql'):
+        return f'{parts.hostname}:{parts.port or 5432}{parts.path}'
+    return parts.path[1:] if parts.scheme else url
+
+
+class Command(BaseCommand):
+    help = 'Pull rows changed since the last sync from another deployment and upsert them into the local database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source-db-url',
+            type=str,
+            help='Database of the deployment to sync from: a PostgreSQL URL, or an SQLite file / sqlite:/// URL'
+        )
+        parser.add_argument(
+            '--table-prefix',
+            type=str,
+            default='playground',
+            help='App label prefix of the source tables (default: playground; gallery for the legacy Heroku schema)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows upserted per batch (default: 1000)'
+        )
+        parser.add_argument(
+            '--itersize',
+            type=int,
+            default=5000,
+            help='Rows fetched from the source per round trip (default: 5000)'
+        )
+        parser.add_argument(
+            '--overlap',
+            type=int,
+            default=60,
+            help='Seconds re-read before timestamp marks, for rows committed late with an earlier time (default: 60)'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignore the stored high-water marks and sync every row'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the rows changed since the last sync without writing anything'
+        )
+
+    def handle(self, *args, **options):
+        url = options['source_db_url']
+        if not url:
+            self.stdout.write(self.style.ERROR('Please provide --source-db-url parameter'))
+            return
+
+        self.prefix = options['table_prefix']
+        self.batch_size = options['batch_size']
+        self.overlap = timedelta(seconds=options['overlap'])
+        self.key = source_key(url)
+
+        # Source image ids -> local image ids, filled as images are synced or looked up
+        self.image_ids = {}
+        # What the derived data has to be refreshed for
+        self.new_images = []
+        self.updated_images = []
+        self.touched_images = []
+        # Existing images as they were before the sync overwrote them, by transaction hash
+        self.previous_images = {}
+        self.engaged_image_ids = set()
+        self.new_miners = []
+        self.new_hashes = set()
+
+        try:
+            with SourceDatabase(url, itersize=options['itersize']) as source:
+                self.source = source
+                for table in TABLES:
+                    checkpoint = self.checkpoint(*table[:3], full=options['full'])
+                    if options['dry_run']:
+                        self.count_changes(table, checkpoint)
+                    else:
+                        self.sync_table(table, checkpoint)
+
+            if options['dry_run']:
+                self.stdout.write(self.style.SUCCESS('Dry run completed - check the output above'))
+                return
+
+            self.refresh_derived_data()
+            self.stdout.write(self.style.SUCCESS(f'Synced from {self.key}'))
+
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error syncing from source database: {str(e)}'))
+
+    def table(self, name):
+        return f'{self.prefix}_{name}'
+
+    def checkpoint(self, name, model, mark, full=False):
+        """The stored mark of a source table, or an unsaved blank one if it was never synced"""
+        checkpoint = SyncCheckpoint.objects.filter(source=self.key, table=self.table(name)).first()
+        if checkpoint is None:
+            checkpoint = SyncCheckpoint(source=self.key, table=self.table(name))
+        if full or checkpoint.mark_column != mark:
+            checkpoint.mark_column = mark
+            checkpoint.last_value = ''
+        return checkpoint
+
+    def changed_since(self, checkpoint):
+        """WHERE clause and parameters selecting the source rows past a checkpoint"""
+        if not checkpoint.last_value:
+            return '', ()
+        mark = checkpoint.mark_column
+        if mark == 'id':
+            return 'WHERE id > %s', (int(checkpoint.last_value),)
+        since = parse_datetime(checkpoint.last_value) - self.overlap
+        if self.source.vendor == 'sqlite':
+            # Django stores naive UTC text on SQLite, which compares in time order
+            since = str(since.replace(tzinfo=None))
+        return f'WHERE {mark} >= %s', (since,)
+
+    def count_changes(self, table, checkpoint):
+        name = table[0]
+        where, params = self.changed_since(checkpoint)
+        count = next(self.source.stream(f'SELECT COUNT(*) AS count FROM {self.table(name)} {where}', params))['count']
+        since = f'since {checkpoint.mark_column} {checkpoint.last_value}' if checkpoint.last_value else 'never synced'
+        self.stdout.write(f'{self.table(name)}: {count} rows to sync ({since})')
+
+    def sync_table(self, table, checkpoint):
+        name, model, mark, unique_fields, columns = table
+        self.stdout.write(f'Syncing {self.table(name)}...')
+        progress = ImportProgress(model._meta.verbose_name_plural.capitalize(), self.stdout.write)
+        update_fields = [
+            field.name for field in model._meta.concrete_fields
+            if not field.primary_key and field.attname not in unique_fields and field.name not in DERIVED_FIELDS
+        ]
+        skipped = 0
+
+        where, params = self.changed_since(checkpoint)
+        selected = f'id, {columns}' if mark == 'id' else f'id, {mark}, {columns}'
+        rows = self.source.stream(f'SELECT {selected} FROM {self.table(name)} {where} ORDER BY {mark}, id', params)
+        for batch in batched(rows, self.batch_size):
+            if model is ArbiusImage:
+                objects = self.prepare_images(batch)
+            elif 'image_id' in unique_fields:
+                objects, missing = self.prepare_related(model, batch)
+                skipped += missing
+            else:
+                objects = [model_from_row(model, row) for row in batch]
+
+            # The mark moves with the rows, so an interrupted sync resumes from the last whole batch
+            with transaction.atomic():
+                if objects:
+                    upsert_batch(model, objects, unique_fields, update_fields)
+                last = batch[-1][mark]
+                # Rows without a mark value sort first on SQLite and last on PostgreSQL
+                if last is not None:
+                    checkpoint.last_value = last.isoformat() if hasattr(last, 'isoformat') else str(last)
+                checkpoint.rows_synced += len(batch)
+                checkpoint.last_synced_at = timezone.now()
+                checkpoint.save()
+
+            if model is MinerAddress:
+                self.new_miners.extend(obj.wallet_address for obj in objects)
+            elif model is ArbiusImage:
+                self.record_images(batch)
+            progress.advance(len(batch))
+
+        checkpoint.last_synced_at = timezone.now()
+        checkpoint.save()
+        progress.finish()
+        if skipped:
+            self.stdout.write(f'Warning: skipped {skipped} {name} rows of images missing from both databases')
+
+    def prepare_images(self, batch):
+        if self.new_miners:
+            invalidate_miner_wallets()
+        existing = ArbiusImage.objects.filter(
+            transaction_hash__in=[row['transaction_hash'] for row in batch]
+        ).only('transaction_hash', *KEYWORD_FIELDS)
+        for image in existing:
+            self.previous_images.setdefault(image.transaction_hash, image)
+        self.new_hashes = {row['transaction_hash'] for row in batch} - set(self.previous_images)
+
+        objects = []
+        for row in batch:
+            image = model_from_row(ArbiusImage, row, block_number=0, timestamp=timezone.now, input_parameters=dict)
+            image.is_automine = is_automine_submitter(image.task_submitter)
+            objects.append(image)
+        return objects
+
+    def record_images(self, batch):
+        images = ArbiusImage.objects.filter(transaction_hash__in=[row['transaction_hash'] for row in batch]).only(
+            'id', 'transaction_hash', 'timestamp', 'prompt', 'model_id', 'is_accessible', 'is_automine',
+        )
+        by_hash = {image.transaction_hash: image for image in images}
+        for row in batch:
+            image = by_hash.get(row['transaction_hash'])
+            if image is None:
+                continue
+            self.image_ids[row['id']] = image.id
+            self.touched_images.append(image)
+            if image.transaction_hash in self.new_hashes:
+                self.new_images.append(image)
+            else:
+                self.updated_images.append(image)
+
+    def resolve_images(self, source_ids):
+        """Map source image ids that haven't been seen in this run through their transaction hashes"""
+        unknown = [image_id for image_id in source_ids if image_id not in self.image_ids]
+        if not unknown:
+            return
+        placeholders = ', '.join(['%s'] * len(unknown))
+        hashes = {
+            row['transaction_hash']: row['id']
+            for row in self.source.stream(
+                f"SELECT id, transaction_hash FROM {self.table('arbiusimage')} WHERE id IN ({placeholders})", unknown,
+            )
+        }
+        local_ids = dict(ArbiusImage.objects.filter(transaction_hash__in=hashes).values_list('transaction_hash', 'id'))
+        for image_id in unknown:
+            self.image_ids[image_id] = None
+        for transaction_hash, image_id in hashes.items():
+            self.image_ids[image_id] = local_ids.get(transaction_hash)
+
+    def prepare_related(self, model, batch):
+        self.resolve_images({row['image_id'] for row in batch})
+        objects = []
+        missing = 0
+        for row in batch:
+            image_id = self.image_ids.get(row['image_id'])
+            if image_id is None:
+                missing += 1
+                continue
+            objects.append(model_from_row(model, {**row, 'image_id': image_id}))
+            self.engaged_image_ids.add(image_id)
+        return objects, missing
+
+    def refresh_derived_data(self):
+        """Bring what the upserts bypass up to date for the synced rows only"""
+        # Keywords follow the synced images first, so flagging new miners' images takes out what is counted now
+        index_images(self.new_images)
+        previous = [self.previous_images[image.transaction_hash] for image in self.updated_images]
+        reindex_images(self.updated_images, [is_indexed(image) for image in previous])
+        # Images counted both before and after whose prompt or day changed
+        moved = [
+            (before, after) for before, after in zip(previous, self.updated_images)
+            if is_indexed(before) and is_indexed(after)
+            and (before.prompt, timezone.localdate(before.timestamp)) != (after.prompt, timezone.localdate(after.timestamp))
+        ]
+        unindex_images(before for before, _ in moved)
+        index_images(after for _, after in moved)
+        flagged = flag_automine(self.new_miners)
+        refresh_image_days(self.touched_images)
+        ArbiusImage.rebuild_counters(ArbiusImage.objects.filter(pk__in=self.engaged_image_ids))
+        if flagged or self.touched_images or self.engaged_image_ids:
+            bump_gallery_generation()
+        self.stdout.write(
+            f'{len(self.new_images)} new and {len(self.touched_images) - len(self.new_images)} updated images, '
+            f'{len(self.engaged_image_ids)} images with new engagement, {len(self.new_miners)} miners'
+        )
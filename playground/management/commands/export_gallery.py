@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from playground.snapshots import SnapshotError, export_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Export gallery images, votes, comments and reactions to a compact snapshot directory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='gallery_snapshot',
+            help='Snapshot directory; an existing snapshot is appended to (default: gallery_snapshot)'
+        )
+        parser.add_argument(
+            '--from-block',
+            type=int,
+            help='First block of a block range to export (default: without a range, everything stored since the last export)'
+        )
+        parser.add_argument(
+            '--to-block',
+            type=int,
+            help='Last block of a block range to export (default: the newest image)'
+        )
+        parser.add_argument(
+            '--chunk-rows',
+            type=int,
+            default=100000,
+            help='Rows per chunk file (default: 100000)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Exporting gallery to {options["output"]}...')
+        try:
+            counts = export_snapshot(
+                options['output'],
+                from_block=options['from_block'],
+                to_block=options['to_block'],
+                chunk_rows=options['chunk_rows'],
+                write=self.stdout.write,
+            )
+        except SnapshotError as e:
+            self.stdout.write(self.style.ERROR(str(e)))
+            return
+
+        for table, count in counts.items():
+            self.stdout.write(f'{table.capitalize()}: {count} rows')
+        self.stdout.write(self.style.SUCCESS('Export complete'))
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from playground.miners import sync_automine_flags
 from playground.services import ArbitrumScanner
 from playground.models import MinerAddress
 import logging
@@ -14,13 +15,55 @@ class Command(BaseCommand):
             '--hours',
             type=int,
             default=1,
-            help='Number of hours back to scan for miner activity (default: 1)'
+            help='Number of hours back to scan for miner activity on the first run or with --no-checkpoint (default: 1)'
         )
         parser.add_argument(
             '--quiet',
             action='store_true',
             help='Suppress output (for scheduled runs)'
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Number of blocks requested per JSON-RPC batch (default: RPC_BATCH_SIZE setting)'
+        )
+        parser.add_argument(
+            '--window',
+            type=int,
+            help='Number of blocks fetched per scan chunk (default: RPC_BATCH_WINDOW setting)'
+        )
+        parser.add_argument(
+            '--mode',
+            choices=['blocks', 'logs'],
+            default='blocks',
+            help="'blocks' walks every block; 'logs' queries engine events with eth_getLogs (default: blocks)"
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Number of concurrent block fetchers; above 1 the scan runs through the asyncio pipeline (default: 1)'
+        )
+        parser.add_argument(
+            '--no-checkpoint',
+            action='store_true',
+            help='Rescan the fixed time window instead of resuming from the stored scan checkpoint'
+        )
+        parser.add_argument(
+            '--lease-seconds',
+            type=int,
+            help='How long a run holds the scan lease before another run may take over (default: SCAN_LEASE_SECONDS setting)'
+        )
+        parser.add_argument(
+            '--max-blocks',
+            type=int,
+            help='Maximum number of blocks to scan from the checkpoint in one run'
+        )
+        parser.add_argument(
+            '--rpc-url',
+            type=str,
+            help='JSON-RPC endpoint to scan (default: ARBITRUM_RPC_URL setting)'
+        )
         parser.add_argument(
             '--initial-scan',
             action='store_true',
@@ -33,7 +76,13 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
-        scanner = ArbitrumScanner()
+        scanner = ArbitrumScanner(
+            rpc_url=options['rpc_url'],
+            batch_size=options['batch_size'],
+            window=options['window'],
+            mode=options['mode'],
+            concurrency=options['concurrency'],
+        )
         
         if not options['quiet']:
             self.stdout.write('🔍 Starting miner identification scan...')
@@ -55,8 +104,17 @@ class Command(BaseCommand):
                 if not options['quiet']:
                     self.stdout.write(f"⏰ Scanning last {hours} hour(s) for miner activity...")
                 
-                # Scan for miners
-                miners = scanner.scan_for_miners(hours_back=hours, mark_inactive=options['mark_inactive'])
+                # Scan for miners, resuming from the last checkpoint unless disabled
+                miners = scanner.scan_for_miners(
+                    hours_back=hours,
+                    mark_inactive=options['mark_inactive'],
+                    checkpoint=None if options['no_checkpoint'] else 'miners',
+                    lease_seconds=options['lease_seconds'],
+                    max_blocks=options['max_blocks'],
+                )
+            
+            # Catch images stored before their submitter was identified as a miner
+            flagged, cleared = sync_automine_flags()
             
             # Get current statistics
             total_miners = MinerAddress.objects.count()
@@ -68,14 +126,20 @@ class Command(BaseCommand):
                     self.style.SUCCESS(
                         f'✅ Miner scan complete!\n'
                         f'🔍 Found {len(miners)} miners in this scan\n'
+                        f'⚡ Scanned {scanner.blocks_scanned} blocks in {scanner.scan_seconds:.1f}s '
+                        f'({scanner.blocks_per_second:.1f} blocks/sec)\n'
                         f'📊 Database stats:\n'
                         f'   • Total miners: {total_miners}\n'
                         f'   • Active miners: {active_miners}\n'
-                        f'   • Inactive miners: {inactive_miners}'
+                        f'   • Inactive miners: {inactive_miners}\n'
+                        f'🤖 Automine images: {flagged} newly flagged, {cleared} cleared'
                     )
                 )
             else:
-                logger.info(f'Miner scan found {len(miners)} miners ({active_miners} active, {total_miners} total)')
+                logger.info(
+                    f'Miner scan found {len(miners)} miners ({active_miners} active, {total_miners} total, '
+                    f'{scanner.blocks_per_second:.1f} blocks/sec); automine flags: {flagged} set, {cleared} cleared'
+                )
                 
         except Exception as e:
             error_msg = f'Error during miner scan: {e}'
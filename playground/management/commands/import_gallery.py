@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from playground.bulk_import import refresh_derived_data
+from playground.snapshots import SnapshotError, import_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Import a gallery snapshot directory written by export_gallery'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--input',
+            type=str,
+            default='gallery_snapshot',
+            help='Snapshot directory (default: gallery_snapshot)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows written per bulk insert (default: 1000)'
+        )
+        parser.add_argument(
+            '--no-verify',
+            action='store_true',
+            help='Skip the checksum check of each chunk against the manifest'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Importing gallery snapshot from {options["input"]}...')
+        try:
+            counts = import_snapshot(
+                options['input'],
+                batch_size=options['batch_size'],
+                verify=not options['no_verify'],
+                write=self.stdout.write,
+            )
+        except SnapshotError as e:
+            self.stdout.write(self.style.ERROR(str(e)))
+            return
+
+        for table, count in counts.items():
+            self.stdout.write(f'{table.capitalize()}: {count} rows')
+
+        self.stdout.write('Recomputing automine flags, counters, keywords and dashboard stats...')
+        refresh_derived_data()
+        self.stdout.write(self.style.SUCCESS('Import complete'))
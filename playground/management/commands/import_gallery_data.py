@@ -1,43 +1,63 @@
 from django.core.management.base import BaseCommand
-from django.core.management import call_command
+from playground.bulk_import import download_to_file, load_fixture, refresh_derived_data
+from django.utils.text import capfirst
 import requests
-import tempfile
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+GALLERY_DATA_URL = 'https://raw.githubusercontent.com/svdl1185/arbius_playground/main/gallery_data.json'
+
 class Command(BaseCommand):
     help = 'Import real gallery data from GitHub JSON file'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            type=str,
+            help='Load a local gallery_data.json instead of downloading it (works offline)'
+        )
+        parser.add_argument(
+            '--url',
+            type=str,
+            default=GALLERY_DATA_URL,
+            help='URL of the fixture to download (default: gallery_data.json on GitHub)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Objects inserted per bulk_create (default: 1000)'
+        )
+
     def handle(self, *args, **options):
         self.stdout.write('Downloading and importing real gallery data...')
-        
-        # Download the data file from GitHub
-        url = 'https://raw.githubusercontent.com/svdl1185/arbius_playground/main/gallery_data.json'
+        temp_file = None
         
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-                f.write(response.text)
-                temp_file = f.name
-            
-            self.stdout.write(f'Data downloaded to {temp_file}')
-            self.stdout.write(f'File size: {len(response.text)} characters')
+            if options['file']:
+                path = options['file']
+            else:
+                # Stream the data file from GitHub to disk
+                temp_file = path = download_to_file(options['url'], write=self.stdout.write)
+                self.stdout.write(f'Data downloaded to {temp_file}')
+            self.stdout.write(f'File size: {os.path.getsize(path)} bytes')
             
             # Load the data
             self.stdout.write('Loading data into database...')
-            call_command('loaddata', temp_file)
-            
-            # Clean up
-            os.unlink(temp_file)
+            loaded = load_fixture(path, batch_size=options['batch_size'], write=self.stdout.write)
+            for model, count in loaded.items():
+                self.stdout.write(f'{capfirst(model._meta.verbose_name_plural)}: {count} processed')
+            refresh_derived_data()
             
             self.stdout.write(self.style.SUCCESS('Successfully imported real gallery data!'))
             
         except requests.RequestException as e:
             self.stdout.write(self.style.ERROR(f'Failed to download data: {e}'))
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Failed to load data: {e}')) 
\ No newline at end of file
+            self.stdout.write(self.style.ERROR(f'Failed to load data: {e}'))
+        finally:
+            # Clean up
+            if temp_file:
+                os.unlink(temp_file)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from playground.daily_stats import rebuild_daily_stats
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Recount the per-day image stats behind the stats dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Only recount the last N days, today included (default: all of history)'
+        )
+        parser.add_argument(
+            '--quiet',
+            action='store_true',
+            help='Suppress output (for scheduled runs)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        if not options['quiet']:
+            scope = f'the last {options["days"]} days' if options['days'] is not None else 'all images'
+            self.stdout.write(f'📊 Recounting daily image stats for {scope}...')
+        days = rebuild_daily_stats(days=options['days'])
+        summary = f'{days} days recounted in {time.monotonic() - started:.1f}s'
+
+        if not options['quiet']:
+            self.stdout.write(self.style.SUCCESS(f'✅ Daily stats updated! {summary}'))
+        else:
+            logger.info(f'Daily stats: {summary}')
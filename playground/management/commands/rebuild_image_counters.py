@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from playground.gallery_cache import bump_gallery_generation
+from playground.models import ArbiusImage
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the upvote, comment and reaction counters on ArbiusImage from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of images recounted per batch (default: 1000)'
+        )
+        parser.add_argument(
+            '--quiet',
+            action='store_true',
+            help='Suppress output (for scheduled runs)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['quiet']:
+            self.stdout.write(f'🔢 Rebuilding engagement counters for {ArbiusImage.objects.count()} images...')
+
+        started = time.monotonic()
+        changed = ArbiusImage.rebuild_counters(batch_size=options['batch_size'])
+        if changed:
+            bump_gallery_generation()
+        summary = f'{changed} images had stale counters ({time.monotonic() - started:.1f}s)'
+
+        if not options['quiet']:
+            self.stdout.write(self.style.SUCCESS(f'✅ Counters rebuilt! {summary}'))
+        else:
+            logger.info(f'Counter rebuild: {summary}')
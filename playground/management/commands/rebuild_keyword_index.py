@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from playground.keywords import prune_daily_counts, rebuild_keyword_index
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Recount the popular keyword index from the prompts of all gallery images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of prompts read per query (default: 1000)'
+        )
+        parser.add_argument(
+            '--prune-days',
+            type=int,
+            help='Only drop daily keyword counts older than this many days instead of rebuilding'
+        )
+        parser.add_argument(
+            '--quiet',
+            action='store_true',
+            help='Suppress output (for scheduled runs)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        if options['prune_days'] is not None:
+            deleted = prune_daily_counts(options['prune_days'])
+            summary = f'{deleted} daily keyword counts older than {options["prune_days"]} days removed'
+        else:
+            if not options['quiet']:
+                self.stdout.write('🔍 Recounting keywords from gallery prompts...')
+            images, keywords = rebuild_keyword_index(batch_size=options['batch_size'])
+            summary = f'{keywords} keywords from {images} images in {time.monotonic() - started:.1f}s'
+
+        if not options['quiet']:
+            self.stdout.write(self.style.SUCCESS(f'✅ Keyword index updated! {summary}'))
+        else:
+            logger.info(f'Keyword index: {summary}')
@@ -1,13 +1,60 @@
 from django.core.management.base import BaseCommand
+from django.utils.text import capfirst
+from playground.bulk_delete import count_deletions, delete_in_batches
+from playground.daily_stats import refresh_daily_stats
+from playground.gallery_cache import bump_gallery_generation
+from playground.keywords import unindex_image_ids
 from playground.models import ArbiusImage
-import re
 
 class Command(BaseCommand):
     help = 'Remove all images with invalid Ethereum transaction hashes.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Images deleted per transaction (default: 1000)'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.1,
+            help='Seconds to pause between batches (default: 0.1)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count what would be removed without deleting anything'
+        )
+
     def handle(self, *args, **options):
-        eth_tx_pattern = re.compile(r'^0x[a-fA-F0-9]{64}$')
         invalid_images = ArbiusImage.objects.exclude(transaction_hash__regex=r'^0x[a-fA-F0-9]{64}$')
-        count = invalid_images.count()
-        invalid_images.delete()
-        self.stdout.write(self.style.SUCCESS(f'Removed {count} images with invalid transaction hashes.')) 
\ No newline at end of file
+
+        if options['dry_run']:
+            for model, count in count_deletions(invalid_images).items():
+                self.stdout.write(f'Would remove {count} {model._meta.verbose_name_plural}')
+            return
+
+        # Recount the dashboard stats of the days the deleted images fall on and take their keywords out of the index
+        days = set()
+
+        def forget_images(pks):
+            days.update(ArbiusImage.objects.filter(pk__in=pks).dates('timestamp', 'day'))
+            unindex_image_ids(pks)
+
+        deleted = delete_in_batches(
+            invalid_images,
+            batch_size=options['batch_size'],
+            pause=options['sleep'],
+            on_batch=forget_images,
+            write=self.stdout.write,
+        )
+        refresh_daily_stats(days)
+        if deleted:
+            bump_gallery_generation()
+
+        for model, count in deleted.items():
+            if model is not ArbiusImage:
+                self.stdout.write(f'{capfirst(model._meta.verbose_name_plural)} removed with them: {count}')
+        self.stdout.write(self.style.SUCCESS(f'Removed {deleted.get(ArbiusImage, 0)} images with invalid transaction hashes.'))
@@ -1,56 +1,85 @@
 from django.core.management.base import BaseCommand
+from django.db.models.functions import Lower
+from playground.bulk_delete import count_deletions, delete_in_batches
+from playground.daily_stats import refresh_daily_stats
+from playground.gallery_cache import bump_gallery_generation
+from playground.keywords import unindex_image_ids
 from playground.models import ArbiusImage, MinerAddress, UserProfile, ImageUpvote, ImageComment
 
+# Sample miner addresses (the hardcoded ones from the import script)
+SAMPLE_MINERS = [
+    '0x5e33e2cead338b1224ddd34636dac7563f97c300',
+    '0xdc790a53e50207861591622d349e989fef6f84bc',
+    '0x4d826895b255a4f38d7ba87688604c358f4132b6',
+    '0xd04c1b09576aa4310e4768d8e9cd12fac3216f95',
+]
+
 class Command(BaseCommand):
     help = 'Remove all sample data created by import_gallery_data command'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per transaction (default: 1000)'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.1,
+            help='Seconds to pause between batches (default: 0.1)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count what would be removed without deleting anything'
+        )
+
     def handle(self, *args, **options):
-        self.stdout.write('Removing sample data...')
-        
-        # Count before deletion
-        images_before = ArbiusImage.objects.count()
-        miners_before = MinerAddress.objects.count()
-        profiles_before = UserProfile.objects.count()
-        upvotes_before = ImageUpvote.objects.count()
-        comments_before = ImageComment.objects.count()
-        
-        # Remove sample data
-        # First, remove upvotes and comments that reference sample images
         sample_images = ArbiusImage.objects.filter(
             transaction_hash__startswith='0x' + '0' * 60  # Sample transaction hashes
         )
-        
-        if sample_images.exists():
-            # Remove related upvotes and comments
-            ImageUpvote.objects.filter(image__in=sample_images).delete()
-            ImageComment.objects.filter(image__in=sample_images).delete()
-            
-            # Remove the sample images
-            sample_images.delete()
-        
-        # Remove sample miner addresses (the hardcoded ones from the import script)
-        sample_miners = [
-            '0x5e33e2cead338b1224ddd34636dac7563f97c300',
-            '0xdc790a53e50207861591622d349e989fef6f84bc',
-            '0x4d826895b255a4f38d7ba87688604c358f4132b6',
-            '0xd04c1b09576aa4310e4768d8e9cd12fac3216f95',
-        ]
-        
-        MinerAddress.objects.filter(wallet_address__in=sample_miners).delete()
-        
-        # Count after deletion
-        images_after = ArbiusImage.objects.count()
-        miners_after = MinerAddress.objects.count()
-        profiles_after = UserProfile.objects.count()
-        upvotes_after = ImageUpvote.objects.count()
-        comments_after = ImageComment.objects.count()
-        
-        self.stdout.write(f'Removed {images_before - images_after} sample images')
-        self.stdout.write(f'Removed {miners_before - miners_after} sample miner addresses')
-        self.stdout.write(f'Removed {profiles_before - profiles_after} sample user profiles')
-        self.stdout.write(f'Removed {upvotes_before - upvotes_after} sample upvotes')
-        self.stdout.write(f'Removed {comments_before - comments_after} sample comments')
+        # Miner addresses are stored checksummed
+        sample_miners = MinerAddress.objects.alias(wallet=Lower('wallet_address')).filter(wallet__in=SAMPLE_MINERS)
+
+        if options['dry_run']:
+            counts = count_deletions(sample_images)
+            counts[MinerAddress] = sample_miners.count()
+            for model, count in counts.items():
+                self.stdout.write(f'Would remove {count} sample {model._meta.verbose_name_plural}')
+            return
+
+        self.stdout.write('Removing sample data...')
+        batches = {'batch_size': options['batch_size'], 'pause': options['sleep'], 'write': self.stdout.write}
+
+        # Upvotes, comments and reactions go with their images; the dashboard stats of their days are recounted
+        # and their keywords taken out of the index
+        days = set()
+
+        def forget_images(pks):
+            days.update(ArbiusImage.objects.filter(pk__in=pks).dates('timestamp', 'day'))
+            unindex_image_ids(pks)
+
+        deleted = delete_in_batches(
+            sample_images,
+            on_batch=forget_images,
+            **batches,
+        )
+        refresh_daily_stats(days)
+        if deleted:
+            bump_gallery_generation()
+
+        # The sample wallets are also the built-in fallback miners, which count again once no miners are
+        # left, so their delete signals then leave any remaining images of theirs flagged as automine
+        deleted.update(delete_in_batches(sample_miners, **batches))
+
+        self.stdout.write(f'Removed {deleted.get(ArbiusImage, 0)} sample images')
+        self.stdout.write(f'Removed {deleted.get(MinerAddress, 0)} sample miner addresses')
+        self.stdout.write(f'Removed {deleted.get(UserProfile, 0)} sample user profiles')
+        self.stdout.write(f'Removed {deleted.get(ImageUpvote, 0)} sample upvotes')
+        self.stdout.write(f'Removed {deleted.get(ImageComment, 0)} sample comments')
         
         self.stdout.write(
             self.style.SUCCESS('Successfully removed all sample data!')
-        ) 
\ No newline at end of file
+        )
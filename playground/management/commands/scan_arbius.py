@@ -19,7 +19,7 @@ class Command(BaseCommand):
         parser.add_argument(
             '--minutes',
             type=int,
-            help='Scan the last N minutes of blocks for images with prompts only'
+            help='Scan for images with prompts only, resuming from the last checkpoint (N minutes back on the first run)'
         )
         parser.add_argument(
             '--deep-scan',
@@ -31,9 +31,57 @@ class Command(BaseCommand):
             action='store_true',
             help='Suppress output (for scheduled runs)'
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Number of blocks requested per JSON-RPC batch (default: RPC_BATCH_SIZE setting)'
+        )
+        parser.add_argument(
+            '--window',
+            type=int,
+            help='Number of blocks fetched per scan chunk (default: RPC_BATCH_WINDOW setting)'
+        )
+        parser.add_argument(
+            '--mode',
+            choices=['blocks', 'logs'],
+            default='blocks',
+            help="'blocks' walks every block; 'logs' queries engine events with eth_getLogs (default: blocks)"
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Number of concurrent block fetchers; above 1 the scan runs through the asyncio pipeline (default: 1)'
+        )
+        parser.add_argument(
+            '--no-checkpoint',
+            action='store_true',
+            help='Rescan the fixed time window instead of resuming from the stored scan checkpoint'
+        )
+        parser.add_argument(
+            '--lease-seconds',
+            type=int,
+            help='How long a run holds the scan lease before another run may take over (default: SCAN_LEASE_SECONDS setting)'
+        )
+        parser.add_argument(
+            '--max-blocks',
+            type=int,
+            help='Maximum number of blocks to scan from the checkpoint in one run'
+        )
+        parser.add_argument(
+            '--rpc-url',
+            type=str,
+            help='JSON-RPC endpoint to scan (default: ARBITRUM_RPC_URL setting)'
+        )
 
     def handle(self, *args, **options):
-        scanner = ArbitrumScanner()
+        scanner = ArbitrumScanner(
+            rpc_url=options['rpc_url'],
+            batch_size=options['batch_size'],
+            window=options['window'],
+            mode=options['mode'],
+            concurrency=options['concurrency'],
+        )
         
         if not options['quiet']:
             self.stdout.write('🚀 Starting Arbius blockchain scan...')
@@ -42,8 +90,17 @@ class Command(BaseCommand):
         try:
             if options['minutes']:
                 # Scan recent minutes
-                new_images = scanner.scan_recent_minutes(options['minutes'])
-                period = f"last {options['minutes']} minutes"
+                if options['no_checkpoint']:
+                    new_images = scanner.scan_recent_minutes(options['minutes'])
+                    period = f"last {options['minutes']} minutes"
+                else:
+                    new_images = scanner.scan_recent_minutes(
+                        options['minutes'],
+                        checkpoint='images',
+                        lease_seconds=options['lease_seconds'],
+                        max_blocks=options['max_blocks'],
+                    )
+                    period = "blocks since last checkpoint"
             elif options['deep_scan']:
                 # Deep scan
                 new_images = scanner.scan_recent_blocks(10000)  # ~3 days worth
@@ -59,11 +116,16 @@ class Command(BaseCommand):
                 self.stdout.write(
                     self.style.SUCCESS(
                         f'✅ Scan complete! Found {len(new_images)} new images in {period}\n'
+                        f'⚡ Scanned {scanner.blocks_scanned} blocks in {scanner.scan_seconds:.1f}s '
+                        f'({scanner.blocks_per_second:.1f} blocks/sec)\n'
                         f'📊 Database now contains {total_images} total images'
                     )
                 )
             else:
-                logger.info(f'Scan found {len(new_images)} new images ({total_images} total)')
+                logger.info(
+                    f'Scan found {len(new_images)} new images ({total_images} total, '
+                    f'{scanner.blocks_per_second:.1f} blocks/sec)'
+                )
                 
         except Exception as e:
             error_msg = f'Error during scan: {e}'
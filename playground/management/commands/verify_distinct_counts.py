@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from datetime import timedelta
+from playground.daily_stats import ADDRESS_FIELDS, distinct_addresses, exact_distinct_addresses
+from playground.hll import HyperLogLog
+from playground.models import DailyImageStats
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Compare the dashboard\'s HyperLogLog distinct-user estimates with exact counts from the image table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window',
+            type=int,
+            action='append',
+            help='Window in days to check, repeatable; 0 means all time (default: 0, 30, 7 and 1)'
+        )
+        parser.add_argument(
+            '--sigmas',
+            type=float,
+            default=3.0,
+            help='Fail when an estimate is off by more than this many standard errors (default: 3)'
+        )
+        parser.add_argument(
+            '--quiet',
+            action='store_true',
+            help='Only report failures (for scheduled runs)'
+        )
+
+    def handle(self, *args, **options):
+        windows = options['window'] or [0, 30, 7, 1]
+        standard_error = 1.04 / HyperLogLog().size ** 0.5
+        tolerance = options['sigmas'] * standard_error
+
+        rollups = {rollup.day: rollup for rollup in DailyImageStats.objects.order_by('day')}
+        if not options['quiet']:
+            self.stdout.write(f'🔢 Checking distinct counts over {len(rollups)} daily rollups (tolerance {tolerance:.1%})...')
+
+        failures = []
+        for field in ADDRESS_FIELDS:
+            for days in windows:
+                since = timezone.now() - timedelta(days=days) if days else None
+                estimate = distinct_addresses(rollups, field=field, since=since)
+                exact = exact_distinct_addresses(field=field, since=since)
+                error = abs(estimate - exact) / exact if exact else float(estimate > 0)
+
+                label = f'{field}s ({f"{days}d" if days else "all time"})'
+                line = f'{label}: estimate {estimate}, exact {exact}, error {error:.2%}'
+                if error > tolerance:
+                    failures.append(line)
+                    self.stdout.write(self.style.ERROR(f'❌ {line}'))
+                elif not options['quiet']:
+                    self.stdout.write(f'   {line}')
+
+        if failures:
+            logger.warning(f'Distinct count check failed: {"; ".join(failures)}')
+            raise CommandError(f'{len(failures)} estimates outside {tolerance:.1%}; run rebuild_daily_stats if the rollup is stale')
+        if not options['quiet']:
+            self.stdout.write(self.style.SUCCESS('✅ All distinct-user estimates within the error bound'))
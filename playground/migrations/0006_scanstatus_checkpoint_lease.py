@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 15:39
+
+from django.db import migrations, models
+
+
+def name_existing_checkpoints(apps, schema_editor):
+    """Give existing rows distinct names before the unique constraint: the oldest becomes 'images'"""
+    ScanStatus = apps.get_model('playground', 'ScanStatus')
+    for index, status in enumerate(ScanStatus.objects.order_by('pk')):
+        status.name = 'images' if index == 0 else f'images-{status.pk}'
+        status.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playground', '0005_imagereaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanstatus',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, help_text='When the current scan lease lapses and another run may take over', null=True),
+        ),
+        migrations.AddField(
+            model_name='scanstatus',
+            name='lease_owner',
+            field=models.CharField(blank=True, default='', help_text='Token of the run currently holding the scan lease', max_length=32),
+        ),
+        # Nullable first, as a constant default would give every existing row the same unique name
+        migrations.AddField(
+            model_name='scanstatus',
+            name='name',
+            field=models.CharField(help_text='Which scan this checkpoint belongs to (e.g. images, miners)', max_length=50, null=True),
+        ),
+        migrations.RunPython(name_existing_checkpoints, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='scanstatus',
+            name='name',
+            field=models.CharField(default='images', help_text='Which scan this checkpoint belongs to (e.g. images, miners)', max_length=50, unique=True),
+        ),
+    ]
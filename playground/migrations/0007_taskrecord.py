@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 15:47
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playground', '0006_scanstatus_checkpoint_lease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.CharField(help_text='Task id emitted in the TaskSubmitted event', max_length=66, unique=True)),
+                ('transaction_hash', models.CharField(help_text='Transaction that submitted the task', max_length=66)),
+                ('block_number', models.BigIntegerField()),
+                ('timestamp', models.DateTimeField()),
+                ('submitter', models.CharField(help_text='Owner of the task as given in the submitTask call', max_length=42)),
+                ('model_id', models.CharField(help_text='The AI model the task was submitted to', max_length=66)),
+                ('input_cid', models.CharField(blank=True, default='', help_text='IPFS CIDv0 of the raw task input', max_length=100)),
+                ('input_parameters', models.JSONField(blank=True, help_text='Decoded JSON task input', null=True)),
+                ('prompt', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-block_number'],
+                'indexes': [models.Index(fields=['submitter'], name='playground__submitt_1d502a_idx'), models.Index(fields=['block_number'], name='playground__block_n_396a10_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-17 15:51
+
+from datetime import timedelta
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def schedule_existing_images(apps, schema_editor):
+    """Spread existing images over the schedule instead of making them all due at once"""
+    ArbiusImage = apps.get_model('playground', 'ArbiusImage')
+    # Inaccessible images are due right away; accessible ones a week after their last check
+    ArbiusImage.objects.filter(is_accessible=False).update(next_check_at=F('last_checked'), check_failures=1)
+    ArbiusImage.objects.filter(is_accessible=True).update(next_check_at=F('last_checked') + timedelta(days=7))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playground', '0007_taskrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='arbiusimage',
+            name='check_failures',
+            field=models.PositiveIntegerField(default=0, help_text='Consecutive failed accessibility checks, drives the recheck backoff'),
+        ),
+        migrations.AddField(
+            model_name='arbiusimage',
+            name='next_check_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='When the IPFS accessibility checker should look at this image again'),
+        ),
+        migrations.AddIndex(
+            model_name='arbiusimage',
+            index=models.Index(fields=['next_check_at'], name='playground__next_ch_482ef2_idx'),
+        ),
+        migrations.RunPython(schedule_existing_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-17 15:53
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    """Fill the new counters from the upvote, comment and reaction tables"""
+    ArbiusImage = apps.get_model('playground', 'ArbiusImage')
+    ImageUpvote = apps.get_model('playground', 'ImageUpvote')
+    ImageComment = apps.get_model('playground', 'ImageComment')
+    ImageReaction = apps.get_model('playground', 'ImageReaction')
+
+    def related_count(model):
+        counts = model.objects.filter(image=OuterRef('pk')).order_by().values('image').annotate(count=Count('pk')).values('count')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+    ArbiusImage.objects.update(upvote_count=related_count(ImageUpvote), comment_count=related_count(ImageComment))
+
+    reactions = {}
+    for row in ImageReaction.objects.values('image_id', 'emoji').annotate(count=Count('id')).order_by():
+        reactions.setdefault(row['image_id'], {})[row['emoji']] = row['count']
+    for image_id, counts in reactions.items():
+        ArbiusImage.objects.filter(pk=image_id).update(reaction_counts=counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playground', '0008_arbiusimage_recheck_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='arbiusimage',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='arbiusimage',
+            name='reaction_counts',
+            field=models.JSONField(blank=True, default=dict, help_text='Reaction count per emoji, e.g. {"🔥": 3}'),
+        ),
+        migrations.AddField(
+            model_name='arbiusimage',
+            name='upvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='arbiusimage',
+            index=models.Index(fields=['-upvote_count', '-timestamp'], name='playground__upvote__3774e9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='arbiusimage',
+            index=models.Index(fields=['-comment_count', '-timestamp'], name='playground__comment_f660da_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
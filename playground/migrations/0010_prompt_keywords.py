@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-17 15:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playground', '0009_arbiusimage_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromptKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(max_length=64, unique=True)),
+                ('image_count', models.PositiveIntegerField(default=0, help_text='Number of gallery images whose prompt contains the keyword')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-image_count'], name='playground__image_c_c53d5c_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyKeywordCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('keyword', models.CharField(max_length=64)),
+                ('image_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='playground__day_7472ff_idx')],
+                'unique_together': {('day', 'keyword')},
+            },
+        ),
+    ]
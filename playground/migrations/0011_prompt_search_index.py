@@ -0,0 +1,81 @@
+# Generated by Django 4.2.7 on 2026-10-17 16:20
+
+from django.db import OperationalError, migrations
+
+FTS_INDEX_NAME = 'playground_prompt_fts_idx'
+TRIGRAM_INDEX_NAME = 'playground_prompt_trgm_idx'
+
+# Copied from playground.search as they were when this migration was written, so later changes there
+# cannot alter what it creates
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'playground_arbiusimage_fts'
+FTS_DDL = "CREATE VIRTUAL TABLE IF NOT EXISTS playground_arbiusimage_fts USING fts5(prompt, content='playground_arbiusimage', content_rowid='id')"
+FTS_TRIGGERS = {
+    'playground_arbiusimage_fts_insert': (
+        "CREATE TRIGGER IF NOT EXISTS playground_arbiusimage_fts_insert AFTER INSERT ON playground_arbiusimage BEGIN "
+        "INSERT INTO playground_arbiusimage_fts(rowid, prompt) VALUES (new.id, new.prompt); END"
+    ),
+    'playground_arbiusimage_fts_delete': (
+        "CREATE TRIGGER IF NOT EXISTS playground_arbiusimage_fts_delete AFTER DELETE ON playground_arbiusimage BEGIN "
+        "INSERT INTO playground_arbiusimage_fts(playground_arbiusimage_fts, rowid, prompt) VALUES ('delete', old.id, old.prompt); END"
+    ),
+    'playground_arbiusimage_fts_update': (
+        "CREATE TRIGGER IF NOT EXISTS playground_arbiusimage_fts_update AFTER UPDATE OF prompt ON playground_arbiusimage BEGIN "
+        "INSERT INTO playground_arbiusimage_fts(playground_arbiusimage_fts, rowid, prompt) VALUES ('delete', old.id, old.prompt); "
+        "INSERT INTO playground_arbiusimage_fts(rowid, prompt) VALUES (new.id, new.prompt); END"
+    ),
+}
+
+
+def create_sqlite_fts(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(FTS_DDL)
+        except OperationalError:
+            # No FTS5 in this SQLite build; prompt search falls back to LIKE
+            return
+        for ddl in FTS_TRIGGERS.values():
+            cursor.execute(ddl)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def create_search_index(apps, schema_editor):
+    """GIN full-text and trigram indexes on PostgreSQL, an FTS5 table on SQLite"""
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        create_sqlite_fts(schema_editor)
+        return
+    if connection.vendor != 'postgresql':
+        return
+
+    from django.contrib.postgres.indexes import GinIndex, OpClass
+    from django.contrib.postgres.search import SearchVector
+    from django.db.models.functions import Upper
+
+    ArbiusImage = apps.get_model('playground', 'ArbiusImage')
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Must match the expressions built by playground.search for the planner to use them
+    schema_editor.add_index(ArbiusImage, GinIndex(SearchVector('prompt', config=SEARCH_CONFIG), name=FTS_INDEX_NAME))
+    schema_editor.add_index(ArbiusImage, GinIndex(OpClass(Upper('prompt'), name='gin_trgm_ops'), name=TRIGRAM_INDEX_NAME))
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        for name in FTS_TRIGGERS:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {FTS_INDEX_NAME}')
+        schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playground', '0010_prompt_keywords'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-17 16:03
+
+from django.db import migrations, models
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+# Copy of playground.miners.FALLBACK_MINER_WALLETS at the time of this migration
+FALLBACK_MINER_WALLETS = [
+    '0x5e33e2cead338b1224ddd34636dac7563f97c300',
+    '0xdc790a53e50207861591622d349e989fef6f84bc',
+    '0x4d826895b255a4f38d7ba87688604c358f4132b6',
+    '0xd04c1b09576aa4310e4768d8e9cd12fac3216f95',
+]
+
+
+def flag_existing_automine(apps, schema_editor):
+    """Flag images whose submitter is an identified miner, or a fallback miner wallet while none are identified"""
+    ArbiusImage = apps.get_model('playground', 'ArbiusImage')
+    MinerAddress = apps.get_model('playground', 'MinerAddress')
+
+    if MinerAddress.objects.exists():
+        is_miner = Q(submitter__in=MinerAddress.objects.annotate(wallet=Lower('wallet_address')).values('wallet'))
+    else:
+        is_miner = Q(submitter__in=FALLBACK_MINER_WALLETS)
+    ArbiusImage.objects.alias(submitter=Lower('task_submitter')).filter(is_miner).update(is_automine=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playground', '0011_prompt_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='arbiusimage',
+            name='is_automine',
+            field=models.BooleanField(default=False, help_text='Submitted by a known miner wallet; kept current by the scanners (see playground.miners)'),
+        ),
+        migrations.AddIndex(
+            model_name='arbiusimage',
+            index=models.Index(fields=['is_automine', '-timestamp'], name='playground__is_auto_e60cd7_idx'),
+        ),
+        migrations.RunPython(flag_existing_automine, migrations.RunPython.noop),
+    ]
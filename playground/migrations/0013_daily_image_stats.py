@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-17 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playground', '0012_arbiusimage_is_automine'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyImageStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('image_count', models.PositiveIntegerField(default=0)),
+                ('submitter_count', models.PositiveIntegerField(default=0, help_text='Distinct task submitters that day')),
+                ('model_counts', models.JSONField(default=dict, help_text='Images per model id')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily image stats',
+            },
+        ),
+    ]
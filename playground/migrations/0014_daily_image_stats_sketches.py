@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playground', '0013_daily_image_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyimagestats',
+            name='provider_count',
+            field=models.PositiveIntegerField(default=0, help_text='Distinct solution providers that day'),
+        ),
+        migrations.AddField(
+            model_name='dailyimagestats',
+            name='provider_sketch',
+            field=models.BinaryField(default=bytes, help_text="HyperLogLog sketch of the day's solution providers"),
+        ),
+        migrations.AddField(
+            model_name='dailyimagestats',
+            name='submitter_sketch',
+            field=models.BinaryField(default=bytes, help_text="HyperLogLog sketch of the day's task submitters (see playground.hll)"),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playground', '0014_daily_image_stats_sketches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Which deployment the rows come from (host and database, or file path)', max_length=200)),
+                ('table', models.CharField(help_text='Source table name', max_length=100)),
+                ('mark_column', models.CharField(help_text='Column the high-water mark is taken on', max_length=50)),
+                ('last_value', models.CharField(blank=True, default='', help_text='Highest mark value synced so far, as read from the source', max_length=64)),
+                ('rows_synced', models.PositiveBigIntegerField(default=0)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'unique_together': {('source', 'table')},
+            },
+        ),
+    ]
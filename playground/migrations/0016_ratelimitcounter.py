@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playground', '0015_synccheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Action and client address, e.g. rate_limit:signature_verify:1.2.3.4', max_length=200, unique=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('window_ends_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
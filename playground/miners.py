@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from .gallery_cache import bump_gallery_generation_on_commit
+from .keywords import KEYWORD_FIELDS, gallery_keyword_images, index_images, unindex_images
+from .models import ArbiusImage, MinerAddress
+
+logger = logging.getLogger(__name__)
+
+# Known automine wallets, treated as miners until the miner scan has found any
+FALLBACK_MINER_WALLETS = frozenset({
+    '0x5e33e2cead338b1224ddd34636dac7563f97c300',
+    '0xdc790a53e50207861591622d349e989fef6f84bc',
+    '0x4d826895b255a4f38d7ba87688604c358f4132b6',
+    '0xd04c1b09576aa4310e4768d8e9cd12fac3216f95',
+})
+
+# Other processes' miner changes are picked up after at most this long
+MINER_CACHE_SECONDS = 60
+
+_cache_lock = threading.Lock()
+_cached_wallets = None
+_cached_at = 0.0
+
+
+def miner_wallets():
+    """
+    Lowercased addresses of all identified miners, or the fallback list while there are none.
+
+    Loaded with one query and kept in process for MINER_CACHE_SECONDS;
+    changes made through MinerAddress in this process clear it right away
+    (see playground.signals and MinerActivity.apply).
+    """
+    global _cached_wallets, _cached_at
+    with _cache_lock:
+        if _cached_wallets is None or time.monotonic() - _cached_at > MINER_CACHE_SECONDS:
+            wallets = MinerAddress.objects.values_list('wallet_address', flat=True)
+            _cached_wallets = frozenset(wallet.lower() for wallet in wallets) or FALLBACK_MINER_WALLETS
+            _cached_at = time.monotonic()
+        return _cached_wallets
+
+
+def invalidate_miner_wallets():
+    """Drop the cached miner set so the next miner_wallets() call reloads it"""
+    global _cached_wallets
+    with _cache_lock:
+        _cached_wallets = None
+
+
+def is_automine_submitter(address):
+    """Whether a task submitter is a known miner"""
+    return bool(address) and address.lower() in miner_wallets()
+
+
+def _submitter_filter(addresses):
+    # Addresses are stored checksummed or lowercased depending on their source
+    variants = {variant for address in addresses for variant in (address, address.lower())}
+    return Q(task_submitter__in=variants)
+
+
+def _miner_filter():
+    # Lowercased task submitters that are miners: the identified ones, or the fallback list while there are none
+    if MinerAddress.objects.exists():
+        return Q(submitter__in=MinerAddress.objects.annotate(wallet=Lower('wallet_address')).values('wallet'))
+    return Q(submitter__in=FALLBACK_MINER_WALLETS)
+
+
+def flag_automine(addresses):
+    """Mark the images submitted by newly identified miners as automine; returns the number flagged"""
+    if not addresses:
+        return 0
+    if not MinerAddress.objects.exclude(wallet_address__in=addresses).exists():
+        # The first identified miners replace the fallback list, whose wallets' images may need clearing
+        return sync_automine_flags()[0]
+    images = ArbiusImage.objects.filter(_submitter_filter(addresses), is_automine=False)
+    with transaction.atomic():
+        # Their keywords stop counting once they are hidden from the gallery
+        unindex_images(gallery_keyword_images(images).only(*KEYWORD_FIELDS).iterator())
+        flagged = images.update(is_automine=True)
+    if flagged:
+        bump_gallery_generation_on_commit()
+    return flagged
+
+
+def unflag_automine(addresses):
+    """Clear the automine flag of images by addresses that are no longer miners; returns the number cleared"""
+    if not addresses:
+        return 0
+    if not MinerAddress.objects.exists():
+        # With the last miner gone the fallback list applies again
+        return sync_automine_flags()[1]
+    addresses = [address for address in addresses if address.lower() not in miner_wallets()]
+    if not addresses:
+        return 0
+    images = ArbiusImage.objects.filter(_submitter_filter(addresses), is_automine=True)
+    with transaction.atomic():
+        reshown = list(images.only(*KEYWORD_FIELDS))
+        cleared = images.update(is_automine=False)
+        for image in reshown:
+            image.is_automine = False
+        index_images(reshown)
+    if cleared:
+        bump_gallery_generation_on_commit()
+    return cleared
+
+
+def sync_automine_flags():
+    """
+    Recompute ArbiusImage.is_automine against the current miner set.
+
+    Catches images stored by a scanner whose cached miner set predated a
+    miner's identification. Runs as two UPDATEs comparing lowercased
+    addresses, moves the images' keywords in or out of the keyword index,
+    and returns (flagged, cleared).
+    """
+    invalidate_miner_wallets()
+    images = ArbiusImage.objects.alias(submitter=Lower('task_submitter'))
+    is_miner = _miner_filter()
+
+    to_flag = images.filter(is_miner, is_automine=False)
+    to_clear = images.filter(is_automine=True).exclude(is_miner)
+    with transaction.atomic():
+        unindex_images(gallery_keyword_images(to_flag).only(*KEYWORD_FIELDS).iterator())
+        reshown = list(to_clear.only(*KEYWORD_FIELDS))
+        flagged = to_flag.update(is_automine=True)
+        cleared = to_clear.update(is_automine=False)
+        for image in reshown:
+            image.is_automine = False
+        index_images(reshown)
+    if flagged or cleared:
+        bump_gallery_generation_on_commit()
+        logger.info(f"Automine flags synced: {flagged} images flagged, {cleared} cleared")
+    return flagged, cleared
@@ -1,10 +1,17 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from decimal import Decimal
+from datetime import timedelta
+import uuid
 
 # Create your models here.
 
+# Models whose images are shown in the gallery
+GALLERY_MODEL_IDS = [
+    '0xa473c70e9d7c872ac948d20546bc79db55fa64ca325a4b229aaffddb7f86aae0',  # Main image model only
+]
+
 class Wallet(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     address = models.CharField(max_length=42, unique=True)
@@ -37,6 +44,7 @@ class ArbiusImage(models.Model):
     # Addresses - clarified for accuracy
     solution_provider = models.CharField(max_length=42, default='0x0000000000000000000000000000000000000000', help_text="Address of the miner who provided the solution/image")
     task_submitter = models.CharField(max_length=42, null=True, blank=True, help_text="Address of the user who originally submitted the task/prompt")
+    is_automine = models.BooleanField(default=False, help_text="Submitted by a known miner wallet; kept current by the scanners (see playground.miners)")
     
     # Legacy field for backward compatibility (will be removed later)
     miner_address = models.CharField(max_length=42, null=True, blank=True, help_text="DEPRECATED: Use solution_provider instead")
@@ -48,6 +56,13 @@ class ArbiusImage(models.Model):
     is_accessible = models.BooleanField(default=True)
     last_checked = models.DateTimeField(default=timezone.now)
     ipfs_gateway = models.CharField(max_length=200, blank=True, default='')
+    next_check_at = models.DateTimeField(default=timezone.now, help_text="When the IPFS accessibility checker should look at this image again")
+    check_failures = models.PositiveIntegerField(default=0, help_text="Consecutive failed accessibility checks, drives the recheck backoff")
+    
+    # Engagement counters, kept in sync by the upvote/comment/reaction views (see rebuild_counters)
+    upvote_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    reaction_counts = models.JSONField(default=dict, blank=True, help_text="Reaction count per emoji, e.g. {\"🔥\": 3}")
     
     class Meta:
         ordering = ['-timestamp']
@@ -55,6 +70,10 @@ class ArbiusImage(models.Model):
             models.Index(fields=['-timestamp']),
             models.Index(fields=['cid']),
             models.Index(fields=['transaction_hash']),
+            models.Index(fields=['next_check_at']),
+            models.Index(fields=['is_automine', '-timestamp']),
+            models.Index(fields=['-upvote_count', '-timestamp']),
+            models.Index(fields=['-comment_count', '-timestamp']),
         ]
     
     def __str__(self):
@@ -104,32 +123,49 @@ class ArbiusImage(models.Model):
             
         return clean_text
 
-    @property
-    def upvote_count(self):
-        """Return the number of upvotes for this image"""
-        return self.upvotes.count()
-    
-    @property 
-    def comment_count(self):
-        """Return the number of comments for this image"""
-        return self.comments.count()
-    
     def has_upvoted(self, wallet_address):
         """Check if a wallet address has upvoted this image"""
         if not wallet_address:
             return False
         return self.upvotes.filter(wallet_address__iexact=wallet_address).exists()
 
-    @property
-    def reactions(self):
-        """Return a dictionary of emoji reactions for this image."""
-        from django.db.models import Count
-        reactions_data = {}
-        for emoji, _ in ImageReaction.EMOJI_CHOICES:
-            count = self.reactions.filter(emoji=emoji).count()
-            if count > 0:
-                reactions_data[emoji] = count
-        return reactions_data
+    @classmethod
+    def rebuild_counters(cls, queryset=None, batch_size=1000):
+        """
+        Recompute the engagement counters from the upvote, comment and reaction tables.
+        
+        Works through `queryset` (all images by default) in primary key
+        batches, with one grouped query per table and one bulk_update per
+        batch. Returns the number of images whose counters changed.
+        """
+        queryset = (cls.objects.all() if queryset is None else queryset).order_by('pk')
+        changed = 0
+        last_pk = 0
+        
+        while True:
+            images = list(queryset.filter(pk__gt=last_pk).only('pk', 'upvote_count', 'comment_count', 'reaction_counts')[:batch_size])
+            if not images:
+                return changed
+            last_pk = images[-1].pk
+            image_ids = [image.pk for image in images]
+            
+            upvotes = dict(
+                ImageUpvote.objects.filter(image_id__in=image_ids).values('image_id').annotate(count=models.Count('id')).values_list('image_id', 'count').order_by()
+            )
+            comments = dict(
+                ImageComment.objects.filter(image_id__in=image_ids).values('image_id').annotate(count=models.Count('id')).values_list('image_id', 'count').order_by()
+            )
+            reactions = ImageReaction.counts_for(image_ids)
+            
+            stale = []
+            for image in images:
+                counters = (upvotes.get(image.pk, 0), comments.get(image.pk, 0), reactions.get(image.pk, {}))
+                if (image.upvote_count, image.comment_count, image.reaction_counts) != counters:
+                    image.upvote_count, image.comment_count, image.reaction_counts = counters
+                    stale.append(image)
+            
+            cls.objects.bulk_update(stale, ['upvote_count', 'comment_count', 'reaction_counts'])
+            changed += len(stale)
 
 
 class UserProfile(models.Model):
@@ -244,6 +280,24 @@ class ImageReaction(models.Model):
     
     def __str__(self):
         return f"{self.emoji} reaction by {self.wallet_address[:10]}... on {self.image.short_cid}"
+    
+    @classmethod
+    def counts_for(cls, image_ids):
+        """Return {image_id: {emoji: count}} for the given images with a single grouped query"""
+        rows = cls.objects.filter(image_id__in=image_ids).values('image_id', 'emoji').annotate(
+            count=models.Count('id')
+        ).order_by()
+        
+        counts = {}
+        for row in rows:
+            counts.setdefault(row['image_id'], {})[row['emoji']] = row['count']
+        
+        # Keep the EMOJI_CHOICES display order
+        order = [emoji for emoji, _ in cls.EMOJI_CHOICES]
+        return {
+            image_id: {emoji: emojis[emoji] for emoji in order if emoji in emojis}
+            for image_id, emojis in counts.items()
+        }
 
 
 class ImageUpvote(models.Model):
@@ -263,18 +317,200 @@ class ImageUpvote(models.Model):
         return f"Upvote by {self.wallet_address[:10]}... on {self.image.short_cid}"
 
 
+class TaskRecord(models.Model):
+    """Index of submitTask calls, so solutions can be joined to their prompt without going back to the chain"""
+    
+    task_id = models.CharField(max_length=66, unique=True, help_text="Task id emitted in the TaskSubmitted event")
+    transaction_hash = models.CharField(max_length=66, help_text="Transaction that submitted the task")
+    block_number = models.BigIntegerField()
+    timestamp = models.DateTimeField()
+    
+    submitter = models.CharField(max_length=42, help_text="Owner of the task as given in the submitTask call")
+    model_id = models.CharField(max_length=66, help_text="The AI model the task was submitted to")
+    input_cid = models.CharField(max_length=100, blank=True, default='', help_text="IPFS CIDv0 of the raw task input")
+    input_parameters = models.JSONField(blank=True, null=True, help_text="Decoded JSON task input")
+    prompt = models.TextField(blank=True, null=True)
+    
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-block_number']
+        indexes = [
+            models.Index(fields=['submitter']),
+            models.Index(fields=['block_number']),
+        ]
+    
+    def __str__(self):
+        return f"Task {self.task_id[:10]}... (Block {self.block_number})"
+
+
+class PromptKeyword(models.Model):
+    """All-time keyword index over gallery prompts, maintained incrementally by the scanner (see playground.keywords)"""
+    
+    keyword = models.CharField(max_length=64, unique=True)
+    image_count = models.PositiveIntegerField(default=0, help_text="Number of gallery images whose prompt contains the keyword")
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-image_count']),
+        ]
+    
+    def __str__(self):
+        return f"{self.keyword} ({self.image_count})"
+
+
+class DailyKeywordCount(models.Model):
+    """Per-day keyword counts backing the trending keywords window"""
+    
+    day = models.DateField()
+    keyword = models.CharField(max_length=64)
+    image_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['day', 'keyword']
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.keyword} on {self.day} ({self.image_count})"
+
+
+class DailyImageStats(models.Model):
+    """Per-day image totals behind the stats dashboard, recomputed for each day the scanner or an IPFS check touches (see playground.daily_stats)"""
+    
+    day = models.DateField(unique=True)
+    image_count = models.PositiveIntegerField(default=0)
+    submitter_count = models.PositiveIntegerField(default=0, help_text="Distinct task submitters that day")
+    provider_count = models.PositiveIntegerField(default=0, help_text="Distinct solution providers that day")
+    model_counts = models.JSONField(default=dict, help_text="Images per model id")
+    submitter_sketch = models.BinaryField(default=bytes, help_text="HyperLogLog sketch of the day's task submitters (see playground.hll)")
+    provider_sketch = models.BinaryField(default=bytes, help_text="HyperLogLog sketch of the day's solution providers")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Daily image stats"
+    
+    def __str__(self):
+        return f"{self.day}: {self.image_count} images"
+
+
+class RateLimitCounter(models.Model):
+    """Attempts per client and action in a fixed window, counted in the database so every worker shares them"""
+    
+    key = models.CharField(max_length=200, unique=True, help_text="Action and client address, e.g. rate_limit:signature_verify:1.2.3.4")
+    count = models.PositiveIntegerField(default=0)
+    window_ends_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.key}: {self.count} until {self.window_ends_at}"
+    
+    @classmethod
+    def hit(cls, key, window_seconds):
+        """
+        Count one attempt against `key` and return the attempts in the current window, this one included.
+        
+        Increments with a single UPDATE, so concurrent requests never read
+        the same count. The window opens with the first attempt and lasts
+        `window_seconds`; the first attempt after it ends starts a new one.
+        """
+        now = timezone.now()
+        window_ends_at = now + timedelta(seconds=window_seconds)
+        with transaction.atomic():
+            if cls.objects.filter(key=key, window_ends_at__gt=now).update(count=models.F('count') + 1):
+                return cls.objects.values_list('count', flat=True).get(key=key)
+            if cls.objects.filter(key=key, window_ends_at__lte=now).update(count=1, window_ends_at=window_ends_at):
+                return 1
+        try:
+            with transaction.atomic():
+                cls.objects.create(key=key, count=1, window_ends_at=window_ends_at)
+        except IntegrityError:
+            # A concurrent request opened the window first
+            return cls.hit(key, window_seconds)
+        # New clients are rare enough to clear out the counters of past windows here
+        cls.objects.filter(window_ends_at__lte=now).delete()
+        return 1
+
+
+class ScanLeaseLost(Exception):
+    """Raised when a scan's lease on its ScanStatus row was taken over by another run"""
+
+
 class ScanStatus(models.Model):
     """Model to track blockchain scanning progress"""
     
+    name = models.CharField(max_length=50, unique=True, default='images', help_text="Which scan this checkpoint belongs to (e.g. images, miners)")
     last_scanned_block = models.BigIntegerField(default=0)
     last_scan_time = models.DateTimeField(default=timezone.now)
     scan_in_progress = models.BooleanField(default=False)
+    lease_owner = models.CharField(max_length=32, blank=True, default='', help_text="Token of the run currently holding the scan lease")
+    lease_expires_at = models.DateTimeField(null=True, blank=True, help_text="When the current scan lease lapses and another run may take over")
     
     class Meta:
         verbose_name_plural = "Scan statuses"
     
     def __str__(self):
-        return f"Scan Status - Last Block: {self.last_scanned_block}"
+        return f"Scan Status ({self.name}) - Last Block: {self.last_scanned_block}"
+    
+    @classmethod
+    def acquire(cls, name, lease_seconds=600):
+        """Take the scan lease for `name`, returning the status row or None if another run holds it"""
+        cls.objects.get_or_create(name=name)
+        
+        now = timezone.now()
+        owner = uuid.uuid4().hex
+        # Compare-and-set so two overlapping runs can never both take the lease
+        acquired = cls.objects.filter(name=name).filter(
+            models.Q(scan_in_progress=False) |
+            models.Q(lease_expires_at__isnull=True) |
+            models.Q(lease_expires_at__lt=now)
+        ).update(
+            scan_in_progress=True,
+            lease_owner=owner,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+        )
+        if not acquired:
+            return None
+        return cls.objects.get(name=name)
+    
+    def advance(self, block_number, lease_seconds=600):
+        """Record that everything up to block_number is scanned and renew the lease"""
+        now = timezone.now()
+        updated = ScanStatus.objects.filter(pk=self.pk, lease_owner=self.lease_owner).update(
+            last_scanned_block=block_number,
+            last_scan_time=now,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+        )
+        if not updated:
+            raise ScanLeaseLost(f"Lease on '{self.name}' scan was taken over by another run")
+        self.last_scanned_block = block_number
+        self.last_scan_time = now
+    
+    def release(self):
+        """Give up the lease if this run still holds it"""
+        ScanStatus.objects.filter(pk=self.pk, lease_owner=self.lease_owner).update(
+            scan_in_progress=False,
+            lease_owner='',
+            lease_expires_at=None,
+        )
+        self.scan_in_progress = False
+
+
+class SyncCheckpoint(models.Model):
+    """High-water mark of one source table for the delta_sync command"""
+    
+    source = models.CharField(max_length=200, help_text="Which deployment the rows come from (host and database, or file path)")
+    table = models.CharField(max_length=100, help_text="Source table name")
+    mark_column = models.CharField(max_length=50, help_text="Column the high-water mark is taken on")
+    last_value = models.CharField(max_length=64, blank=True, default='', help_text="Highest mark value synced so far, as read from the source")
+    rows_synced = models.PositiveBigIntegerField(default=0)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ['source', 'table']
+    
+    def __str__(self):
+        return f"Sync {self.source} {self.table} @ {self.last_value or '-'}"
 
 
 class MinerAddress(models.Model):
@@ -0,0 +1,95 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Gallery sort orders as (field, descending) tuples; each ends in the primary
+# key so the tuple is unique and can be used as a keyset cursor
+GALLERY_ORDERINGS = {
+    'upvotes': (('upvote_count', True), ('timestamp', True), ('id', True)),
+    'comments': (('comment_count', True), ('timestamp', True), ('id', True)),
+    'newest': (('timestamp', True), ('id', True)),
+    'oldest': (('timestamp', False), ('id', False)),
+    # Best prompt match first; needs the search_rank annotation from playground.search
+    'relevance': (('search_rank', True), ('timestamp', True), ('id', True)),
+}
+DEFAULT_GALLERY_SORT = 'upvotes'
+SEARCH_SORT = 'relevance'
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that is malformed or belongs to a different sort order"""
+
+
+def resolve_gallery_sort(sort_by, search_query=''):
+    """The sort to apply: unknown sorts, and relevance without a search, fall back to most upvoted"""
+    if sort_by not in GALLERY_ORDERINGS or (sort_by == SEARCH_SORT and not search_query):
+        return DEFAULT_GALLERY_SORT
+    return sort_by
+
+
+def gallery_ordering(sort_by):
+    """The (field, descending) tuple for a sort name, falling back to most upvoted"""
+    return GALLERY_ORDERINGS.get(sort_by, GALLERY_ORDERINGS[DEFAULT_GALLERY_SORT])
+
+
+def order_by_fields(ordering):
+    """order_by() arguments for an ordering tuple"""
+    return [f"-{field}" if descending else field for field, descending in ordering]
+
+
+def encode_cursor(sort_by, image):
+    """Opaque cursor pointing just past `image` in the given sort order"""
+    values = []
+    for field, _ in gallery_ordering(sort_by):
+        value = getattr(image, field)
+        values.append(value.isoformat() if isinstance(value, datetime) else value)
+    payload = json.dumps([sort_by, values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(sort_by, cursor):
+    """Return the sort-key values stored in a cursor, checking it matches sort_by"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, values = json.loads(payload)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+
+    ordering = gallery_ordering(sort_by)
+    if cursor_sort != sort_by or not isinstance(values, list) or len(values) != len(ordering):
+        raise InvalidCursor("Cursor does not belong to this sort order")
+
+    decoded = []
+    for (field, _), value in zip(ordering, values):
+        if field == 'timestamp':
+            value = parse_datetime(value) if isinstance(value, str) else None
+            if value is None:
+                raise InvalidCursor("Malformed cursor timestamp")
+        elif field == 'search_rank':
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise InvalidCursor("Malformed cursor search rank")
+        elif not isinstance(value, int):
+            raise InvalidCursor(f"Malformed cursor value for {field}")
+        decoded.append(value)
+    return decoded
+
+
+def keyset_filter(ordering, values):
+    """
+    Q selecting the rows that come after `values` in `ordering`.
+
+    Expands the row comparison (a, b, c) > (x, y, z) into
+    a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z), with the
+    comparison flipped for descending fields, so the database can seek on
+    the matching index instead of skipping rows with OFFSET.
+    """
+    condition = Q()
+    for position, (field, descending) in enumerate(ordering):
+        lookup = Q(**{f"{field}__{'lt' if descending else 'gt'}": values[position]})
+        for (equal_field, _), equal_value in zip(ordering[:position], values[:position]):
+            lookup &= Q(**{equal_field: equal_value})
+        condition |= lookup
+    return condition
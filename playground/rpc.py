@@ -0,0 +1,359 @@
+import asyncio
+import itertools
+import logging
+import aiohttp
+import requests
+from eth_utils import to_checksum_address
+from requests.adapters import HTTPAdapter
+from web3.datastructures import AttributeDict
+
+logger = logging.getLogger(__name__)
+
+# Block and transaction fields that arrive as hex quantities and are used as integers
+BLOCK_INT_FIELDS = ('number', 'timestamp', 'gasUsed', 'gasLimit')
+TX_INT_FIELDS = ('nonce', 'blockNumber', 'transactionIndex', 'gas', 'gasPrice', 'value')
+# Nodes return addresses lower-cased; web3 checksums them, and stored addresses have always been checksummed
+TX_ADDRESS_FIELDS = ('from', 'to')
+LOG_INT_FIELDS = ('blockNumber', 'logIndex', 'transactionIndex')
+
+# Fragments of error messages nodes return when an eth_getLogs range holds too many results
+LOG_RANGE_ERROR_MARKERS = (
+    'more than',
+    'too many',
+    'response size',
+    'limit exceeded',
+    'range too large',
+    'range is too large',
+    'block range',
+    'query timeout',
+)
+
+
+class RPCError(Exception):
+    """Error returned by the JSON-RPC endpoint for a single call or a whole batch"""
+
+    def __init__(self, message, code=None, data=None):
+        super().__init__(message)
+        self.code = code
+        self.data = data
+
+    @classmethod
+    def from_response(cls, error):
+        if not isinstance(error, dict):
+            return cls(str(error))
+        return cls(error.get('message', 'Unknown RPC error'), error.get('code'), error.get('data'))
+
+
+def _to_int(value):
+    if isinstance(value, str):
+        return int(value, 16) if value.startswith('0x') else int(value)
+    return value
+
+
+def normalize_transaction(raw):
+    """Convert a raw JSON-RPC transaction into an AttributeDict with integer quantities and checksummed addresses"""
+    tx = dict(raw)
+    for field in TX_INT_FIELDS:
+        if tx.get(field) is not None:
+            tx[field] = _to_int(tx[field])
+    for field in TX_ADDRESS_FIELDS:
+        if tx.get(field):
+            tx[field] = to_checksum_address(tx[field])
+    return AttributeDict(tx)
+
+
+def normalize_log(raw):
+    """Convert a raw JSON-RPC log entry into an AttributeDict with integer quantities"""
+    log = dict(raw)
+    for field in LOG_INT_FIELDS:
+        if log.get(field) is not None:
+            log[field] = _to_int(log[field])
+    return AttributeDict(log)
+
+
+def is_log_range_error(error):
+    """Whether an RPC error means the eth_getLogs block range should be narrowed"""
+    message = str(error).lower()
+    return getattr(error, 'code', None) == -32005 or any(marker in message for marker in LOG_RANGE_ERROR_MARKERS)
+
+
+def normalize_block(raw):
+    """Convert a raw JSON-RPC block into an AttributeDict, normalizing its transactions"""
+    block = dict(raw)
+    for field in BLOCK_INT_FIELDS:
+        if block.get(field) is not None:
+            block[field] = _to_int(block[field])
+    block['transactions'] = [
+        normalize_transaction(tx) if isinstance(tx, dict) else tx
+        for tx in block.get('transactions', [])
+    ]
+    return AttributeDict(block)
+
+
+def build_batch_payload(calls, ids):
+    """Build a JSON-RPC batch payload for a list of (method, params) calls"""
+    return [
+        {'jsonrpc': '2.0', 'id': next(ids), 'method': method, 'params': list(params)}
+        for method, params in calls
+    ]
+
+
+def parse_batch_response(payload, body):
+    """
+    Match a JSON-RPC batch response to its payload, in call order.
+
+    A call that failed on its own is returned as an RPCError instance so the
+    rest of the batch can still be used; a rejected batch raises.
+    """
+    if isinstance(body, dict):
+        # Some nodes answer a rejected batch with a single error object
+        raise RPCError.from_response(body.get('error', body))
+
+    responses = {item.get('id'): item for item in body}
+    results = []
+    for request in payload:
+        item = responses.get(request['id'])
+        if item is None:
+            results.append(RPCError(f"No response for {request['method']}"))
+        elif item.get('error') is not None:
+            results.append(RPCError.from_response(item['error']))
+        else:
+            results.append(item.get('result'))
+    return results
+
+
+def collect_results(kind, keys, results, normalize, strict=False):
+    """Normalize batch results, logging and skipping failures or raising them when strict"""
+    collected = []
+    for key, result in zip(keys, results):
+        if isinstance(result, RPCError) or result is None:
+            if strict:
+                raise RPCError(f"{kind} {key} could not be fetched: {result}")
+            logger.error(f"Error fetching {kind.lower()} {key}: {result}")
+        else:
+            collected.append(normalize(result))
+    return collected
+
+
+def block_calls(block_numbers, full_transactions):
+    return [('eth_getBlockByNumber', [hex(number), full_transactions]) for number in block_numbers]
+
+
+def transaction_calls(tx_hashes):
+    return [('eth_getTransactionByHash', [tx_hash]) for tx_hash in tx_hashes]
+
+
+def log_filter(from_block, to_block, address=None, topics=None):
+    """Build an eth_getLogs filter over from_block..to_block inclusive"""
+    params = {'fromBlock': hex(from_block), 'toBlock': hex(to_block)}
+    if address:
+        params['address'] = address
+    if topics:
+        params['topics'] = topics
+    return params
+
+
+def split_batches(items, batch_size):
+    items = list(items)
+    return [items[offset:offset + batch_size] for offset in range(0, len(items), batch_size)]
+
+
+class BatchRPCClient:
+    """JSON-RPC client that sends calls as batch requests over a pooled HTTP session"""
+
+    def __init__(self, endpoint, batch_size=50, timeout=30, session=None):
+        self.endpoint = endpoint
+        self.batch_size = max(1, batch_size)
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+
+    def call(self, method, params=None):
+        """Send a single call and return its result, raising RPCError on failure"""
+        result = self.batch([(method, params or [])])[0]
+        if isinstance(result, RPCError):
+            raise result
+        return result
+
+    def batch(self, calls):
+        """
+        Send a list of (method, params) calls as one JSON-RPC batch and
+        return the results in call order (see parse_batch_response).
+        """
+        if not calls:
+            return []
+
+        payload = build_batch_payload(calls, self._ids)
+        response = self.session.post(self.endpoint, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return parse_batch_response(payload, response.json())
+
+    def _fetch(self, kind, keys, calls, normalize, strict):
+        collected = []
+        for batch_keys, batch_calls in zip(split_batches(keys, self.batch_size), split_batches(calls, self.batch_size)):
+            try:
+                results = self.batch(batch_calls)
+            except (requests.RequestException, ValueError, RPCError) as e:
+                if strict:
+                    raise
+                logger.error(f"Error fetching {len(batch_keys)} {kind.lower()}s starting at {batch_keys[0]}: {e}")
+                continue
+            collected.extend(collect_results(kind, batch_keys, results, normalize, strict))
+        return collected
+
+    def get_blocks(self, block_numbers, full_transactions=True, strict=False):
+        """
+        Fetch blocks in batches of batch_size. Failed or missing blocks are
+        logged and skipped, or raised when strict is set.
+        """
+        block_numbers = list(block_numbers)
+        return self._fetch('Block', block_numbers, block_calls(block_numbers, full_transactions), normalize_block, strict)
+
+    def iter_block_windows(self, start_block, end_block, window=500, full_transactions=True, strict=False):
+        """
+        Yield (window_start, window_end, blocks) for consecutive windows covering
+        start_block..end_block inclusive. Each window is fetched with as many
+        batch requests as needed, so at most `window` blocks are held in memory.
+        """
+        window = max(1, window)
+        for window_start in range(start_block, end_block + 1, window):
+            window_end = min(window_start + window - 1, end_block)
+            blocks = self.get_blocks(range(window_start, window_end + 1), full_transactions, strict)
+            yield window_start, window_end, blocks
+
+    def get_transactions(self, tx_hashes, strict=False):
+        """
+        Fetch transactions by hash in batches of batch_size. Failed lookups
+        are logged and skipped, or raised when strict is set.
+        """
+        tx_hashes = list(tx_hashes)
+        return self._fetch('Transaction', tx_hashes, transaction_calls(tx_hashes), normalize_transaction, strict)
+
+    def get_logs(self, from_block, to_block, address=None, topics=None):
+        """Run a single eth_getLogs query over from_block..to_block inclusive"""
+        logs = self.call('eth_getLogs', [log_filter(from_block, to_block, address, topics)])
+        return [normalize_log(log) for log in logs or []]
+
+    def iter_logs(self, start_block, end_block, address=None, topics=None, chunk_size=5000, max_chunk_size=100000):
+        """
+        Yield (range_start, range_end, logs) covering start_block..end_block.
+
+        The block range is chunked adaptively: a chunk the node rejects for
+        returning too many results is halved and retried, and every successful
+        chunk doubles the next one up to max_chunk_size.
+        """
+        chunk_size = max(1, chunk_size)
+        cursor = start_block
+        while cursor <= end_block:
+            range_end = min(cursor + chunk_size - 1, end_block)
+            try:
+                logs = self.get_logs(cursor, range_end, address, topics)
+            except RPCError as e:
+                if chunk_size > 1 and is_log_range_error(e):
+                    chunk_size = max(1, chunk_size // 2)
+                    logger.debug(f"Narrowing log range to {chunk_size} blocks at {cursor}: {e}")
+                    continue
+                raise
+
+            yield cursor, range_end, logs
+            cursor = range_end + 1
+            chunk_size = min(chunk_size * 2, max_chunk_size)
+
+
+class AsyncBatchRPCClient:
+    """
+    asyncio counterpart of BatchRPCClient built on aiohttp.
+
+    The connector limit caps how many batch requests are in flight at once,
+    however many coroutines are fetching. Use as an async context manager.
+    """
+
+    def __init__(self, endpoint, batch_size=50, timeout=30, max_connections=8):
+        self.endpoint = endpoint
+        self.batch_size = max(1, batch_size)
+        self.timeout = timeout
+        self.max_connections = max(1, max_connections)
+        self._ids = itertools.count(1)
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+        self.session = None
+
+    async def call(self, method, params=None):
+        """Send a single call and return its result, raising RPCError on failure"""
+        result = (await self.batch([(method, params or [])]))[0]
+        if isinstance(result, RPCError):
+            raise result
+        return result
+
+    async def batch(self, calls):
+        """Send a list of (method, params) calls as one JSON-RPC batch"""
+        if not calls:
+            return []
+
+        payload = build_batch_payload(calls, self._ids)
+        async with self.session.post(self.endpoint, json=payload) as response:
+            response.raise_for_status()
+            body = await response.json(content_type=None)
+        return parse_batch_response(payload, body)
+
+    async def _fetch_batch(self, kind, keys, calls, normalize, strict):
+        try:
+            results = await self.batch(calls)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, RPCError) as e:
+            if strict:
+                raise
+            logger.error(f"Error fetching {len(keys)} {kind.lower()}s starting at {keys[0]}: {e}")
+            return []
+        return collect_results(kind, keys, results, normalize, strict)
+
+    async def _fetch(self, kind, keys, calls, normalize, strict):
+        batches = await asyncio.gather(*[
+            self._fetch_batch(kind, batch_keys, batch_calls, normalize, strict)
+            for batch_keys, batch_calls in zip(split_batches(keys, self.batch_size), split_batches(calls, self.batch_size))
+        ])
+        return [item for batch in batches for item in batch]
+
+    async def get_blocks(self, block_numbers, full_transactions=True, strict=False):
+        """Fetch blocks with concurrent batch requests, in block order"""
+        block_numbers = list(block_numbers)
+        return await self._fetch('Block', block_numbers, block_calls(block_numbers, full_transactions), normalize_block, strict)
+
+    async def get_transactions(self, tx_hashes, strict=False):
+        """Fetch transactions by hash with concurrent batch requests"""
+        tx_hashes = list(tx_hashes)
+        return await self._fetch('Transaction', tx_hashes, transaction_calls(tx_hashes), normalize_transaction, strict)
+
+    async def get_logs_adaptive(self, start_block, end_block, address=None, topics=None, chunk_size=5000, max_chunk_size=100000):
+        """Collect all logs in start_block..end_block with the same adaptive chunking as iter_logs"""
+        chunk_size = max(1, chunk_size)
+        cursor = start_block
+        logs = []
+        while cursor <= end_block:
+            range_end = min(cursor + chunk_size - 1, end_block)
+            try:
+                result = await self.call('eth_getLogs', [log_filter(cursor, range_end, address, topics)])
+            except RPCError as e:
+                if chunk_size > 1 and is_log_range_error(e):
+                    chunk_size = max(1, chunk_size // 2)
+                    continue
+                raise
+
+            logs.extend(normalize_log(log) for log in result or [])
+            cursor = range_end + 1
+            chunk_size = min(chunk_size * 2, max_chunk_size)
+        return logs
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from asgiref.sync import sync_to_async
+from .rpc import AsyncBatchRPCClient
+from .services import TASK_SUBMITTED_TOPIC
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+class ScanPipeline:
+    """
+    asyncio producer/consumer pipeline behind ArbitrumScanner's --concurrency option.
+
+    Several fetchers pull block ranges from a work queue and download them
+    concurrently, a decode stage turns fetched blocks into records, and a
+    single writer stores them one chunk at a time, in block order, so
+    checkpoints only ever advance over fully stored chunks. The stages are
+    linked by bounded queues, and a semaphore caps the number of chunks
+    between fetch and commit so fast fetchers cannot run away from the writer.
+    """
+
+    def __init__(self, scanner, decode, write, topics, strict=False, concurrency=None):
+        self.scanner = scanner
+        self.decode = decode
+        self.write = write
+        self.topics = list(topics)
+        self.strict = strict
+        self.concurrency = max(1, concurrency or scanner.concurrency)
+
+    def _ranges(self, start_block, end_block):
+        """Split start_block..end_block into numbered chunks sized for the scan mode"""
+        size = self.scanner.log_chunk_size if self.scanner.mode == 'logs' else self.scanner.window
+        size = max(1, size)
+        return [
+            (seq, chunk_start, min(chunk_start + size - 1, end_block))
+            for seq, chunk_start in enumerate(range(start_block, end_block + 1, size))
+        ]
+
+    async def run(self, start_block, end_block, results=None):
+        """Scan start_block..end_block, appending each stored chunk's results to `results`"""
+        results = [] if results is None else results
+        self.scanner.blocks_scanned = 0
+        self.scanner.scan_seconds = 0.0
+        self.started = time.monotonic()
+
+        work = asyncio.Queue()
+        for item in self._ranges(start_block, end_block):
+            work.put_nowait(item)
+        fetched = asyncio.Queue(maxsize=self.concurrency)
+        decoded = asyncio.Queue(maxsize=self.concurrency)
+        in_flight = asyncio.Semaphore(self.concurrency * 2)
+
+        client = AsyncBatchRPCClient(
+            self.scanner.rpc_url,
+            batch_size=self.scanner.rpc.batch_size,
+            timeout=self.scanner.rpc.timeout,
+            max_connections=self.concurrency,
+        )
+        async with client:
+            tasks = [
+                asyncio.create_task(self._fetch_all(client, work, fetched, in_flight)),
+                asyncio.create_task(self._decoder(fetched, decoded)),
+                asyncio.create_task(self._writer(decoded, in_flight, results)),
+            ]
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    if task.exception():
+                        raise task.exception()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.scanner.scan_seconds = time.monotonic() - self.started
+        return results
+
+    async def _fetch_all(self, client, work, fetched, in_flight):
+        await asyncio.gather(*[
+            self._fetcher(client, work, fetched, in_flight)
+            for _ in range(self.concurrency)
+        ])
+        await fetched.put(_DONE)
+
+    async def _fetcher(self, client, work, fetched, in_flight):
+        while True:
+            # Take an in-flight slot before claiming work, so the lowest
+            # uncommitted chunk always holds one and the writer can progress
+            await in_flight.acquire()
+            try:
+                seq, chunk_start, chunk_end = work.get_nowait()
+            except asyncio.QueueEmpty:
+                in_flight.release()
+                return
+
+            blocks = await self._fetch_chunk(client, chunk_start, chunk_end)
+            await fetched.put((seq, chunk_start, chunk_end, blocks))
+
+    async def _fetch_chunk(self, client, chunk_start, chunk_end):
+        scanner = self.scanner
+        if scanner.mode != 'logs':
+            blocks = await client.get_blocks(range(chunk_start, chunk_end + 1), True, strict=self.strict)
+            if TASK_SUBMITTED_TOPIC not in self.topics:
+                return blocks
+            task_logs = await client.get_logs_adaptive(
+                chunk_start,
+                chunk_end,
+                address=scanner.ENGINE_CONTRACT,
+                topics=[TASK_SUBMITTED_TOPIC],
+                chunk_size=chunk_end - chunk_start + 1,
+            )
+            return scanner._attach_logs(blocks, task_logs)
+
+        logs = await client.get_logs_adaptive(
+            chunk_start,
+            chunk_end,
+            address=scanner.ENGINE_CONTRACT,
+            topics=[self.topics],
+            chunk_size=scanner.log_chunk_size,
+            max_chunk_size=scanner.log_max_chunk_size,
+        )
+        if not logs:
+            return []
+
+        tx_hashes, block_numbers = scanner._log_targets(logs)
+        transactions, headers = await asyncio.gather(
+            client.get_transactions(tx_hashes, strict=self.strict),
+            client.get_blocks(block_numbers, False, strict=self.strict),
+        )
+        return scanner._blocks_from_logs(block_numbers, transactions, headers, logs)
+
+    async def _decoder(self, fetched, decoded):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await fetched.get()
+            if item is _DONE:
+                await decoded.put(_DONE)
+                return
+
+            seq, chunk_start, chunk_end, blocks = item
+            # Decoding is CPU work; keep it off the event loop so fetches keep flowing
+            records = await loop.run_in_executor(None, self.decode, blocks)
+            await decoded.put((seq, chunk_start, chunk_end, records))
+
+    async def _writer(self, decoded, in_flight, results):
+        write = sync_to_async(self.write, thread_sensitive=True)
+        pending = {}
+        next_seq = 0
+
+        while True:
+            item = await decoded.get()
+            if item is _DONE:
+                break
+            pending[item[0]] = item
+
+            # Commit strictly in block order so checkpoints never skip a chunk
+            while next_seq in pending:
+                _, chunk_start, chunk_end, records = pending.pop(next_seq)
+                results.extend(await write(chunk_end, records))
+                in_flight.release()
+                next_seq += 1
+
+                self.scanner.blocks_scanned += chunk_end - chunk_start + 1
+                self.scanner.scan_seconds = time.monotonic() - self.started
+                logger.debug(f"Stored blocks {chunk_start}-{chunk_end}, {self.scanner.blocks_per_second:.1f} blocks/sec")
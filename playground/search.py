@@ -0,0 +1,149 @@
+import logging
+import re
+from django.db import OperationalError, connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from .models import ArbiusImage
+
+logger = logging.getLogger(__name__)
+
+# Transaction hashes and task ids (full or prefix) and IPFS CIDv0s (full or prefix)
+HEX_QUERY = re.compile(r'^0x[0-9a-f]{4,64}$')
+CID_QUERY = re.compile(r'^Qm[1-9A-HJ-NP-Za-km-z]{2,44}$')
+FULL_HASH_LENGTH = 66
+FULL_CID_LENGTH = 46
+
+# Text search configuration of the PostgreSQL GIN index; migration 0011 holds its own copy
+SEARCH_CONFIG = 'english'
+SEARCH_TERM = re.compile(r'\w+')
+
+# SQLite FTS5 index over ArbiusImage.prompt, kept in sync by triggers (first created by migration 0011 from a copy)
+FTS_TABLE = f'{ArbiusImage._meta.db_table}_fts'
+FTS_TRIGGERS = {
+    f'{FTS_TABLE}_insert': (
+        "AFTER INSERT ON {table} BEGIN "
+        "INSERT INTO {fts}(rowid, prompt) VALUES (new.id, new.prompt); END"
+    ),
+    f'{FTS_TABLE}_delete': (
+        "AFTER DELETE ON {table} BEGIN "
+        "INSERT INTO {fts}({fts}, rowid, prompt) VALUES ('delete', old.id, old.prompt); END"
+    ),
+    f'{FTS_TABLE}_update': (
+        "AFTER UPDATE OF prompt ON {table} BEGIN "
+        "INSERT INTO {fts}({fts}, rowid, prompt) VALUES ('delete', old.id, old.prompt); "
+        "INSERT INTO {fts}(rowid, prompt) VALUES (new.id, new.prompt); END"
+    ),
+}
+
+
+def install_sqlite_fts(connection):
+    """
+    Create the FTS5 prompt index and its sync triggers on SQLite if missing.
+
+    SQLite migrations that rebuild the ArbiusImage table drop its triggers,
+    so this also runs after every migrate (see PlaygroundConfig.ready) and
+    reindexes all prompts whenever a trigger had to be recreated. Returns
+    False when the SQLite build has no FTS5.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+
+    table = ArbiusImage._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE %s", [f'{FTS_TABLE}%'])
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in FTS_TRIGGERS if name not in existing]
+        if FTS_TABLE in existing and not missing:
+            connection._playground_fts = True
+            return True
+
+        try:
+            cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(prompt, content='{table}', content_rowid='id')")
+        except OperationalError as e:
+            logger.warning(f"SQLite FTS5 unavailable, prompt search falls back to LIKE: {e}")
+            return False
+
+        for name in missing:
+            cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} " + FTS_TRIGGERS[name].format(table=table, fts=FTS_TABLE))
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+    connection._playground_fts = True
+    logger.info(f"Rebuilt SQLite FTS5 prompt index {FTS_TABLE}")
+    return True
+
+
+def _has_sqlite_fts(connection):
+    if not hasattr(connection, '_playground_fts'):
+        connection._playground_fts = FTS_TABLE in connection.introspection.table_names()
+    return connection._playground_fts
+
+
+def identifier_filter(query):
+    """
+    Q matching a transaction hash, task id or CID query on its indexed column, or None for text queries.
+
+    Full-length values are exact lookups; shorter ones are prefix lookups,
+    which PostgreSQL serves from the pattern-ops indexes Django creates for
+    indexed CharFields.
+    """
+    if CID_QUERY.match(query):
+        return Q(cid=query) if len(query) == FULL_CID_LENGTH else Q(cid__startswith=query)
+
+    query = query.lower()
+    if HEX_QUERY.match(query):
+        if len(query) == FULL_HASH_LENGTH:
+            return Q(transaction_hash=query) | Q(task_id=query)
+        return Q(transaction_hash__startswith=query) | Q(task_id__startswith=query)
+    return None
+
+
+def _postgres_prompt_search(queryset, query):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+    # Same expression as the GIN index, so the planner can use it
+    vector = SearchVector('prompt', config=SEARCH_CONFIG)
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+
+    # Words the stemmer does not match (partial words, misspellings, stop
+    # words) fall back to a substring match served by the trigram index
+    return queryset.alias(search_vector=vector).filter(
+        Q(search_vector=search_query) | Q(prompt__icontains=query)
+    ).annotate(search_rank=SearchRank(vector, search_query))
+
+
+def _sqlite_prompt_search(queryset, query):
+    terms = SEARCH_TERM.findall(query)
+    if not terms:
+        return queryset.filter(prompt__icontains=query).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    # Quoted prefix terms, so FTS5 syntax in the query is matched literally
+    match = ' '.join(f'"{term}"*' for term in terms)
+    table = ArbiusImage._meta.db_table
+    return queryset.filter(
+        id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,))
+    ).annotate(search_rank=RawSQL(
+        f"SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id",
+        (match,),
+        output_field=FloatField(),
+    ))
+
+
+def search_images(queryset, query):
+    """
+    Filter images to those matching a gallery search box query.
+
+    Hashes, task ids and CIDs go to their indexed columns; anything else is
+    a full-text prompt search (GIN on PostgreSQL, FTS5 on SQLite, LIKE
+    elsewhere). Results are annotated with search_rank, higher for better
+    prompt matches, for the relevance sort.
+    """
+    identifier = identifier_filter(query)
+    if identifier is not None:
+        return queryset.filter(identifier).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        return _postgres_prompt_search(queryset, query)
+    if connection.vendor == 'sqlite' and _has_sqlite_fts(connection):
+        return _sqlite_prompt_search(queryset, query)
+    return queryset.filter(prompt__icontains=query).annotate(search_rank=Value(0.0, output_field=FloatField()))
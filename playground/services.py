@@ -1,31 +1,233 @@
+import asyncio
 import logging
+import time
+import aiohttp
 import requests
 from web3 import Web3
+from web3.datastructures import AttributeDict
 from django.conf import settings
+from collections import Counter, OrderedDict, namedtuple
+from django.db import transaction
+from django.db.models import Case, DateTimeField, F, PositiveIntegerField, Value, When
+from django.db.models.functions import Greatest
 from django.utils import timezone
-from datetime import datetime, timedelta
-from .models import ArbiusImage, MinerAddress
+from datetime import datetime, timedelta, timezone as dt_timezone
+from .models import ArbiusImage, MinerAddress, ScanLeaseLost, ScanStatus, TaskRecord
+from .ipfs import IPFSChecker, due_images
+from .daily_stats import refresh_image_days
+from .gallery_cache import bump_gallery_generation_on_commit
+from .keywords import index_images
+from .miners import flag_automine, invalidate_miner_wallets, is_automine_submitter
+from .decoder import cid_to_string, decode_call, decode_engine_calls, decode_input_parameters, ipfs_cid_v0
+from .rpc import BatchRPCClient, RPCError
 
 logger = logging.getLogger(__name__)
 
+# Engine contract event topics used by the eth_getLogs scan mode
+SOLUTION_SUBMITTED_TOPIC = Web3.keccak(text='SolutionSubmitted(address,bytes32)').hex()
+SIGNAL_COMMITMENT_TOPIC = Web3.keccak(text='SignalCommitment(address,bytes32)').hex()
+TASK_SUBMITTED_TOPIC = Web3.keccak(text='TaskSubmitted(bytes32,bytes32,uint256,address)').hex()
+
+# Image scans need task submissions too, to join solutions to their prompts
+IMAGE_TOPICS = (SOLUTION_SUBMITTED_TOPIC, TASK_SUBMITTED_TOPIC)
+
+# Engine calls that count as miner activity, and the activity type they record
+MINER_CALLS = {'submitSolution': 'solution', 'signalCommitment': 'commitment'}
+
+SCAN_MODES = ('blocks', 'logs')
+
+# Tasks and solutions decoded from one scan chunk
+DecodedImages = namedtuple('DecodedImages', ['tasks', 'images'])
+
+# Arbitrum One produces a block roughly every 250ms
+ARBITRUM_BLOCKS_PER_SECOND = 4
+
+class MinerActivity:
+    """
+    In-memory tally of miner activity for one scan chunk.
+    
+    Solutions and commitments are counted per address along with the latest
+    time each address was seen, then written with apply() as one insert for
+    new miners and one update for known ones, instead of a row write per
+    transaction.
+    """
+    
+    def __init__(self):
+        self.solutions = Counter()
+        self.commitments = Counter()
+        self.last_seen = {}
+    
+    def __bool__(self):
+        return bool(self.last_seen)
+    
+    @property
+    def addresses(self):
+        return list(self.last_seen)
+    
+    def record(self, address, seen_at, activity_type='solution'):
+        """Count one solution or commitment by address at seen_at"""
+        if activity_type == 'solution':
+            self.solutions[address] += 1
+        elif activity_type == 'commitment':
+            self.commitments[address] += 1
+        else:
+            raise ValueError(f"Unknown miner activity type '{activity_type}'")
+        
+        if address not in self.last_seen or seen_at > self.last_seen[address]:
+            self.last_seen[address] = seen_at
+    
+    def apply(self):
+        """Upsert the tallies into MinerAddress"""
+        if not self:
+            return
+        
+        now = timezone.now()
+        addresses = self.addresses
+        known = set(MinerAddress.objects.filter(wallet_address__in=addresses).values_list('wallet_address', flat=True))
+        
+        new_miners = [address for address in addresses if address not in known]
+        MinerAddress.objects.bulk_create([
+            MinerAddress(
+                wallet_address=address,
+                first_seen=now,
+                last_seen=self.last_seen[address],
+                total_solutions=self.solutions[address],
+                total_commitments=self.commitments[address],
+                is_active=True,
+            )
+            for address in new_miners
+        ], ignore_conflicts=True)
+        
+        # bulk_create skips the MinerAddress signals, so do their work here
+        if new_miners:
+            invalidate_miner_wallets()
+            flag_automine(new_miners)
+        
+        if not known:
+            return
+        
+        def per_address(values, default, output_field):
+            return Case(
+                *[When(wallet_address=address, then=Value(values[address])) for address in known if values.get(address)],
+                default=default,
+                output_field=output_field,
+            )
+        
+        MinerAddress.objects.filter(wallet_address__in=known).update(
+            total_solutions=F('total_solutions') + per_address(self.solutions, Value(0), PositiveIntegerField()),
+            total_commitments=F('total_commitments') + per_address(self.commitments, Value(0), PositiveIntegerField()),
+            last_seen=Greatest(F('last_seen'), per_address(self.last_seen, F('last_seen'), DateTimeField())),
+            is_active=True,
+        )
+
+
+class TaskIndex:
+    """
+    Lookup of task metadata by task id for joining solutions to their tasks.
+    
+    Tasks are stored in TaskRecord as they are observed, and the most
+    recently used ones are also kept in a bounded in-memory LRU, so most
+    solutions resolve without a query and the rest with one indexed
+    task_id__in lookup per chunk.
+    """
+    
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._recent = OrderedDict()
+    
+    def __len__(self):
+        return len(self._recent)
+    
+    @staticmethod
+    def _metadata(task):
+        """The ArbiusImage fields a task provides"""
+        return {
+            'model_id': task['model_id'],
+            'prompt': task['prompt'],
+            'input_parameters': task['input_parameters'],
+            'task_submitter': task['submitter'],
+        }
+    
+    def _remember(self, task_id, metadata):
+        self._recent[task_id] = metadata
+        self._recent.move_to_end(task_id)
+        while len(self._recent) > self.max_size:
+            self._recent.popitem(last=False)
+    
+    def add(self, tasks):
+        """Store newly observed tasks (dicts of TaskRecord fields)"""
+        if not tasks:
+            return
+        
+        TaskRecord.objects.bulk_create([TaskRecord(**task) for task in tasks], batch_size=500, ignore_conflicts=True)
+        for task in tasks:
+            self._remember(task['task_id'], self._metadata(task))
+    
+    def resolve(self, task_ids):
+        """Return {task_id: metadata} for the given ids that are known"""
+        found = {}
+        missing = []
+        for task_id in set(task_ids):
+            metadata = self._recent.get(task_id)
+            if metadata is None:
+                missing.append(task_id)
+                continue
+            self._recent.move_to_end(task_id)
+            found[task_id] = metadata
+        
+        if missing:
+            stored = TaskRecord.objects.filter(task_id__in=missing).values(
+                'task_id', 'model_id', 'prompt', 'input_parameters', 'submitter',
+            )
+            for task in stored:
+                metadata = self._metadata(task)
+                self._remember(task['task_id'], metadata)
+                found[task['task_id']] = metadata
+        
+        return found
+
+
 class ArbitrumScanner:
     """Service to scan Arbitrum blockchain for Arbius images and miner activity"""
     
-    def __init__(self):
+    def __init__(self, rpc_url=None, batch_size=None, window=None, mode='blocks', concurrency=1):
         # Initialize Web3 connection to Arbitrum
-        self.w3 = Web3(Web3.HTTPProvider('https://arb1.arbitrum.io/rpc'))
+        self.rpc_url = rpc_url or getattr(settings, 'ARBITRUM_RPC_URL', 'https://arb1.arbitrum.io/rpc')
+        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
+        
+        # Batched JSON-RPC client used for bulk block fetching
+        self.rpc = BatchRPCClient(
+            self.rpc_url,
+            batch_size=batch_size or getattr(settings, 'RPC_BATCH_SIZE', 50),
+        )
+        self.window = window or getattr(settings, 'RPC_BATCH_WINDOW', 500)
+        
+        # 'blocks' walks every block; 'logs' only fetches transactions that emitted engine events
+        if mode not in SCAN_MODES:
+            raise ValueError(f"Unknown scan mode '{mode}' (expected one of {', '.join(SCAN_MODES)})")
+        self.mode = mode
+        self.log_chunk_size = getattr(settings, 'LOG_CHUNK_SIZE', 5000)
+        self.log_max_chunk_size = getattr(settings, 'LOG_MAX_CHUNK_SIZE', 100000)
+        
+        # More than one fetcher runs the scan through the asyncio pipeline (see scan_pipeline)
+        self.concurrency = max(1, concurrency)
+        
+        # Throughput of the most recent scan, reported by the management commands
+        self.blocks_scanned = 0
+        self.scan_seconds = 0.0
         
         # Arbius contract addresses (mainnet)
-        self.ENGINE_CONTRACT = '0x5FbDB2315678afecb367f032d93F642f64180aa3'  # Replace with actual contract
-        self.TASK_CONTRACT = '0x5FbDB2315678afecb367f032d93F642f64180aa3'    # Replace with actual contract
-        
-        # Known miner addresses for automine filtering
-        self.KNOWN_MINERS = [
-            '0x5e33e2cead338b1224ddd34636dac7563f97c300',
-            '0xdc790a53e50207861591622d349e989fef6f84bc',
-            '0x4d826895b255a4f38d7ba87688604c358f4132b6',
-            '0xd04c1b09576aa4310e4768d8e9cd12fac3216f95',
-        ]
+        self.ENGINE_CONTRACT = getattr(settings, 'ARBIUS_ENGINE_ADDRESS', '0x5FbDB2315678afecb367f032d93F642f64180aa3')
+        
+        # Task metadata for joining solutions to the submitTask they answer
+        self.tasks = TaskIndex(max_size=getattr(settings, 'TASK_CACHE_SIZE', 10000))
+    
+    @property
+    def blocks_per_second(self):
+        """Block throughput of the most recent scan"""
+        if not self.scan_seconds:
+            return 0.0
+        return self.blocks_scanned / self.scan_seconds
     
     def get_latest_block(self):
         """Get the latest block number"""
@@ -35,6 +237,297 @@ class ArbitrumScanner:
             logger.error(f"Error getting latest block: {e}")
             return None
     
+    def _iter_chunks(self, start_block, end_block, topics=IMAGE_TOPICS, strict=False):
+        """
+        Yield (chunk_start, chunk_end, blocks) covering start_block..end_block.
+        
+        In 'blocks' mode every block is returned with all of its transactions.
+        In 'logs' mode only blocks containing engine events matching `topics`
+        are returned, and each holds just the transactions that emitted them.
+        With strict set, any block or transaction that cannot be fetched raises
+        instead of being skipped, so a chunk is either complete or not yielded.
+        """
+        self.blocks_scanned = 0
+        self.scan_seconds = 0.0
+        started = time.monotonic()
+        
+        if self.mode == 'logs':
+            chunks = self._iter_log_chunks(start_block, end_block, list(topics), strict)
+        else:
+            chunks = self.rpc.iter_block_windows(start_block, end_block, self.window, strict=strict)
+            if TASK_SUBMITTED_TOPIC in topics:
+                chunks = self._with_task_logs(chunks)
+        
+        for chunk_start, chunk_end, blocks in chunks:
+            self.blocks_scanned += chunk_end - chunk_start + 1
+            self.scan_seconds = time.monotonic() - started
+            logger.debug(f"Scanned blocks {chunk_start}-{chunk_end} ({len(blocks)} with activity), {self.blocks_per_second:.1f} blocks/sec")
+            yield chunk_start, chunk_end, blocks
+        
+        self.scan_seconds = time.monotonic() - started
+    
+    def _with_task_logs(self, chunks):
+        """Attach each window's TaskSubmitted logs to its transactions, for the task ids"""
+        for chunk_start, chunk_end, blocks in chunks:
+            logs = [
+                log
+                for _, _, part in self.rpc.iter_logs(
+                    chunk_start, chunk_end,
+                    address=self.ENGINE_CONTRACT,
+                    topics=[TASK_SUBMITTED_TOPIC],
+                    chunk_size=chunk_end - chunk_start + 1,
+                )
+                for log in part
+            ]
+            yield chunk_start, chunk_end, self._attach_logs(blocks, logs)
+    
+    def _iter_log_chunks(self, start_block, end_block, topics, strict=False):
+        """Find engine events with eth_getLogs and fetch only the transactions behind them"""
+        log_chunks = self.rpc.iter_logs(
+            start_block,
+            end_block,
+            address=self.ENGINE_CONTRACT,
+            topics=[topics],  # OR-match on the event signature position
+            chunk_size=self.log_chunk_size,
+            max_chunk_size=self.log_max_chunk_size,
+        )
+        
+        for chunk_start, chunk_end, logs in log_chunks:
+            if not logs:
+                yield chunk_start, chunk_end, []
+                continue
+            
+            tx_hashes, block_numbers = self._log_targets(logs)
+            transactions = self.rpc.get_transactions(tx_hashes, strict=strict)
+            headers = self.rpc.get_blocks(block_numbers, full_transactions=False, strict=strict)
+            yield chunk_start, chunk_end, self._blocks_from_logs(block_numbers, transactions, headers, logs)
+    
+    @staticmethod
+    def _log_targets(logs):
+        """Distinct transaction hashes and sorted block numbers referenced by a list of logs"""
+        tx_hashes = list(dict.fromkeys(log['transactionHash'] for log in logs))
+        block_numbers = sorted({log['blockNumber'] for log in logs})
+        return tx_hashes, block_numbers
+    
+    @staticmethod
+    def _blocks_from_logs(block_numbers, transactions, headers, logs):
+        """Assemble block-shaped records holding only the transactions that emitted engine events"""
+        headers = {block.number: block for block in headers}
+        by_block = {}
+        for tx in transactions:
+            by_block.setdefault(tx.blockNumber, []).append(tx)
+        
+        blocks = [
+            AttributeDict({'number': number, 'timestamp': headers[number].timestamp, 'transactions': by_block[number]})
+            for number in block_numbers
+            if number in headers and number in by_block
+        ]
+        return ArbitrumScanner._attach_logs(blocks, logs)
+    
+    @staticmethod
+    def _attach_logs(blocks, logs):
+        """Return blocks whose transactions carry the engine logs they emitted as tx.logs"""
+        by_tx = {}
+        for log in logs:
+            by_tx.setdefault(log['transactionHash'], []).append(log)
+        if not by_tx:
+            return blocks
+        
+        attached = []
+        for block in blocks:
+            if not any(tx['hash'] in by_tx for tx in block.transactions):
+                attached.append(block)
+                continue
+            transactions = [
+                AttributeDict(dict(tx, logs=by_tx[tx['hash']])) if tx['hash'] in by_tx else tx
+                for tx in block.transactions
+            ]
+            attached.append(AttributeDict(dict(block, transactions=transactions)))
+        return attached
+    
+    def _scan_range(self, start_block, end_block, decode, store, topics=IMAGE_TOPICS,
+                    status=None, lease_seconds=None, results=None):
+        """
+        Run the decode and store stages over start_block..end_block.
+        
+        decode(blocks) turns a chunk of blocks into records without touching
+        the database; store(records) writes them and returns the results.
+        With a ScanStatus, each chunk is stored together with its checkpoint
+        advance in one transaction and fetched strictly. With concurrency > 1
+        the chunks are fetched and decoded by the asyncio pipeline, while
+        writes still happen one chunk at a time and in block order. Results
+        are appended to `results` as chunks are stored, so a caller passing
+        its own list keeps them when a later chunk fails.
+        """
+        strict = status is not None
+        results = [] if results is None else results
+        
+        def write(chunk_end, records):
+            if status is None:
+                return store(records)
+            with transaction.atomic():
+                results = store(records)
+                status.advance(chunk_end, lease_seconds)
+            return results
+        
+        if self.concurrency > 1:
+            from .scan_pipeline import ScanPipeline
+            pipeline = ScanPipeline(self, decode, write, topics=topics, strict=strict)
+            asyncio.run(pipeline.run(start_block, end_block, results))
+            return results
+        
+        for _, chunk_end, chunk in self._iter_chunks(start_block, end_block, topics, strict=strict):
+            results.extend(write(chunk_end, decode(chunk)))
+        return results
+    
+    def _scan_checkpointed(self, name, default_start, end_block, decode, store, topics=IMAGE_TOPICS,
+                           lease_seconds=None, max_blocks=None, results=None):
+        """
+        Scan from the stored ScanStatus checkpoint for `name` up to end_block.
+        
+        The ScanStatus row doubles as a lease, so overlapping runs skip instead
+        of scanning the same blocks. Each chunk's writes and the checkpoint
+        advance are committed in one transaction: after a crash the next run
+        resumes at the first uncommitted chunk, so blocks are neither scanned
+        twice nor skipped. A run whose lease expired and was taken over stops
+        at its last committed chunk. default_start is used when no checkpoint
+        exists yet. As with _scan_range, stored results are appended to
+        `results` when one is passed.
+        """
+        results = [] if results is None else results
+        lease_seconds = lease_seconds or getattr(settings, 'SCAN_LEASE_SECONDS', 600)
+        status = ScanStatus.acquire(name, lease_seconds)
+        if status is None:
+            logger.info(f"Scan '{name}' is already running in another process, skipping this run")
+            return results
+        
+        try:
+            start_block = status.last_scanned_block + 1 if status.last_scanned_block else default_start
+            if max_blocks:
+                end_block = min(end_block, start_block + max_blocks - 1)
+            if start_block > end_block:
+                logger.info(f"Scan '{name}' is up to date at block {status.last_scanned_block}")
+                return results
+            
+            logger.info(f"Scanning '{name}' from checkpoint: blocks {start_block} to {end_block}")
+            self._scan_range(
+                start_block, end_block, decode, store, topics,
+                status=status, lease_seconds=lease_seconds, results=results,
+            )
+        
+        except (requests.RequestException, aiohttp.ClientError, asyncio.TimeoutError, RPCError, ValueError) as e:
+            logger.error(f"Scan '{name}' stopped after block {status.last_scanned_block}, next run resumes there: {e}")
+        except ScanLeaseLost as e:
+            # The chunk being stored was rolled back with its checkpoint; the new lease holder carries on from there
+            logger.warning(f"{e}, stopping after block {status.last_scanned_block}")
+        finally:
+            status.release()
+        
+        return results
+    
+    def _decode_image_blocks(self, blocks):
+        """Extract task submissions and image records from a list of blocks"""
+        tasks = []
+        images = []
+        
+        for block in blocks:
+            try:
+                for tx, call in decode_engine_calls(block.transactions, self.ENGINE_CONTRACT, names=('submitTask', 'submitSolution')):
+                    if call.name == 'submitTask':
+                        task_data = self._extract_task_data(tx, block, call)
+                        if task_data:
+                            tasks.append(task_data)
+                    else:
+                        image_data = self._extract_image_data(tx, block, call)
+                        if image_data:
+                            images.append(image_data)
+            
+            except Exception as e:
+                logger.error(f"Error scanning block {block.number}: {e}")
+                continue
+        
+        return DecodedImages(tasks, images)
+    
+    def _store_images(self, decoded, require_prompt=False):
+        """
+        Index a chunk's tasks, insert its new images in bulk and return them.
+        
+        Tasks are added to the task index first, so solutions in the same
+        chunk resolve against them. Each image's prompt, model and submitter
+        come from the task index; with require_prompt, images whose task is
+        unknown or has no prompt are skipped. Existing hashes are found with a
+        single transaction_hash__in lookup, new rows are written with
+        bulk_create, their prompts are added to the keyword index and the
+        solution providers' activity is applied as one MinerActivity upsert,
+        all in one transaction. The days' dashboard stats are left to the
+        scan methods, which recount each touched day once per run. Returned
+        images come from bulk_create and carry no primary key.
+        """
+        tasks, records = decoded
+        if not tasks and not records:
+            return []
+        
+        # The same solution can show up twice in a chunk when ranges overlap
+        by_hash = {image_data['transaction_hash']: image_data for image_data in records}
+        
+        with transaction.atomic():
+            self.tasks.add(tasks)
+            if not by_hash:
+                return []
+            
+            resolved = self.tasks.resolve(image_data['task_id'] for image_data in by_hash.values())
+            for image_data in by_hash.values():
+                image_data.update(resolved.get(image_data['task_id'], {}))
+            
+            existing = set(
+                ArbiusImage.objects.filter(transaction_hash__in=list(by_hash)).values_list('transaction_hash', flat=True)
+            )
+            new_images = [
+                ArbiusImage(**image_data, is_automine=is_automine_submitter(image_data.get('task_submitter')))
+                for tx_hash, image_data in by_hash.items()
+                if tx_hash not in existing and (image_data.get('prompt') or not require_prompt)
+            ]
+            if not new_images:
+                return []
+            
+            ArbiusImage.objects.bulk_create(new_images, batch_size=500, ignore_conflicts=True)
+            index_images(new_images)
+            bump_gallery_generation_on_commit()
+            
+            activity = MinerActivity()
+            for image in new_images:
+                activity.record(image.solution_provider, image.timestamp)
+            activity.apply()
+        
+        for image in new_images:
+            logger.info(f"Found new image: {image.transaction_hash}")
+        return new_images
+    
+    def _decode_miner_blocks(self, blocks):
+        """Tally solutions and commitments per miner across a list of blocks"""
+        activity = MinerActivity()
+        
+        for block in blocks:
+            try:
+                seen_at = datetime.fromtimestamp(block.timestamp, tz=dt_timezone.utc)
+                for tx, call in decode_engine_calls(block.transactions, self.ENGINE_CONTRACT, names=MINER_CALLS):
+                    activity_type = MINER_CALLS[call.name]
+                    miner_address = self._extract_miner_address(tx)
+                    if miner_address:
+                        activity.record(miner_address, seen_at, activity_type)
+            
+            except Exception as e:
+                logger.error(f"Error scanning block {block.number} for miners: {e}")
+                continue
+        
+        return activity
+    
+    def _store_miner_activity(self, activity):
+        """Apply a chunk's miner tallies and return the addresses seen"""
+        with transaction.atomic():
+            activity.apply()
+        return activity.addresses
+    
     def scan_recent_blocks(self, blocks=100):
         """Scan recent blocks for new images"""
         latest_block = self.get_latest_block()
@@ -45,142 +538,107 @@ class ArbitrumScanner:
         logger.info(f"Scanning blocks {start_block} to {latest_block}")
         
         new_images = []
+        try:
+            self._scan_range(start_block, latest_block, self._decode_image_blocks, self._store_images, results=new_images)
+        finally:
+            # Once per run rather than per chunk; also covers the chunks stored before a failure
+            refresh_image_days(new_images)
         
-        for block_num in range(start_block, latest_block + 1):
-            try:
-                block = self.w3.eth.get_block(block_num, full_transactions=True)
-                
-                for tx in block.transactions:
-                    # Check if this is a solution submission
-                    if self._is_solution_submission(tx):
-                        image_data = self._extract_image_data(tx, block_num)
-                        if image_data:
-                            # Check if image already exists
-                            if not ArbiusImage.objects.filter(transaction_hash=image_data['transaction_hash']).exists():
-                                # Create new image
-                                image = ArbiusImage.objects.create(**image_data)
-                                new_images.append(image)
-                                logger.info(f"Found new image: {image.transaction_hash}")
-                                
-                                # Update miner activity
-                                self._update_miner_activity(image.solution_provider)
-                
-            except Exception as e:
-                logger.error(f"Error scanning block {block_num}: {e}")
-                continue
-        
-        logger.info(f"Scan complete. Found {len(new_images)} new images")
+        logger.info(f"Scan complete. Found {len(new_images)} new images ({self.blocks_per_second:.1f} blocks/sec)")
         return new_images
     
-    def scan_recent_minutes(self, minutes=10):
-        """Scan recent minutes for new images with prompts"""
+    def scan_recent_minutes(self, minutes=10, checkpoint=None, lease_seconds=None, max_blocks=None):
+        """
+        Scan recent minutes for new images with prompts.
+        
+        With a checkpoint name the scan resumes from that ScanStatus row and
+        `minutes` only sizes the first run, before any checkpoint exists.
+        """
         latest_block = self.get_latest_block()
         if not latest_block:
             return []
         
-        # Estimate blocks per minute (roughly 1 block per 12 seconds)
-        blocks_per_minute = 5
-        blocks_to_scan = minutes * blocks_per_minute
-        
+        blocks_to_scan = minutes * 60 * ARBITRUM_BLOCKS_PER_SECOND
         start_block = max(0, latest_block - blocks_to_scan)
-        logger.info(f"Scanning last {minutes} minutes (blocks {start_block} to {latest_block})")
         
-        new_images = []
+        def store(decoded):
+            return self._store_images(decoded, require_prompt=True)
         
-        for block_num in range(start_block, latest_block + 1):
-            try:
-                block = self.w3.eth.get_block(block_num, full_transactions=True)
-                
-                for tx in block.transactions:
-                    if self._is_solution_submission(tx):
-                        image_data = self._extract_image_data(tx, block_num)
-                        if image_data and image_data.get('prompt'):
-                            # Only process images with prompts
-                            if not ArbiusImage.objects.filter(transaction_hash=image_data['transaction_hash']).exists():
-                                image = ArbiusImage.objects.create(**image_data)
-                                new_images.append(image)
-                                logger.info(f"Found new image with prompt: {image.transaction_hash}")
-                                
-                                # Update miner activity
-                                self._update_miner_activity(image.solution_provider)
-                
-            except Exception as e:
-                logger.error(f"Error scanning block {block_num}: {e}")
-                continue
+        new_images = []
+        try:
+            if checkpoint:
+                self._scan_checkpointed(
+                    checkpoint, start_block, latest_block, self._decode_image_blocks, store,
+                    lease_seconds=lease_seconds, max_blocks=max_blocks, results=new_images,
+                )
+            else:
+                logger.info(f"Scanning last {minutes} minutes (blocks {start_block} to {latest_block})")
+                self._scan_range(start_block, latest_block, self._decode_image_blocks, store, results=new_images)
+        finally:
+            refresh_image_days(new_images)
         
-        logger.info(f"Recent scan complete. Found {len(new_images)} new images with prompts")
+        logger.info(f"Recent scan complete. Found {len(new_images)} new images with prompts ({self.blocks_per_second:.1f} blocks/sec)")
         return new_images
     
-    def scan_for_miners(self, hours_back=1, mark_inactive=False):
-        """Scan for miner activity and update miner database"""
+    def scan_for_miners(self, hours_back=1, mark_inactive=False, checkpoint=None, lease_seconds=None, max_blocks=None):
+        """
+        Scan for miner activity and update miner database.
+        
+        With a checkpoint name the scan resumes from that ScanStatus row and
+        `hours_back` only sizes the first run, before any checkpoint exists.
+        """
         latest_block = self.get_latest_block()
         if not latest_block:
             return []
         
-        # Estimate blocks per hour
-        blocks_per_hour = 300  # ~5 blocks per minute
-        blocks_to_scan = hours_back * blocks_per_hour
-        
+        blocks_to_scan = hours_back * 3600 * ARBITRUM_BLOCKS_PER_SECOND
         start_block = max(0, latest_block - blocks_to_scan)
-        logger.info(f"Scanning for miners in blocks {start_block} to {latest_block}")
+        miner_topics = (SOLUTION_SUBMITTED_TOPIC, SIGNAL_COMMITMENT_TOPIC)
         
-        found_miners = []
-        
-        for block_num in range(start_block, latest_block + 1):
-            try:
-                block = self.w3.eth.get_block(block_num, full_transactions=True)
-                
-                for tx in block.transactions:
-                    if self._is_solution_submission(tx):
-                        miner_address = self._extract_miner_address(tx)
-                        if miner_address:
-                            found_miners.append(miner_address)
-                            self._update_miner_activity(miner_address)
-                
-            except Exception as e:
-                logger.error(f"Error scanning block {block_num} for miners: {e}")
-                continue
+        if checkpoint:
+            found_miners = self._scan_checkpointed(
+                checkpoint, start_block, latest_block, self._decode_miner_blocks, self._store_miner_activity,
+                topics=miner_topics, lease_seconds=lease_seconds, max_blocks=max_blocks,
+            )
+        else:
+            logger.info(f"Scanning for miners in blocks {start_block} to {latest_block}")
+            found_miners = self._scan_range(
+                start_block, latest_block, self._decode_miner_blocks, self._store_miner_activity, topics=miner_topics,
+            )
         
         # Mark inactive miners if requested
         if mark_inactive:
             self._mark_inactive_miners()
         
-        logger.info(f"Miner scan complete. Found {len(set(found_miners))} unique miners")
+        logger.info(f"Miner scan complete. Found {len(set(found_miners))} unique miners ({self.blocks_per_second:.1f} blocks/sec)")
         return list(set(found_miners))
     
-    def _is_solution_submission(self, tx):
-        """Check if transaction is a solution submission to the engine contract"""
-        try:
-            # Check if transaction is to the engine contract
-            if tx.to and tx.to.lower() == self.ENGINE_CONTRACT.lower():
-                # Check if it's a submitSolution call
-                if tx.input and len(tx.input) > 10:
-                    # This is a simplified check - in reality you'd decode the function call
-                    return True
-            return False
-        except Exception as e:
-            logger.error(f"Error checking solution submission: {e}")
-            return False
-    
-    def _extract_image_data(self, tx, block_num):
-        """Extract image data from transaction"""
+    def _extract_image_data(self, tx, block, call=None):
+        """
+        Build an image record from a submitSolution transaction.
+        
+        `call` is the already decoded calldata when the caller has it. Task
+        details (prompt, model, submitter) are not part of the solution
+        calldata; they are filled from the task index when the chunk is stored.
+        """
         try:
-            # This is a simplified extraction - in reality you'd decode the transaction data
-            # and fetch the actual image data from IPFS
+            call = call or decode_call(tx.input)
+            if call is None or call.name != 'submitSolution':
+                return None
             
-            # Mock data for demonstration
+            cid = cid_to_string(call.args['cid'])
             image_data = {
-                'transaction_hash': tx.hash.hex(),
-                'task_id': f"task_{block_num}_{tx.nonce}",
-                'block_number': block_num,
-                'timestamp': datetime.fromtimestamp(tx.timestamp),
-                'cid': f"QmMock{block_num}{tx.nonce}",
-                'ipfs_url': f"https://ipfs.io/ipfs/QmMock{block_num}{tx.nonce}",
-                'image_url': f"https://ipfs.io/ipfs/QmMock{block_num}{tx.nonce}/out-1.png",
-                'model_id': '0xa473c70e9d7c872ac948d20546bc79db55fa64ca325a4b229aaffddb7f86aae0',
-                'prompt': f"Generated image from block {block_num}",
+                'transaction_hash': tx.hash,
+                'task_id': call.args['taskid'],
+                'block_number': block.number,
+                'timestamp': datetime.fromtimestamp(block.timestamp, tz=dt_timezone.utc),
+                'cid': cid,
+                'ipfs_url': f"https://ipfs.io/ipfs/{cid}",
+                'image_url': f"https://ipfs.io/ipfs/{cid}/out-1.png",
+                'model_id': None,
+                'prompt': None,
                 'solution_provider': tx['from'],
-                'task_submitter': tx['from'],  # Simplified - would be extracted from transaction data
+                'task_submitter': None,
                 'is_accessible': True,
             }
             
@@ -190,6 +648,31 @@ class ArbitrumScanner:
             logger.error(f"Error extracting image data: {e}")
             return None
     
+    def _extract_task_data(self, tx, block, call):
+        """Build a TaskRecord's fields from a submitTask transaction and its TaskSubmitted log"""
+        # The task id is assigned by the contract and only appears in the event
+        task_id = next(
+            (log['topics'][1] for log in tx.get('logs', ()) if log['topics'][:1] == [TASK_SUBMITTED_TOPIC]),
+            None,
+        )
+        if not task_id:
+            logger.debug(f"No TaskSubmitted log for task transaction {tx.hash}")
+            return None
+        
+        task_input = call.args['input']
+        parameters = decode_input_parameters(task_input)
+        return {
+            'task_id': task_id,
+            'transaction_hash': tx.hash,
+            'block_number': block.number,
+            'timestamp': datetime.fromtimestamp(block.timestamp, tz=dt_timezone.utc),
+            'submitter': call.args['owner'],
+            'model_id': call.args['model'],
+            'input_cid': ipfs_cid_v0(task_input),
+            'input_parameters': parameters,
+            'prompt': parameters.get('prompt') if parameters else None,
+        }
+    
     def _extract_miner_address(self, tx):
         """Extract miner address from transaction"""
         try:
@@ -198,29 +681,6 @@ class ArbitrumScanner:
             logger.error(f"Error extracting miner address: {e}")
             return None
     
-    def _update_miner_activity(self, miner_address):
-        """Update miner activity in database"""
-        try:
-            miner, created = MinerAddress.objects.get_or_create(
-                wallet_address=miner_address,
-                defaults={
-                    'first_seen': timezone.now(),
-                    'last_seen': timezone.now(),
-                    'total_solutions': 1,
-                    'is_active': True,
-                }
-            )
-            
-            if not created:
-                # Update existing miner
-                miner.last_seen = timezone.now()
-                miner.total_solutions += 1
-                miner.is_active = True
-                miner.save(update_fields=['last_seen', 'total_solutions', 'is_active'])
-                
-        except Exception as e:
-            logger.error(f"Error updating miner activity: {e}")
-    
     def _mark_inactive_miners(self):
         """Mark miners as inactive if not seen for 7+ days"""
         try:
@@ -237,29 +697,12 @@ class ArbitrumScanner:
             logger.error(f"Error marking inactive miners: {e}")
     
     def recheck_accessibility(self, batch_size=50):
-        """Recheck IPFS accessibility for images marked as not accessible"""
+        """Recheck IPFS accessibility for inaccessible images that are due, most overdue first"""
         try:
-            inaccessible_images = ArbiusImage.objects.filter(
-                is_accessible=False
-            )[:batch_size]
-            
-            updated_count = 0
-            for image in inaccessible_images:
-                try:
-                    # Check if image is accessible
-                    response = requests.head(image.image_url, timeout=5)
-                    if response.status_code == 200:
-                        image.is_accessible = True
-                        image.last_checked = timezone.now()
-                        image.save(update_fields=['is_accessible', 'last_checked'])
-                        updated_count += 1
-                        
-                except Exception as e:
-                    logger.debug(f"Image {image.cid} still not accessible: {e}")
-                    continue
+            inaccessible_images = due_images(ArbiusImage.objects.filter(is_accessible=False))[:batch_size]
             
-            return updated_count
+            return IPFSChecker().check_images(inaccessible_images)
             
         except Exception as e:
             logger.error(f"Error rechecking accessibility: {e}")
-            return 0 
\ No newline at end of file
+            return 0 
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .miners import flag_automine, invalidate_miner_wallets, unflag_automine
+from .models import MinerAddress
+
+
+@receiver(post_save, sender=MinerAddress)
+def miner_saved(sender, instance, created, **kwargs):
+    """Flag a new miner's existing images as automine"""
+    invalidate_miner_wallets()
+    if created:
+        flag_automine([instance.wallet_address])
+
+
+@receiver(post_delete, sender=MinerAddress)
+def miner_deleted(sender, instance, **kwargs):
+    """Show a removed miner's images again"""
+    invalidate_miner_wallets()
+    unflag_automine([instance.wallet_address])
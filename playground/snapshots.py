@@ -0,0 +1,242 @@
+"""
+Compact gallery snapshots for export_gallery and import_gallery.
+
+A snapshot is a directory of gzip chunk files plus manifest.json. Each
+chunk holds one table: its first line is the JSON list of column names,
+every following line the JSON list of one row's values, so field names
+are written once per chunk instead of once per row. Each export appends
+new chunks holding the rows stored since the previous one, tracked by
+id in the manifest, so a snapshot grows with the chain. Votes, comments
+and reactions point at their image by transaction hash, which makes
+them independent of local ids.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import date, datetime
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from .bulk_import import ImportProgress, batched, insert_batch, model_from_row, upsert_batch
+from .models import ArbiusImage, ImageComment, ImageReaction, ImageUpvote
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 'arbius-gallery-snapshot'
+VERSION = 1
+MANIFEST = 'manifest.json'
+
+IMAGE_COLUMNS = (
+    'transaction_hash', 'task_id', 'block_number', 'timestamp', 'cid', 'ipfs_url', 'image_url', 'model_id',
+    'prompt', 'input_parameters', 'solution_provider', 'task_submitter', 'miner_address', 'owner_address',
+    'gas_used', 'discovered_at', 'is_accessible', 'last_checked', 'ipfs_gateway',
+)
+
+# Snapshot table -> (model, columns after the image's transaction hash, fields identifying a row)
+RELATED_TABLES = {
+    'upvotes': (ImageUpvote, ('wallet_address', 'created_at'), None),
+    'comments': (ImageComment, ('wallet_address', 'content', 'created_at', 'updated_at'), ('image_id', 'wallet_address', 'content')),
+    'reactions': (ImageReaction, ('wallet_address', 'emoji', 'created_at'), None),
+}
+
+
+class SnapshotError(Exception):
+    """Raised for a snapshot directory that can't be read: missing or foreign manifest, or a corrupt chunk"""
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(directory):
+    """The manifest of a snapshot directory, or None if there is none yet"""
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT or manifest.get('version') != VERSION:
+        raise SnapshotError(f'{path} is not a version {VERSION} gallery snapshot manifest')
+    return manifest
+
+
+def _write_manifest(directory, manifest):
+    # Written aside and renamed, so an interrupted export leaves the previous manifest intact
+    path = os.path.join(directory, MANIFEST)
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f'{path}.tmp', path)
+
+
+class ChunkWriter:
+    """Writes the rows of one table to numbered chunk files of at most `chunk_rows` rows"""
+
+    def __init__(self, directory, manifest, table, columns, chunk_rows):
+        self.directory = directory
+        self.manifest = manifest
+        self.table = table
+        self.columns = list(columns)
+        self.chunk_rows = chunk_rows
+        self.rows = 0
+
+    def write(self, rows, block_of=None):
+        """Write an iterable of value tuples; `block_of` gives the block number of a row for the chunk's range"""
+        for chunk in batched(rows, self.chunk_rows):
+            name = f'{self.table}-{len(self.manifest["chunks"]) + 1:06d}.jsonl.gz'
+            path = os.path.join(self.directory, name)
+            with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as f:
+                f.write(json.dumps(self.columns) + '\n')
+                for row in chunk:
+                    f.write(json.dumps(row, default=_encode, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+            entry = {'file': name, 'table': self.table, 'rows': len(chunk), 'sha256': _sha256(path)}
+            if block_of:
+                entry['first_block'] = block_of(chunk[0])
+                entry['last_block'] = block_of(chunk[-1])
+            self.manifest['chunks'].append(entry)
+            self.rows += len(chunk)
+        return self.rows
+
+
+def export_snapshot(directory, from_block=None, to_block=None, chunk_rows=100000, write=None):
+    """
+    Append images and their engagement to a snapshot directory.
+
+    Without a block range, the export appends every row stored since the
+    previous export, by id, so images backfilled into old blocks are
+    picked up too. With `from_block` and/or `to_block` it appends the
+    images of that block range (from the first block to the newest image
+    by default) and leaves the id marks alone. Votes, comments and
+    reactions are exported for the exported images plus, when appending,
+    every one stored since the previous export. Returns the number of
+    rows written per table.
+    """
+    write = write or (lambda line: None)
+    os.makedirs(directory, exist_ok=True)
+    manifest = read_manifest(directory) or {'format': FORMAT, 'version': VERSION, 'last_block': None, 'exports': [], 'chunks': []}
+    # Highest id exported per table; a manifest without marks is exported in full once
+    last_ids = manifest.setdefault('last_ids', {})
+    exported_at = timezone.now()
+    incremental = from_block is None and to_block is None
+
+    if incremental:
+        # Taken up front, so rows stored while the export runs are left for the next one
+        upper_ids = {'images': ArbiusImage.objects.aggregate(last=Max('id'))['last'] or 0}
+        for table, (model, _, _) in RELATED_TABLES.items():
+            upper_ids[table] = model.objects.aggregate(last=Max('id'))['last'] or 0
+        if all(upper_ids[table] <= last_ids.get(table, 0) for table in upper_ids):
+            write('   Nothing new to export')
+            return {}
+        selected = Q(id__gt=last_ids.get('images', 0), id__lte=upper_ids['images'])
+        order = ('id',)
+    else:
+        from_block = from_block or 0
+        if to_block is None:
+            to_block = ArbiusImage.objects.aggregate(last=Max('block_number'))['last']
+        if to_block is None or to_block < from_block:
+            write('   No blocks to export')
+            return {}
+        selected = Q(block_number__gte=from_block, block_number__lte=to_block)
+        order = ('block_number', 'id')
+
+    counts = {}
+    images = ArbiusImage.objects.filter(selected)
+    writer = ChunkWriter(directory, manifest, 'images', IMAGE_COLUMNS, chunk_rows)
+    block_index = IMAGE_COLUMNS.index('block_number')
+    counts['images'] = writer.write(
+        images.order_by(*order).values_list(*IMAGE_COLUMNS).iterator(chunk_size=2000),
+        block_of=lambda row: row[block_index],
+    )
+    blocks = images.aggregate(first=Min('block_number'), last=Max('block_number'))
+
+    for table, (model, columns, _) in RELATED_TABLES.items():
+        related = Q(image__in=images)
+        if incremental:
+            related |= Q(id__gt=last_ids.get(table, 0), id__lte=upper_ids[table])
+        rows = model.objects.filter(related).order_by('id').values_list('image__transaction_hash', *columns)
+        writer = ChunkWriter(directory, manifest, table, ('transaction_hash',) + columns, chunk_rows)
+        counts[table] = writer.write(rows.iterator(chunk_size=2000))
+
+    if incremental:
+        last_ids.update(upper_ids)
+    if blocks['last'] is not None:
+        manifest['last_block'] = max(blocks['last'], manifest['last_block'] or 0)
+    manifest['exports'].append({
+        'from_block': blocks['first'] if incremental else from_block,
+        'to_block': blocks['last'] if incremental else to_block,
+        'exported_at': exported_at.isoformat(),
+        'rows': counts,
+    })
+    _write_manifest(directory, manifest)
+    logger.info(f"Exported to {directory}: {counts}")
+    return counts
+
+
+def iter_chunk(directory, entry, verify=True):
+    """Yield the rows of one chunk as dicts, streaming the gzip file"""
+    path = os.path.join(directory, entry['file'])
+    if verify and _sha256(path) != entry['sha256']:
+        raise SnapshotError(f'{entry["file"]} does not match its manifest checksum')
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        columns = json.loads(f.readline())
+        for line in f:
+            yield dict(zip(columns, json.loads(line)))
+
+
+def import_snapshot(directory, batch_size=1000, verify=True, write=None):
+    """
+    Load every chunk of a snapshot directory; returns the number of rows read per table.
+
+    Images are upserted on transaction_hash, so a newer snapshot updates
+    accessibility and the like; engagement rows are inserted unless they
+    already exist. Rows whose image is in neither the snapshot nor the
+    database are skipped.
+    """
+    write = write or (lambda line: None)
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise SnapshotError(f'No {MANIFEST} in {directory}')
+
+    update_fields = [column for column in IMAGE_COLUMNS if column != 'transaction_hash']
+    counts = {}
+    skipped = 0
+
+    for entry in manifest['chunks']:
+        table = entry['table']
+        progress = ImportProgress(entry['file'], write, total=entry['rows'])
+        for batch in batched(iter_chunk(directory, entry, verify=verify), batch_size):
+            if table == 'images':
+                upsert_batch(ArbiusImage, [
+                    model_from_row(ArbiusImage, row, input_parameters=dict) for row in batch
+                ], ('transaction_hash',), update_fields)
+            else:
+                model, _, match_fields = RELATED_TABLES[table]
+                image_ids = dict(ArbiusImage.objects.filter(
+                    transaction_hash__in={row['transaction_hash'] for row in batch}
+                ).values_list('transaction_hash', 'id'))
+                objects = []
+                for row in batch:
+                    image_id = image_ids.get(row['transaction_hash'])
+                    if image_id is None:
+                        skipped += 1
+                        continue
+                    objects.append(model_from_row(model, {**row, 'image_id': image_id}))
+                if objects:
+                    insert_batch(model, objects, match_fields=match_fields)
+            progress.advance(len(batch))
+        counts[table] = counts.get(table, 0) + progress.finish()
+
+    if skipped:
+        write(f'   Skipped {skipped} votes, comments and reactions of images missing from the snapshot')
+    return counts
@@ -1,3 +1,1611 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from arbius_playground import cache_url
+from .bulk_import import iter_json_array, load_fixture
+from .daily_stats import distinct_addresses, exact_distinct_addresses, images_since, rebuild_daily_stats, refresh_daily_stats, refresh_image_days
+from .decoder import cid_to_string, decode_call, decode_engine_calls, decode_input_parameters, ipfs_cid_v0
+from .gallery_cache import bump_gallery_generation
+from .hll import HyperLogLog
+from .ipfs import IPFSChecker, due_images
+from .keywords import index_images, rebuild_keyword_index, top_keywords
+from .miners import is_automine_submitter, sync_automine_flags
+from .models import ArbiusImage, DailyImageStats, DailyKeywordCount, ImageComment, ImageReaction, ImageUpvote, MinerAddress, PromptKeyword, RateLimitCounter, ScanStatus, SyncCheckpoint, TaskRecord
+from .rpc import BatchRPCClient, RPCError, is_log_range_error
+from .scan_pipeline import ScanPipeline
+from .services import IMAGE_TOPICS, SOLUTION_SUBMITTED_TOPIC, TASK_SUBMITTED_TOPIC, ArbitrumScanner, MinerActivity, TaskIndex
+from .snapshots import export_snapshot, import_snapshot, read_manifest
+from .views import MAX_SIGNATURE_ATTEMPTS, check_rate_limit
 
-# Create your tests here.
+MAIN_MODEL_ID = '0xa473c70e9d7c872ac948d20546bc79db55fa64ca325a4b229aaffddb7f86aae0'
+
+
+# Database cache backends would count their own queries against the budget
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class GalleryImagesApiQueryTests(TestCase):
+    """The infinite-scroll API must not issue queries per image"""
+
+    # Count and page, plus some headroom
+    QUERY_BUDGET = 6
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        for i in range(30):
+            image = ArbiusImage.objects.create(
+                transaction_hash=f"0x{i:064x}",
+                task_id=f"0x{i + 1000:064x}",
+                block_number=1000 + i,
+                timestamp=now - timedelta(minutes=i),
+                cid=f"QmTest{i}",
+                ipfs_url=f"https://ipfs.io/ipfs/QmTest{i}",
+                image_url=f"https://ipfs.io/ipfs/QmTest{i}/out-1.png",
+                model_id=MAIN_MODEL_ID,
+                prompt=f"test prompt {i}",
+                task_submitter=f"0x{i:040x}",
+            )
+            for voter in range(i % 4):
+                ImageUpvote.objects.create(image=image, wallet_address=f"0x{voter + 1:040x}")
+            for commenter in range(i % 3):
+                ImageComment.objects.create(image=image, wallet_address=f"0x{commenter + 1:040x}", content='nice')
+            for emoji, _ in ImageReaction.EMOJI_CHOICES[:i % 5]:
+                ImageReaction.objects.create(image=image, wallet_address=f"0x{1:040x}", emoji=emoji)
+
+        ArbiusImage.rebuild_counters()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_page_stays_within_query_budget(self):
+        for params in ({}, {'sort': 'comments'}, {'sort': 'newest', 'exclude_automine': 'true'}):
+            with self.subTest(params=params):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse('gallery_images_api'), params)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['images']), 20)
+                self.assertLessEqual(len(queries), self.QUERY_BUDGET, [query['sql'] for query in queries])
+
+    def test_counts_match_related_rows(self):
+        response = self.client.get(reverse('gallery_images_api'), {'sort': 'newest'})
+
+        for data in response.json()['images']:
+            image = ArbiusImage.objects.get(pk=data['id'])
+            self.assertEqual(data['upvote_count'], image.upvotes.count())
+            self.assertEqual(data['comment_count'], image.comments.count())
+            self.assertEqual(data['reactions'], {
+                emoji: image.reactions.filter(emoji=emoji).count()
+                for emoji, _ in ImageReaction.EMOJI_CHOICES
+                if image.reactions.filter(emoji=emoji).exists()
+            })
+            self.assertFalse(data['is_upvoted'])
+
+    def test_cursor_pages_walk_the_gallery_in_order(self):
+        for sort_by in ('upvotes', 'comments', 'newest', 'oldest'):
+            with self.subTest(sort=sort_by):
+                seen = []
+                cursor = ''
+                while True:
+                    with CaptureQueriesContext(connection) as queries:
+                        response = self.client.get(reverse('gallery_images_api'), {'sort': sort_by, 'cursor': cursor, 'page_size': 7})
+                    data = response.json()
+                    self.assertLessEqual(len(queries), self.QUERY_BUDGET)
+                    seen.extend(image['id'] for image in data['images'])
+                    if not data['has_next']:
+                        break
+                    cursor = data['next_cursor']
+
+                page_mode = self.client.get(reverse('gallery_images_api'), {'sort': sort_by, 'page_size': 30}).json()
+                self.assertEqual(seen, [image['id'] for image in page_mode['images']])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('gallery_images_api'), {'sort': 'newest', 'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_pages_are_cached_until_the_generation_changes(self):
+        params = {'sort': 'newest', 'cursor': ''}
+        first = self.client.get(reverse('gallery_images_api'), params).json()
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(reverse('gallery_images_api'), params).json()
+        self.assertEqual(second, first)
+        self.assertEqual(len(queries), 0, [query['sql'] for query in queries])
+
+        newest = ArbiusImage.objects.get(pk=first['images'][0]['id'])
+        ArbiusImage.objects.filter(pk=newest.pk).update(upvote_count=99)
+        self.assertEqual(self.client.get(reverse('gallery_images_api'), params).json(), first)
+
+        bump_gallery_generation()
+        third = self.client.get(reverse('gallery_images_api'), params).json()
+        self.assertEqual(third['images'][0]['upvote_count'], 99)
+
+
+class EngagementCounterTests(TestCase):
+    """The upvote, comment and reaction views keep the stored counters equal to a rebuild"""
+
+    def setUp(self):
+        self.image = ArbiusImage.objects.create(
+            transaction_hash=f"0x{1:064x}", task_id=f"0x{2:064x}", block_number=1, timestamp=timezone.now(),
+            cid='QmCounters', ipfs_url='https://ipfs.io/ipfs/QmCounters', image_url='https://ipfs.io/ipfs/QmCounters/out-1.png',
+        )
+
+    def connect(self, wallet_address):
+        session = self.client.session
+        session['wallet_address'] = wallet_address
+        session.save()
+
+    def post(self, name, data=None):
+        response = self.client.post(reverse(name, args=[self.image.pk]), json.dumps(data or {}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def assertCountersMatchRebuild(self, expected):
+        self.image.refresh_from_db()
+        stored = (self.image.upvote_count, self.image.comment_count, self.image.reaction_counts)
+        self.assertEqual(stored, expected)
+        self.assertEqual(ArbiusImage.rebuild_counters(), 0)
+
+    def test_counters_follow_each_toggle(self):
+        alice, bob = f"0x{'a1' * 20}", f"0x{'b2' * 20}"
+        self.connect(alice)
+        self.assertEqual(self.post('toggle_upvote')['action'], 'added')
+        self.assertCountersMatchRebuild((1, 0, {}))
+        self.post('add_comment', {'content': 'first'})
+        self.assertCountersMatchRebuild((1, 1, {}))
+        self.post('toggle_reaction', {'emoji': '🔥'})
+        self.assertCountersMatchRebuild((1, 1, {'🔥': 1}))
+
+        self.connect(bob)
+        self.post('toggle_upvote')
+        self.post('add_comment', {'content': 'second'})
+        self.assertEqual(self.post('toggle_reaction', {'emoji': '🔥'})['reactions'], {'🔥': 2})
+        self.post('toggle_reaction', {'emoji': '❤️'})
+        self.assertCountersMatchRebuild((2, 2, {'❤️': 1, '🔥': 2}))
+
+        # Toggling again takes each one back off
+        self.assertEqual(self.post('toggle_upvote')['action'], 'removed')
+        self.assertCountersMatchRebuild((1, 2, {'❤️': 1, '🔥': 2}))
+        self.post('toggle_reaction', {'emoji': '❤️'})
+        self.assertCountersMatchRebuild((1, 2, {'🔥': 2}))
+
+        self.connect(alice)
+        self.post('toggle_upvote')
+        self.assertEqual(self.post('toggle_reaction', {'emoji': '🔥'})['reactions'], {'🔥': 1})
+        self.assertCountersMatchRebuild((0, 2, {'🔥': 1}))
+
+
+class AutomineFlagTests(TestCase):
+    """The fallback miner wallets only count as miners while no miners have been identified"""
+
+    FALLBACK = '0x5E33e2CeAd338b1224DDd34636DaC7563f97C300'
+    MINER = f"0x{'ab' * 20}"
+
+    def setUp(self):
+        for i, submitter in enumerate((self.FALLBACK, self.MINER, f"0x{'cd' * 20}")):
+            ArbiusImage.objects.create(
+                transaction_hash=f"0x{i:064x}", task_id=f"0x{i + 1000:064x}", block_number=1000 + i, timestamp=timezone.now(),
+                cid=f"QmAutomine{i}", ipfs_url=f"https://ipfs.io/ipfs/QmAutomine{i}", image_url=f"https://ipfs.io/ipfs/QmAutomine{i}/out-1.png",
+                model_id=MAIN_MODEL_ID, task_submitter=submitter,
+            )
+
+    def shown(self):
+        cache.clear()
+        response = self.client.get(reverse('gallery_images_api'), {'sort': 'newest', 'exclude_automine': '1', 'cursor': ''})
+        return sorted(image['task_submitter'] for image in response.json()['images'])
+
+    def test_identified_miners_replace_the_fallback_list(self):
+        self.assertEqual(sync_automine_flags(), (1, 0))
+        self.assertTrue(is_automine_submitter(self.FALLBACK))
+        self.assertEqual(self.shown(), [self.MINER, f"0x{'cd' * 20}"])
+
+        # The first identified miner takes over from the fallback wallets
+        MinerAddress.objects.create(wallet_address=self.MINER)
+        self.assertFalse(is_automine_submitter(self.FALLBACK))
+        self.assertEqual(self.shown(), [self.FALLBACK, f"0x{'cd' * 20}"])
+
+        # And deleting the last one brings them back
+        MinerAddress.objects.get(wallet_address=self.MINER).delete()
+        self.assertTrue(is_automine_submitter(self.FALLBACK))
+        self.assertEqual(self.shown(), [self.MINER, f"0x{'cd' * 20}"])
+        self.assertEqual(sync_automine_flags(), (0, 0))
+
+class KeywordIndexTests(TestCase):
+    """Incremental keyword indexing must agree with a full rebuild"""
+
+    def make_image(self, i, prompt, submitter, days_ago=0):
+        return ArbiusImage(
+            transaction_hash=f"0x{i:064x}",
+            task_id=f"0x{i + 1000:064x}",
+            block_number=1000 + i,
+            timestamp=timezone.now() - timedelta(days=days_ago),
+            cid=f"QmTest{i}",
+            ipfs_url=f"https://ipfs.io/ipfs/QmTest{i}",
+            image_url=f"https://ipfs.io/ipfs/QmTest{i}/out-1.png",
+            model_id=MAIN_MODEL_ID,
+            prompt=prompt,
+            task_submitter=submitter,
+        )
+
+    def test_incremental_index_matches_rebuild(self):
+        ArbiusImage.objects.bulk_create([
+            self.make_image(0, 'A Dragon guarding the castle', f"0x{1:040x}", days_ago=10),
+            self.make_image(1, 'dragon with blue_hair, dragon', f"0x{2:040x}"),
+            self.make_image(2, 'Pikachu in the castle', f"0x{2:040x}"),
+            self.make_image(3, 'dragon dragon dragon', f"0x{99:040x}"),
+        ])
+        # Identifying the miner flags its existing images as automine
+        MinerAddress.objects.create(wallet_address=f"0x{99:040x}")
+        images = list(ArbiusImage.objects.order_by('pk'))
+        self.assertEqual([image.is_automine for image in images], [False, False, False, True])
+
+        self.assertEqual(index_images(images), 3)
+        incremental = dict(PromptKeyword.objects.values_list('keyword', 'image_count'))
+        self.assertEqual(incremental['dragon'], 2)
+        self.assertEqual(top_keywords(limit=5), ['castle', 'dragon'])
+        self.assertEqual(top_keywords(limit=5, days=7, min_count=1), ['blue_hair', 'castle', 'dragon', 'pikachu'])
+
+        rebuild_keyword_index()
+        self.assertEqual(dict(PromptKeyword.objects.values_list('keyword', 'image_count')), incremental)
+
+    def keyword_counts(self):
+        # Counts decremented to zero are left behind as rows; a rebuild only writes the nonzero ones
+        return (
+            dict(PromptKeyword.objects.filter(image_count__gt=0).values_list('keyword', 'image_count')),
+            set(DailyKeywordCount.objects.filter(image_count__gt=0).values_list('day', 'keyword', 'image_count')),
+        )
+
+    def assertIndexMatchesRebuild(self):
+        incremental = self.keyword_counts()
+        rebuild_keyword_index()
+        self.assertEqual(incremental, self.keyword_counts())
+
+    def index_gallery(self, *images):
+        ArbiusImage.objects.bulk_create(images)
+        index_images(ArbiusImage.objects.all())
+        return dict(PromptKeyword.objects.values_list('keyword', 'image_count'))
+
+    def test_flagged_miner_images_leave_the_index(self):
+        before = self.index_gallery(
+            self.make_image(0, 'dragon over the castle', f"0x{1:040x}", days_ago=3),
+            self.make_image(1, 'dragon in the rain', f"0x{2:040x}"),
+            self.make_image(2, 'castle at dawn', f"0x{3:040x}"),
+        )
+        self.assertEqual((before['dragon'], before['castle']), (2, 2))
+
+        # The signal flags the images of a newly saved miner
+        MinerAddress.objects.create(wallet_address=f"0x{1:040x}")
+        self.assertEqual(PromptKeyword.objects.get(keyword='dragon').image_count, 1)
+        self.assertIndexMatchesRebuild()
+
+        # Miners stored without the signal are caught by sync_automine_flags, and deleted ones come back
+        MinerAddress.objects.bulk_create([MinerAddress(wallet_address=f"0x{3:040x}")])
+        self.assertEqual(sync_automine_flags(), (1, 0))
+        self.assertEqual(PromptKeyword.objects.get(keyword='castle').image_count, 0)
+        self.assertIndexMatchesRebuild()
+
+        MinerAddress.objects.filter(wallet_address=f"0x{1:040x}").delete()
+        self.assertEqual(PromptKeyword.objects.get(keyword='dragon').image_count, 2)
+        self.assertIndexMatchesRebuild()
+
+    def test_inaccessible_images_leave_the_index(self):
+        self.index_gallery(
+            self.make_image(0, 'dragon over the castle', f"0x{1:040x}", days_ago=2),
+            self.make_image(1, 'dragon in the rain', f"0x{2:040x}"),
+        )
+        status = {'QmTest0': 404, 'QmTest1': 200}
+        session = mock.Mock()
+        session.head.side_effect = lambda url, **kwargs: mock.Mock(status_code=status[url.split('/ipfs/')[1].split('/')[0]])
+        checker = IPFSChecker(gateways=['https://gateway.test/ipfs/'], max_workers=1, session=session)
+
+        self.assertEqual(checker.check_images(ArbiusImage.objects.order_by('pk')), 1)
+        self.assertEqual(PromptKeyword.objects.get(keyword='dragon').image_count, 1)
+        self.assertEqual(PromptKeyword.objects.get(keyword='castle').image_count, 0)
+        self.assertIndexMatchesRebuild()
+
+        # Found again, the image is counted again
+        status['QmTest0'] = 200
+        self.assertEqual(checker.check_images(ArbiusImage.objects.order_by('pk')), 2)
+        self.assertEqual(PromptKeyword.objects.get(keyword='dragon').image_count, 2)
+        self.assertIndexMatchesRebuild()
+
+    def test_deleted_images_leave_the_index(self):
+        invalid = self.make_image(1, 'dragon in the rain', f"0x{2:040x}", days_ago=1)
+        invalid.transaction_hash = 'not-a-hash'
+        self.index_gallery(self.make_image(0, 'dragon over the castle', f"0x{1:040x}"), invalid)
+
+        call_command('remove_invalid_tx_images', sleep=0, stdout=io.StringIO())
+        self.assertEqual(ArbiusImage.objects.count(), 1)
+        self.assertEqual(PromptKeyword.objects.get(keyword='dragon').image_count, 1)
+        self.assertEqual(PromptKeyword.objects.get(keyword='rain').image_count, 0)
+        self.assertIndexMatchesRebuild()
+
+
+class GallerySearchTests(TestCase):
+    """Hashes and CIDs hit their indexed columns, prompts go through ranked full-text search"""
+
+    @classmethod
+    def setUpTestData(cls):
+        prompts = ['a red dragon over a red castle', 'a dragon in the forest', 'a cat on a red sofa']
+        for i, prompt in enumerate(prompts):
+            ArbiusImage.objects.create(
+                transaction_hash=f"0x{i + 0xabc000:064x}",
+                task_id=f"0x{i + 1000:064x}",
+                block_number=1000 + i,
+                timestamp=timezone.now() - timedelta(minutes=i),
+                cid=f"QmSearch{i}",
+                ipfs_url=f"https://ipfs.io/ipfs/QmSearch{i}",
+                image_url=f"https://ipfs.io/ipfs/QmSearch{i}/out-1.png",
+                model_id=MAIN_MODEL_ID,
+                prompt=prompt,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('gallery_images_api'), {'q': query, 'sort': 'relevance', **params})
+        return [image['prompt'] for image in response.json()['images']]
+
+    def test_prompt_matches_are_ranked(self):
+        self.assertEqual(self.search('red dragon'), ['a red dragon over a red castle'])
+        self.assertCountEqual(self.search('drag'), ['a red dragon over a red castle', 'a dragon in the forest'])
+        self.assertEqual(self.search('red')[-1], 'a cat on a red sofa')
+
+    def test_identifiers_use_exact_and_prefix_lookups(self):
+        image = ArbiusImage.objects.get(prompt='a cat on a red sofa')
+        self.assertEqual(self.search(image.transaction_hash.upper().replace('0X', '0x')), [image.prompt])
+        self.assertEqual(len(self.search(image.transaction_hash[:20])), 3)
+        self.assertEqual(self.search(image.cid), [image.prompt])
+
+    def test_prompt_edits_are_reindexed(self):
+        ArbiusImage.objects.filter(prompt='a cat on a red sofa').update(prompt='a green dragon')
+        self.assertEqual(self.search('green'), ['a green dragon'])
+        self.assertEqual(self.search('sofa'), [])
+
+
+class DailyImageStatsTests(TestCase):
+    """Per-day refreshes of the dashboard rollup must agree with a full rebuild"""
+
+    def rollup(self):
+        return {
+            row.day: (row.image_count, row.submitter_count, row.model_counts)
+            for row in DailyImageStats.objects.all()
+        }
+
+    def test_refreshed_days_match_rebuild(self):
+        now = timezone.now()
+        images = ArbiusImage.objects.bulk_create([
+            ArbiusImage(
+                transaction_hash=f"0x{i:064x}",
+                task_id=f"0x{i + 1000:064x}",
+                block_number=1000 + i,
+                timestamp=now - timedelta(hours=9 * i),
+                cid=f"QmStats{i}",
+                ipfs_url=f"https://ipfs.io/ipfs/QmStats{i}",
+                image_url=f"https://ipfs.io/ipfs/QmStats{i}/out-1.png",
+                model_id=MAIN_MODEL_ID if i % 4 else 'other-model',
+                prompt=f"stats prompt {i}",
+                task_submitter=f"0x{i % 3:040x}",
+            )
+            for i in range(20)
+        ])
+        refresh_image_days(images)
+        incremental = self.rollup()
+
+        rebuild_daily_stats()
+        self.assertEqual(self.rollup(), incremental)
+        self.assertEqual(sum(count for count, _, _ in incremental.values()), 15)
+
+        # An image dropping out of the gallery takes its day's row down with it
+        hidden = ArbiusImage.objects.filter(model_id=MAIN_MODEL_ID).order_by('timestamp').first()
+        ArbiusImage.objects.filter(pk=hidden.pk).update(is_accessible=False)
+        refresh_image_days([hidden])
+        rebuilt = self.rollup()
+        rebuild_daily_stats()
+        self.assertEqual(self.rollup(), rebuilt)
+
+        rollups = {row.day: row for row in DailyImageStats.objects.all()}
+        for hours in (1, 30, 24 * 7):
+            since = now - timedelta(hours=hours)
+            expected = ArbiusImage.objects.filter(model_id=MAIN_MODEL_ID, is_accessible=True, timestamp__gte=since).count()
+            self.assertEqual(images_since(since, rollups), expected)
+
+        # Small sets are counted exactly by the sketches
+        for field in ('submitter', 'provider'):
+            self.assertEqual(distinct_addresses(rollups, field=field), exact_distinct_addresses(field=field))
+        self.assertEqual(distinct_addresses(rollups, since=now - timedelta(days=1)), exact_distinct_addresses(since=now - timedelta(days=1)))
+
+
+    # Pages render without a collectstatic manifest under the plain storage
+    @override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    )
+    def test_dashboard_totals_are_cached_per_generation(self):
+        cache.clear()
+        now = timezone.now()
+        for i in range(3):
+            ArbiusImage.objects.create(
+                transaction_hash=f"0x{i:064x}", task_id=f"0x{i + 1000:064x}", block_number=1000 + i, timestamp=now - timedelta(days=i),
+                cid=f"QmStats{i}", ipfs_url=f"https://ipfs.io/ipfs/QmStats{i}", image_url=f"https://ipfs.io/ipfs/QmStats{i}/out-1.png",
+                model_id=MAIN_MODEL_ID, task_submitter=f"0x{i % 2 + 1:040x}",
+            )
+        rebuild_daily_stats()
+
+        def dashboard():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('stats_dashboard'))
+            rollup_queries = [query['sql'] for query in queries if 'playground_dailyimagestats' in query['sql']]
+            return response.context, rollup_queries
+
+        context, rollup_queries = dashboard()
+        self.assertEqual((context['total_images'], context['unique_users'], context['unique_models']), (3, 2, 1))
+        self.assertEqual(len(rollup_queries), 1)
+        self.assertNotIn('provider_sketch', rollup_queries[0])
+
+        ArbiusImage.objects.filter(transaction_hash=f"0x{0:064x}").update(is_accessible=False)
+        rebuild_daily_stats()
+        context, rollup_queries = dashboard()
+        self.assertEqual((context['total_images'], rollup_queries), (3, []))
+        bump_gallery_generation()
+        self.assertEqual(dashboard()[0]['total_images'], 2)
+
+class HyperLogLogTests(TestCase):
+    """Merged sketches must estimate the size of the union within the error bound"""
+
+    def test_merged_estimate_is_within_error_bound(self):
+        days = [HyperLogLog().update(f"0x{i:040x}" for i in range(start, start + 6000)) for start in range(0, 30000, 3000)]
+        merged = HyperLogLog.union(sketch.to_bytes() for sketch in days)
+
+        self.assertEqual(merged.registers, HyperLogLog().update(f"0x{i:040X}" for i in range(33000)).registers)
+        self.assertLess(abs(merged.count() - 33000) / 33000, 3 * 1.04 / merged.size ** 0.5)
+        self.assertEqual(HyperLogLog.from_bytes(b'').count(), 0)
+
+
+class ExtractHerokuDataTests(TestCase):
+    """The streaming importer maps source image ids through transaction hashes and can be rerun"""
+
+    def make_source(self):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        source = sqlite3.connect(path)
+        source.executescript("""
+            CREATE TABLE gallery_mineraddress (wallet_address, first_seen, last_seen, total_solutions, total_commitments, is_active);
+            CREATE TABLE gallery_arbiusimage (
+                id, transaction_hash, task_id, block_number, timestamp, cid, ipfs_url, image_url, model_id, prompt,
+                input_parameters, solution_provider, task_submitter, miner_address, owner_address, gas_used,
+                discovered_at, is_accessible, last_checked, ipfs_gateway
+            );
+            CREATE TABLE gallery_userprofile (
+                wallet_address, display_name, bio, avatar_url, website, twitter_handle,
+                total_images_created, total_upvotes_received, created_at, updated_at
+            );
+            CREATE TABLE gallery_imageupvote (image_id, wallet_address, created_at);
+            CREATE TABLE gallery_imagecomment (image_id, wallet_address, content, created_at, updated_at);
+        """)
+        # Source ids far from the local ones, so a missing id mapping would show up
+        source.executemany(
+            "INSERT INTO gallery_arbiusimage (id, transaction_hash, task_id, block_number, timestamp, cid, ipfs_url,"
+            " image_url, model_id, prompt, input_parameters, task_submitter, is_accessible)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)",
+            [
+                (500 + i, f"0x{i:064x}", f"0x{i + 1000:064x}", 1000 + i, f"2025-01-0{i + 1} 12:00:00", f"QmLegacy{i}",
+                 f"https://ipfs.io/ipfs/QmLegacy{i}", f"https://ipfs.io/ipfs/QmLegacy{i}/out-1.png", MAIN_MODEL_ID,
+                 f"legacy dragon {i}", '{"prompt": "legacy"}' if i else 'not json', f"0x{i:040x}")
+                for i in range(3)
+            ],
+        )
+        source.executemany("INSERT INTO gallery_imageupvote VALUES (?, ?, '2025-01-05 00:00:00')", [(502, f"0x{1:040x}"), (502, f"0x{2:040x}"), (999, f"0x{3:040x}")])
+        source.execute("INSERT INTO gallery_imagecomment VALUES (501, ?, 'nice', '2025-01-05 00:00:00', NULL)", [f"0x{1:040x}"])
+        source.execute("INSERT INTO gallery_mineraddress VALUES (?, NULL, NULL, 3, 0, 1)", [f"0x{2:040x}"])
+        source.commit()
+        source.close()
+        return path
+
+    def test_import_maps_ids_and_is_idempotent(self):
+        path = self.make_source()
+        for _ in range(2):
+            call_command('extract_heroku_data', heroku_db_url=f'sqlite:///{path}', batch_size=2, stdout=io.StringIO())
+
+        self.assertEqual(ArbiusImage.objects.count(), 3)
+        third = ArbiusImage.objects.get(transaction_hash=f"0x{2:064x}")
+        self.assertEqual(third.upvote_count, 2)
+        self.assertTrue(third.is_automine)
+        self.assertEqual(third.input_parameters, {'prompt': 'legacy'})
+        self.assertEqual(third.timestamp.year, 2025)
+        self.assertEqual(ArbiusImage.objects.get(transaction_hash=f"0x{0:064x}").input_parameters, {})
+        self.assertEqual(list(ImageComment.objects.values_list('image__transaction_hash', flat=True)), [f"0x{1:064x}"])
+        self.assertEqual(ImageUpvote.objects.count(), 2)
+
+
+class FixtureLoaderTests(TestCase):
+    """Fixtures are parsed incrementally and loaded idempotently, whatever order their objects come in"""
+
+    def test_loads_fixture_in_any_order_and_rerun_adds_nothing(self):
+        image = {
+            'transaction_hash': f"0x{7:064x}", 'task_id': f"0x{8:064x}", 'block_number': 7,
+            'timestamp': '2025-01-01T12:00:00Z', 'cid': 'QmFixture', 'ipfs_url': 'https://ipfs.io/ipfs/QmFixture',
+            'image_url': 'https://ipfs.io/ipfs/QmFixture/out-1.png', 'model_id': MAIN_MODEL_ID,
+            'prompt': 'a fixture "dragon" [1]', 'input_parameters': {'prompt': 'a fixture'},
+        }
+        objects = [
+            {'model': 'gallery.imageupvote', 'pk': 1, 'fields': {'image': 42, 'wallet_address': f"0x{1:040x}"}},
+            {'model': 'playground.imagecomment', 'pk': 1, 'fields': {'image': 42, 'wallet_address': f"0x{1:040x}", 'content': 'nice'}},
+            {'model': 'playground.arbiusimage', 'pk': 42, 'fields': image},
+            {'model': 'playground.imageupvote', 'pk': 2, 'fields': {'image': 404, 'wallet_address': f"0x{2:040x}"}},
+            {'model': 'auth.user', 'pk': 1, 'fields': {'username': 'skipped'}},
+        ]
+        fd, path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(objects, f, indent=2)
+
+        with open(path) as f:
+            self.assertEqual(list(iter_json_array(f, chunk_size=7)), objects)
+
+        for _ in range(2):
+            load_fixture(path, batch_size=2)
+        loaded = ArbiusImage.objects.get()
+        self.assertEqual(loaded.prompt, image['prompt'])
+        self.assertEqual(list(loaded.upvotes.values_list('wallet_address', flat=True)), [f"0x{1:040x}"])
+        self.assertEqual(loaded.comments.count(), 1)
+        self.assertEqual(ImageUpvote.objects.count(), 1)
+
+
+class DeltaSyncTests(TestCase):
+    """Repeated syncs between two databases only pull the rows changed since the stored mark"""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+        source = sqlite3.connect(self.path)
+        source.executescript("""
+            CREATE TABLE playground_mineraddress (id, wallet_address, first_seen, last_seen, total_solutions, total_commitments, is_active);
+            CREATE TABLE playground_arbiusimage (
+                id, transaction_hash, task_id, block_number, timestamp, cid, ipfs_url, image_url, model_id, prompt,
+                input_parameters, solution_provider, task_submitter, miner_address, owner_address, gas_used,
+                discovered_at, is_accessible, last_checked, ipfs_gateway
+            );
+            CREATE TABLE playground_userprofile (
+                id, wallet_address, display_name, bio, avatar_url, website, twitter_handle,
+                total_images_created, total_upvotes_received, created_at, updated_at
+            );
+            CREATE TABLE playground_imageupvote (id, image_id, wallet_address, created_at);
+            CREATE TABLE playground_imagereaction (id, image_id, wallet_address, emoji, created_at);
+            CREATE TABLE playground_imagecomment (id, image_id, wallet_address, content, created_at, updated_at);
+        """)
+        source.commit()
+        source.close()
+        self.add_images(range(3), day=1)
+
+    def source(self):
+        connection = sqlite3.connect(self.path)
+        self.addCleanup(connection.close)
+        return connection
+
+    def add_images(self, numbers, day):
+        # Checked an hour apart, so the high-water mark falls between rows
+        with self.source() as source:
+            source.executemany(
+                "INSERT INTO playground_arbiusimage (id, transaction_hash, task_id, block_number, timestamp, cid, ipfs_url,"
+                " image_url, model_id, prompt, input_parameters, task_submitter, is_accessible, last_checked)"
+                " VALUES (?, ?, ?, ?, '2025-01-01 12:00:00', ?, ?, ?, ?, ?, '{}', ?, ?, ?)",
+                [
+                    (700 + i, f"0x{i:064x}", f"0x{i + 1000:064x}", 1000 + i, f"QmSync{i}", f"https://ipfs.io/ipfs/QmSync{i}",
+                     f"https://ipfs.io/ipfs/QmSync{i}/out-1.png", MAIN_MODEL_ID, f"synced dragon {i}", f"0x{i:040x}",
+                     1, f'2025-01-0{day} 1{i}:00:00')
+                    for i in numbers
+                ],
+            )
+
+    def sync(self):
+        call_command('delta_sync', source_db_url=f'sqlite:///{self.path}', overlap=0, batch_size=2, stdout=io.StringIO())
+
+    def rows_synced(self, table):
+        return SyncCheckpoint.objects.get(table=f'playground_{table}').rows_synced
+
+    def test_second_sync_only_pulls_changes(self):
+        self.sync()
+        self.assertEqual(ArbiusImage.objects.count(), 3)
+        self.assertEqual(self.rows_synced('arbiusimage'), 3)
+
+        # A later check marked an image inaccessible, a new image arrived and an older image got votes
+        with self.source() as source:
+            source.execute("UPDATE playground_arbiusimage SET is_accessible = 0, last_checked = '2025-01-02 12:00:00' WHERE id = 700")
+            source.executemany("INSERT INTO playground_imageupvote VALUES (?, 701, ?, '2025-01-02 12:00:00')", [(1, f"0x{1:040x}"), (2, f"0x{2:040x}")])
+            source.execute("INSERT INTO playground_imagecomment VALUES (1, 702, ?, 'nice', '2025-01-02 12:00:00', '2025-01-02 12:00:00')", [f"0x{1:040x}"])
+        self.add_images([3], day=2)
+
+        self.sync()
+        # The changed and new images plus the one on the previous mark, which is re-read
+        self.assertEqual(self.rows_synced('arbiusimage'), 3 + 3)
+        self.assertEqual(ArbiusImage.objects.count(), 4)
+        self.assertFalse(ArbiusImage.objects.get(transaction_hash=f"0x{0:064x}").is_accessible)
+        self.assertEqual(ArbiusImage.objects.get(transaction_hash=f"0x{1:064x}").upvote_count, 2)
+        self.assertEqual(ArbiusImage.objects.get(transaction_hash=f"0x{2:064x}").comment_count, 1)
+
+        self.sync()
+        self.assertEqual(ImageUpvote.objects.count(), 2)
+        self.assertEqual(ImageComment.objects.count(), 1)
+        self.assertEqual(self.rows_synced('imageupvote'), 2)
+
+    def keyword_counts(self):
+        return dict(PromptKeyword.objects.filter(image_count__gt=0).values_list('keyword', 'image_count'))
+
+    def assertKeywordsMatchRebuild(self):
+        incremental = self.keyword_counts()
+        rebuild_keyword_index()
+        self.assertEqual(self.keyword_counts(), incremental)
+
+    def test_updated_images_move_in_and_out_of_the_keyword_index(self):
+        self.sync()
+        self.assertEqual(self.keyword_counts(), {'synced': 3, 'dragon': 3})
+
+        # One image went inaccessible and another had its prompt corrected
+        with self.source() as source:
+            source.execute("UPDATE playground_arbiusimage SET is_accessible = 0, last_checked = '2025-01-02 10:00:00' WHERE id = 700")
+            source.execute("UPDATE playground_arbiusimage SET prompt = 'synced castle', last_checked = '2025-01-02 11:00:00' WHERE id = 701")
+        self.sync()
+        self.assertEqual(self.keyword_counts(), {'synced': 2, 'dragon': 1, 'castle': 1})
+        self.assertKeywordsMatchRebuild()
+
+        # Found again by a later check
+        with self.source() as source:
+            source.execute("UPDATE playground_arbiusimage SET is_accessible = 1, last_checked = '2025-01-03 10:00:00' WHERE id = 700")
+        self.sync()
+        self.assertEqual(self.keyword_counts(), {'synced': 3, 'dragon': 2, 'castle': 1})
+        self.assertKeywordsMatchRebuild()
+
+
+class GallerySnapshotTests(TestCase):
+    """Snapshots append what was stored since the last export and import back idempotently"""
+
+    def make_image(self, i):
+        return ArbiusImage.objects.create(
+            transaction_hash=f"0x{i:064x}", task_id=f"0x{i + 1000:064x}", block_number=1000 + i,
+            timestamp=timezone.now() - timedelta(hours=i), cid=f"QmSnap{i}", ipfs_url=f"https://ipfs.io/ipfs/QmSnap{i}",
+            image_url=f"https://ipfs.io/ipfs/QmSnap{i}/out-1.png", model_id=MAIN_MODEL_ID, prompt=f"snapshot dragon {i} ✨",
+            input_parameters={'prompt': f'snapshot {i}', 'seed': i}, task_submitter=f"0x{i:040x}",
+        )
+
+    def test_incremental_export_round_trips(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        first = [self.make_image(i) for i in range(3)]
+        ImageUpvote.objects.create(image=first[0], wallet_address=f"0x{9:040x}")
+        ImageComment.objects.create(image=first[1], wallet_address=f"0x{9:040x}", content='nice')
+        self.assertEqual(export_snapshot(directory, chunk_rows=2)['images'], 3)
+
+        # The second export only appends the new image and the new reaction on an old image,
+        # including an image backfilled into a block before the last exported one
+        self.make_image(3)
+        backfilled = self.make_image(4)
+        ArbiusImage.objects.filter(pk=backfilled.pk).update(block_number=990)
+        ImageReaction.objects.create(image=first[2], wallet_address=f"0x{9:040x}", emoji='🔥')
+        ImageUpvote.objects.create(image=backfilled, wallet_address=f"0x{9:040x}")
+        counts = export_snapshot(directory, chunk_rows=2)
+        self.assertEqual((counts['images'], counts['upvotes'], counts['reactions']), (2, 1, 1))
+        manifest = read_manifest(directory)
+        self.assertEqual(manifest['last_block'], 1003)
+        self.assertEqual(manifest['last_ids']['images'], backfilled.id)
+        self.assertEqual(export_snapshot(directory), {})
+
+        expected = list(ArbiusImage.objects.order_by('block_number').values_list('transaction_hash', 'prompt', 'input_parameters', 'timestamp'))
+        ArbiusImage.objects.all().delete()
+        for _ in range(2):
+            import_snapshot(directory, batch_size=2)
+        self.assertEqual(list(ArbiusImage.objects.order_by('block_number').values_list('transaction_hash', 'prompt', 'input_parameters', 'timestamp')), expected)
+        self.assertEqual((ImageUpvote.objects.count(), ImageComment.objects.count(), ImageReaction.objects.count()), (2, 1, 1))
+
+
+class ChunkedDeletionTests(TestCase):
+    """Maintenance deletes run in bounded batches with one DELETE per table and can be counted first"""
+
+    def setUp(self):
+        now = timezone.now()
+        for i, transaction_hash in enumerate([f"0x{1:064x}", 'bad-1', 'bad-2', 'bad-3', '0xnothex']):
+            image = ArbiusImage.objects.create(
+                transaction_hash=transaction_hash, task_id=f"0x{i:064x}", block_number=2000 + i,
+                timestamp=now - timedelta(days=i), cid=f"QmDelete{i}", ipfs_url=f"https://ipfs.io/ipfs/QmDelete{i}",
+                image_url=f"https://ipfs.io/ipfs/QmDelete{i}/out-1.png", model_id=MAIN_MODEL_ID, prompt='delete me',
+            )
+            ImageUpvote.objects.create(image=image, wallet_address=f"0x{i:040x}")
+            ImageComment.objects.create(image=image, wallet_address=f"0x{i:040x}", content='bye')
+            ImageReaction.objects.create(image=image, wallet_address=f"0x{i:040x}", emoji='🔥')
+        rebuild_daily_stats()
+
+    def test_dry_run_counts_and_batched_delete(self):
+        out = io.StringIO()
+        call_command('remove_invalid_tx_images', dry_run=True, stdout=out)
+        self.assertIn('Would remove 4 arbius images', out.getvalue())
+        self.assertIn('Would remove 4 image upvotes', out.getvalue())
+        self.assertEqual(ArbiusImage.objects.count(), 5)
+
+        # Batches of 3 delete the images by id, and never collect the related rows:
+        # each batch is one DELETE per table
+        with CaptureQueriesContext(connection) as queries:
+            call_command('remove_invalid_tx_images', batch_size=3, sleep=0, stdout=io.StringIO())
+        self.assertFalse([query for query in queries.captured_queries if 'SELECT' in query['sql'] and 'imageupvote' in query['sql']])
+        tables = ('playground_arbiusimage', 'playground_imageupvote', 'playground_imagecomment', 'playground_imagereaction')
+        deletes = [query['sql'].split('"')[1] for query in queries.captured_queries if query['sql'].startswith('DELETE')]
+        self.assertEqual(sorted(table for table in deletes if table in tables), sorted(2 * tables))
+
+        self.assertEqual(list(ArbiusImage.objects.values_list('transaction_hash', flat=True)), [f"0x{1:064x}"])
+        self.assertEqual((ImageUpvote.objects.count(), ImageComment.objects.count(), ImageReaction.objects.count()), (1, 1, 1))
+        self.assertEqual(sum(DailyImageStats.objects.values_list('image_count', flat=True)), 1)
+
+    def test_sample_data_removal_keeps_fallback_miners_flagged(self):
+        sample_miner = Web3.to_checksum_address(StandInNode.SENDER)
+        MinerAddress.objects.create(wallet_address=sample_miner)
+        now = timezone.now()
+        for transaction_hash in ('0x' + '0' * 60 + 'beef', '0x' + '7' * 64):
+            ArbiusImage.objects.create(
+                transaction_hash=transaction_hash, task_id=transaction_hash, block_number=3000, timestamp=now,
+                cid='QmSample', ipfs_url='https://ipfs.io/ipfs/QmSample', image_url='https://ipfs.io/ipfs/QmSample/out-1.png',
+                model_id=MAIN_MODEL_ID, task_submitter=sample_miner, is_automine=True,
+            )
+
+        out = io.StringIO()
+        call_command('remove_sample_data', sleep=0, stdout=out)
+        # Along with the valid-looking image of setUp
+        self.assertIn('Removed 2 sample images', out.getvalue())
+        self.assertIn('Removed 1 sample miner addresses', out.getvalue())
+        self.assertFalse(MinerAddress.objects.exists())
+        # Left alone by the delete signal, as the wallet is still a fallback miner
+        self.assertEqual(list(ArbiusImage.objects.filter(task_submitter=sample_miner).values_list('transaction_hash', 'is_automine')), [
+            ('0x' + '7' * 64, True),
+        ])
+
+
+class RateLimitTests(TestCase):
+    """Signature attempts are counted atomically per client over a fixed window"""
+
+    def request(self, ip='203.0.113.5'):
+        return RequestFactory().post('/', REMOTE_ADDR=ip)
+
+    def test_limit_is_hit_and_window_expires(self):
+        start = timezone.now()
+        with mock.patch('playground.models.timezone.now', return_value=start):
+            results = [check_rate_limit(self.request(), 'signature_verify') for _ in range(MAX_SIGNATURE_ATTEMPTS + 1)]
+            self.assertTrue(check_rate_limit(self.request('203.0.113.6'), 'signature_verify'))
+        self.assertEqual(results, [True] * MAX_SIGNATURE_ATTEMPTS + [False])
+
+        # Later attempts in the same window don't extend it
+        with mock.patch('playground.models.timezone.now', return_value=start + timedelta(minutes=59)):
+            self.assertFalse(check_rate_limit(self.request(), 'signature_verify'))
+        with mock.patch('playground.models.timezone.now', return_value=start + timedelta(hours=1, seconds=1)):
+            self.assertTrue(check_rate_limit(self.request(), 'signature_verify'))
+        self.assertEqual(RateLimitCounter.objects.get(key='rate_limit:signature_verify:203.0.113.5').count, 1)
+
+
+class CacheUrlTests(TestCase):
+    """CACHE_URL values map to Django cache backends"""
+
+    def test_backends_and_options(self):
+        self.assertEqual(cache_url.parse('locmem://')['LOCATION'], 'unique-snowflake')
+        file_cache = cache_url.parse('file:///var/tmp/arbius?MAX_ENTRIES=5000&timeout=60', key_prefix='arbius', version=2)
+        self.assertEqual(file_cache['BACKEND'], 'django.core.cache.backends.filebased.FileBasedCache')
+        self.assertEqual((file_cache['LOCATION'], file_cache['TIMEOUT'], file_cache['OPTIONS']), ('/var/tmp/arbius', 60, {'MAX_ENTRIES': 5000}))
+        self.assertEqual((file_cache['KEY_PREFIX'], file_cache['VERSION']), ('arbius', 2))
+        self.assertEqual(cache_url.parse('db://arbius_cache')['LOCATION'], 'arbius_cache')
+        self.assertEqual(cache_url.parse('rediss://:secret@cache:6380/1')['LOCATION'], 'rediss://:secret@cache:6380/1')
+        with self.assertRaises(ImproperlyConfigured):
+            cache_url.parse('memcached://localhost')
+
+
+class StandInNode:
+    """
+    Local JSON-RPC node on a background http.server.
+
+    Serves eth_getBlockByNumber for blocks 0-99, each with one
+    transaction from a lower-cased address, and answers the blocks in
+    `failing` with a per-call error. Records the size of every batch.
+    """
+
+    SENDER = '0x5e33e2cead338b1224ddd34636dac7563f97c300'
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.batches = []
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                node.batches.append(len(payload))
+                body = json.dumps([node.answer(call) for call in payload]).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def answer(self, call):
+        number = int(call['params'][0], 16)
+        if number in self.failing:
+            return {'jsonrpc': '2.0', 'id': call['id'], 'error': {'code': -32000, 'message': f'block {number} unavailable'}}
+        block = {
+            'number': hex(number), 'timestamp': hex(1700000000 + number), 'gasUsed': '0x0',
+            'transactions': [{'hash': f"0x{number:064x}", 'from': self.SENDER, 'to': None, 'blockNumber': hex(number), 'nonce': '0x1'}],
+        }
+        return {'jsonrpc': '2.0', 'id': call['id'], 'result': block}
+
+
+class StandInChain:
+    """
+    Local JSON-RPC node serving a small engine chain on a background http.server.
+
+    Blocks 0-59 each hold an unrelated transfer; blocks 10 and 40 add a
+    submitTask with its TaskSubmitted log and blocks 12 and 41 a
+    submitSolution answering it. eth_getLogs rejects ranges longer than
+    `max_log_range` blocks with -32005, like public nodes capping results.
+    Records every eth_getLogs range and the methods called.
+    """
+
+    ENGINE = '0x5fbdb2315678afecb367f032d93f642f64180aa3'
+    LATEST = 59
+
+    def __init__(self, max_log_range=1000):
+        self.max_log_range = max_log_range
+        self.log_ranges = []
+        self.methods = Counter()
+        self.blocks = {number: [self.transfer(number)] for number in range(self.LATEST + 1)}
+        self.logs = []
+        for task_block, solution_block, task_id in ((10, 12, '11' * 32), (40, 41, '44' * 32)):
+            self.add(task_block, DecoderTests.SUBMIT_TASK, TASK_SUBMITTED_TOPIC, '0x' + task_id)
+            self.add(solution_block, DecoderTests.SUBMIT_SOLUTION.replace('11' * 32, task_id), SOLUTION_SUBMITTED_TOPIC, f"0x{7:064x}")
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                # web3 sends single calls, BatchRPCClient lists of them
+                answer = [node.answer(call) for call in payload] if isinstance(payload, list) else node.answer(payload)
+                body = json.dumps(answer).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @staticmethod
+    def transfer(number):
+        return {
+            'hash': f"0x{number:064x}", 'from': StandInNode.SENDER, 'to': f"0x{9:040x}", 'input': '0xa9059cbb' + '00' * 64,
+            'blockNumber': hex(number), 'transactionIndex': '0x0', 'nonce': hex(number),
+        }
+
+    def add(self, number, data, topic, argument):
+        tx_hash = f"0x{number + 1000:064x}"
+        self.blocks[number].append({
+            'hash': tx_hash, 'from': StandInNode.SENDER, 'to': self.ENGINE, 'input': data,
+            'blockNumber': hex(number), 'transactionIndex': '0x1', 'nonce': hex(number + 1000),
+        })
+        self.logs.append({
+            'address': self.ENGINE, 'topics': [topic, argument], 'data': '0x', 'blockNumber': hex(number),
+            'transactionHash': tx_hash, 'transactionIndex': '0x1', 'logIndex': '0x0',
+        })
+
+    def answer(self, call):
+        method, params = call['method'], call.get('params', [])
+        self.methods[method] += 1
+        result = None
+        if method == 'eth_blockNumber':
+            result = hex(self.LATEST)
+        elif method == 'eth_chainId':
+            result = hex(42161)
+        elif method == 'eth_getBlockByNumber':
+            number = int(params[0], 16)
+            transactions = self.blocks[number] if params[1] else [tx['hash'] for tx in self.blocks[number]]
+            result = {'number': hex(number), 'timestamp': hex(1700000000 + 4 * number), 'gasUsed': '0x0', 'transactions': transactions}
+        elif method == 'eth_getTransactionByHash':
+            result = next((tx for txs in self.blocks.values() for tx in txs if tx['hash'] == params[0]), None)
+        elif method == 'eth_getLogs':
+            query = params[0]
+            start, end = int(query['fromBlock'], 16), int(query['toBlock'], 16)
+            self.log_ranges.append((start, end))
+            if end - start + 1 > self.max_log_range:
+                return {'jsonrpc': '2.0', 'id': call['id'], 'error': {'code': -32005, 'message': 'query returned more than 10000 results'}}
+            topics = query.get('topics', [[]])[0]
+            topics = [topics] if isinstance(topics, str) else topics
+            result = [
+                log for log in self.logs
+                if start <= int(log['blockNumber'], 16) <= end and log['address'] == query.get('address', '').lower()
+                and (not topics or log['topics'][0] in topics)
+            ]
+        return {'jsonrpc': '2.0', 'id': call['id'], 'result': result}
+
+
+class LogScanTests(TestCase):
+    """The eth_getLogs scan mode adapts its ranges and finds the same images as walking every block"""
+
+    def node(self, **kwargs):
+        node = StandInChain(**kwargs)
+        self.addCleanup(node.close)
+        return node
+
+    def test_log_ranges_narrow_on_errors_and_grow_back(self):
+        node = self.node(max_log_range=8)
+        client = BatchRPCClient(node.url)
+        chunks = list(client.iter_logs(0, 59, address=node.ENGINE, topics=[TASK_SUBMITTED_TOPIC], chunk_size=32, max_chunk_size=16))
+
+        # Covered without gaps, every answered range within the node's cap
+        self.assertEqual([start for start, _, _ in chunks], [0] + [end + 1 for _, end, _ in chunks[:-1]])
+        self.assertEqual(chunks[-1][1], 59)
+        self.assertTrue(all(end - start + 1 <= 8 for start, end, _ in chunks))
+        self.assertEqual([log.blockNumber for _, _, logs in chunks for log in logs], [10, 40])
+        # Rejected ranges were halved, and a success doubles the next try (up to max_chunk_size) which is rejected again
+        self.assertEqual(node.log_ranges[:4], [(0, 31), (0, 15), (0, 7), (8, 23)])
+
+        node.log_ranges = []
+        node.max_log_range = 1000
+        list(client.iter_logs(0, 59, address=node.ENGINE, chunk_size=4, max_chunk_size=16))
+        self.assertEqual(node.log_ranges, [(0, 3), (4, 11), (12, 27), (28, 43), (44, 59)])
+
+    def test_other_errors_are_raised(self):
+        self.assertTrue(is_log_range_error(RPCError('anything', code=-32005)))
+        self.assertTrue(is_log_range_error(RPCError('Log response size exceeded. You can make eth_getLogs requests with up to a 2K block range')))
+        self.assertTrue(is_log_range_error(RPCError('query timeout exceeded')))
+        self.assertFalse(is_log_range_error(RPCError('execution reverted', code=-32000)))
+
+        node = self.node()
+        client = BatchRPCClient(node.url)
+        with mock.patch.object(client, 'get_logs', side_effect=RPCError('execution reverted', code=-32000)) as get_logs:
+            with self.assertRaisesMessage(RPCError, 'execution reverted'):
+                list(client.iter_logs(0, 59, chunk_size=8))
+        self.assertEqual(get_logs.call_count, 1)
+
+    def test_blocks_from_logs_keep_only_event_transactions(self):
+        node = self.node()
+        scanner = ArbitrumScanner(rpc_url=node.url, mode='logs')
+        chunks = list(scanner._iter_log_chunks(0, 59, [TASK_SUBMITTED_TOPIC, SOLUTION_SUBMITTED_TOPIC]))
+        blocks = [block for _, _, chunk in chunks for block in chunk]
+        self.assertEqual([block.number for block in blocks], [10, 12, 40, 41])
+        self.assertEqual([len(block.transactions) for block in blocks], [1, 1, 1, 1])
+        self.assertEqual(blocks[0].timestamp, 1700000040)
+        # Each transaction carries the engine logs it emitted, the task id among them
+        self.assertEqual(blocks[0].transactions[0].logs[0]['topics'][1], '0x' + '11' * 32)
+        # Headers only, not full blocks, and only for blocks with events
+        self.assertEqual(node.methods['eth_getBlockByNumber'], 4)
+
+    @override_settings(LOG_CHUNK_SIZE=8, LOG_MAX_CHUNK_SIZE=32)
+    def test_logs_mode_finds_the_same_images_as_blocks_mode(self):
+        node = self.node(max_log_range=16)
+
+        def scan(mode):
+            out = io.StringIO()
+            call_command('scan_arbius', rpc_url=node.url, mode=mode, blocks=59, window=20, stdout=out)
+            self.assertIn('Found 2 new images', out.getvalue())
+            images = list(ArbiusImage.objects.order_by('transaction_hash').values_list(
+                'transaction_hash', 'task_id', 'block_number', 'timestamp', 'cid', 'prompt', 'model_id', 'solution_provider', 'task_submitter',
+            ))
+            ArbiusImage.objects.all().delete()
+            TaskRecord.objects.all().delete()
+            return images
+
+        by_blocks = scan('blocks')
+        fetched_blocks = node.methods['eth_getBlockByNumber']
+        self.assertEqual([image[:3] + image[5:6] for image in by_blocks], [
+            (f"0x{1012:064x}", '0x' + '11' * 32, 12, 'a dragon'),
+            (f"0x{1041:064x}", '0x' + '44' * 32, 41, 'a dragon'),
+        ])
+        self.assertEqual(scan('logs'), by_blocks)
+        # Walking blocks fetches all 60; the logs scan only the four with engine events
+        self.assertEqual((fetched_blocks, node.methods['eth_getBlockByNumber'] - fetched_blocks), (60, 4))
+
+
+    def test_touched_days_are_recounted_once_per_run(self):
+        node = self.node()
+        counted = mock.patch('playground.daily_stats.GALLERY_MODEL_IDS', ['0x' + '33' * 32])
+        refresh = mock.patch('playground.daily_stats.refresh_daily_stats', wraps=refresh_daily_stats)
+        with counted, refresh as refreshed:
+            # Three chunks, images in the first and the last
+            call_command('scan_arbius', rpc_url=node.url, blocks=59, window=20, quiet=True)
+            self.assertEqual(refreshed.call_count, 1)
+            stored = list(DailyImageStats.objects.values_list('day', 'image_count', 'submitter_count', 'provider_count'))
+            self.assertEqual([row[1:] for row in stored], [(2, 1, 1)])
+            rebuild_daily_stats()
+        self.assertEqual(list(DailyImageStats.objects.values_list('day', 'image_count', 'submitter_count', 'provider_count')), stored)
+
+class BatchRPCClientTests(TestCase):
+    """Blocks are fetched in JSON-RPC batches from a local stand-in node"""
+
+    def node(self, **kwargs):
+        node = StandInNode(**kwargs)
+        self.addCleanup(node.close)
+        return node
+
+    def test_blocks_are_batched_and_normalized(self):
+        node = self.node()
+        blocks = BatchRPCClient(node.url, batch_size=2).get_blocks(range(5))
+        self.assertEqual(node.batches, [2, 2, 1])
+        self.assertEqual([block.number for block in blocks], [0, 1, 2, 3, 4])
+        self.assertEqual(blocks[4].timestamp, 1700000004)
+        transaction = blocks[4].transactions[0]
+        self.assertEqual((transaction.blockNumber, transaction.nonce), (4, 1))
+        self.assertEqual(transaction['from'], Web3.to_checksum_address(StandInNode.SENDER))
+
+    def test_failed_calls_are_skipped_or_raised_when_strict(self):
+        node = self.node(failing={3})
+        client = BatchRPCClient(node.url, batch_size=10)
+        self.assertEqual([block.number for block in client.get_blocks(range(5))], [0, 1, 2, 4])
+        with self.assertRaisesRegex(RPCError, 'Block 3'):
+            client.get_blocks(range(5), strict=True)
+        with self.assertRaisesRegex(RPCError, 'block 0 unavailable'):
+            BatchRPCClient(self.node(failing={0}).url).call('eth_getBlockByNumber', ['0x0', True])
+
+    def test_windows_cover_the_range(self):
+        node = self.node()
+        windows = [
+            (start, end, [block.number for block in blocks])
+            for start, end, blocks in BatchRPCClient(node.url, batch_size=2).iter_block_windows(10, 16, window=3)
+        ]
+        self.assertEqual(windows, [(10, 12, [10, 11, 12]), (13, 15, [13, 14, 15]), (16, 16, [16])])
+        # Each window is fetched on its own, so no batch spans two windows
+        self.assertEqual(node.batches, [2, 1, 2, 1, 1])
+
+
+class DecoderTests(TestCase):
+    """Engine calldata decodes from fixed vectors, without an ABI"""
+
+    SUBMIT_SOLUTION = (
+        '0x56914caf'
+        '1111111111111111111111111111111111111111111111111111111111111111'
+        '0000000000000000000000000000000000000000000000000000000000000040'
+        '0000000000000000000000000000000000000000000000000000000000000022'
+        '1220a741d424dbc7c97378538eb003cb4d43f6dabd9395ccb8807ffb9d14a41c'
+        '9016000000000000000000000000000000000000000000000000000000000000'
+    )
+    SIGNAL_COMMITMENT = '0x506ea7de2222222222222222222222222222222222222222222222222222222222222222'
+    SUBMIT_TASK = (
+        '0x08745dd1'
+        '0000000000000000000000000000000000000000000000000000000000000000'
+        '0000000000000000000000005e33e2cead338b1224ddd34636dac7563f97c300'
+        '3333333333333333333333333333333333333333333333333333333333333333'
+        '00000000000000000000000000000000000000000000000000038d7ea4c68000'
+        '00000000000000000000000000000000000000000000000000000000000000a0'
+        '0000000000000000000000000000000000000000000000000000000000000016'
+        '7b2270726f6d7074223a20226120647261676f6e227d00000000000000000000'
+    )
+
+    def test_engine_calls(self):
+        solution = decode_call(self.SUBMIT_SOLUTION)
+        self.assertEqual(solution.name, 'submitSolution')
+        self.assertEqual(solution.args['taskid'], '0x' + '11' * 32)
+        self.assertEqual(cid_to_string(solution.args['cid']), 'QmZbZ1nKZsgBWFwLe9hay1WhQQSfHQHXWFM7aC5djgJtGm')
+
+        self.assertEqual(decode_call(self.SIGNAL_COMMITMENT), ('signalCommitment', {'commitment': '0x' + '22' * 32}))
+
+        task = decode_call(self.SUBMIT_TASK)
+        self.assertEqual(task.name, 'submitTask')
+        self.assertEqual(task.args, {
+            'version': 0,
+            'owner': '0x5E33e2CeAd338b1224DDd34636DaC7563f97C300',
+            'model': '0x' + '33' * 32,
+            'fee': 10 ** 15,
+            'input': b'{"prompt": "a dragon"}',
+        })
+        self.assertEqual(decode_input_parameters(task.args['input']), {'prompt': 'a dragon'})
+
+    def test_unknown_and_malformed_calldata(self):
+        # transfer(address,uint256)
+        self.assertIsNone(decode_call('0xa9059cbb' + '00' * 64))
+        self.assertIsNone(decode_call('0x'))
+        self.assertIsNone(decode_call(''))
+        # A known selector with truncated arguments
+        self.assertIsNone(decode_call(self.SUBMIT_SOLUTION[:74]))
+
+        engine = '0x5FbDB2315678afecb367f032d93F642f64180aa3'
+        transactions = [
+            {'to': engine, 'input': '0xa9059cbb' + '00' * 64},
+            {'to': engine.lower(), 'input': self.SIGNAL_COMMITMENT},
+            {'to': f"0x{1:040x}", 'input': self.SUBMIT_SOLUTION},
+            {'to': None, 'input': self.SUBMIT_TASK},
+            {'to': engine, 'input': self.SUBMIT_SOLUTION},
+        ]
+        calls = decode_engine_calls(transactions, engine)
+        self.assertEqual([call.name for _, call in calls], ['signalCommitment', 'submitSolution'])
+        self.assertEqual(decode_engine_calls(transactions, engine, names=('submitSolution',))[0][0], transactions[4])
+
+    def test_cids_and_input_parameters(self):
+        # Other CID encodings are shown as hex
+        self.assertEqual(cid_to_string(bytes.fromhex('01551220') + b'\0' * 32), '0x01551220' + '00' * 32)
+        # As `ipfs add` gives them
+        self.assertEqual(ipfs_cid_v0(b'hello world\n'), 'QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o')
+        self.assertEqual(ipfs_cid_v0(b''), 'QmbFMke1KXqnYyBBWxB74N4c5SBnJMVAiMNRcGu6x1AwQH')
+
+        self.assertEqual(decode_input_parameters(b'{"prompt": "caf\xc3\xa9", "seed": 7}'), {'prompt': 'café', 'seed': 7})
+        self.assertIsNone(decode_input_parameters(b'["not", "an", "object"]'))
+        self.assertIsNone(decode_input_parameters(b'{"prompt": '))
+        self.assertIsNone(decode_input_parameters(b'\xff\xfe'))
+
+
+class StandInGateway:
+    """
+    Local IPFS gateway on a background http.server.
+
+    Answers HEAD /ipfs/<path> with 200 for CIDs in `serves` (every CID
+    by default) and 404 otherwise, after `delay` seconds. Records the
+    CID of every request.
+    """
+
+    def __init__(self, serves=None, delay=0.0):
+        self.serves = serves
+        self.delay = delay
+        self.requests = []
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                cid = self.path.split('/ipfs/', 1)[1].split('/')[0]
+                gateway.requests.append(cid)
+                time.sleep(gateway.delay)
+                self.send_response(200 if gateway.serves is None or cid in gateway.serves else 404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/ipfs/'
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(IPFS_RECHECK_SUCCESS_SECONDS=86400, IPFS_RECHECK_BASE_SECONDS=600, IPFS_RECHECK_MAX_SECONDS=2400)
+class IPFSCheckerTests(TestCase):
+    """Accessibility checks fail over between local stand-in gateways, fastest first"""
+
+    def gateway(self, **kwargs):
+        gateway = StandInGateway(**kwargs)
+        self.addCleanup(gateway.close)
+        return gateway
+
+    def make_image(self, i):
+        return ArbiusImage.objects.create(
+            transaction_hash=f"0x{i:064x}", task_id=f"0x{i + 1000:064x}", block_number=3000 + i, timestamp=timezone.now(),
+            cid=f"QmGateway{i}", ipfs_url=f"https://ipfs.io/ipfs/QmGateway{i}",
+            image_url=f"https://ipfs.io/ipfs/QmGateway{i}/out-1.png", model_id=MAIN_MODEL_ID,
+        )
+
+    def test_failover_records_the_serving_gateway(self):
+        partial = self.gateway(serves={'QmGateway1'})
+        full = self.gateway()
+        images = [self.make_image(i) for i in range(2)]
+        checker = IPFSChecker(gateways=[partial.url, full.url], max_workers=1, timeout=2)
+
+        # The first image is missing from the first gateway and found on the second,
+        # which has the lower latency from then on and serves the other image too
+        self.assertEqual(checker.check_images(images), 2)
+        self.assertEqual(partial.requests, ['QmGateway0'])
+        self.assertEqual(full.requests, ['QmGateway0', 'QmGateway1'])
+        self.assertEqual(
+            list(ArbiusImage.objects.order_by('pk').values_list('is_accessible', 'ipfs_gateway', 'check_failures')),
+            [(True, full.url, 0), (True, full.url, 0)],
+        )
+        self.assertEqual((checker.gateways[0].successes, checker.gateways[0].failures), (0, 1))
+        self.assertEqual((checker.gateways[1].successes, checker.gateways[1].failures), (2, 0))
+
+    def test_fastest_gateway_is_tried_first(self):
+        slow = self.gateway(delay=0.2)
+        fast = self.gateway()
+        checker = IPFSChecker(gateways=[slow.url, fast.url], max_workers=1, timeout=2)
+
+        # Untried gateways go first in configured order, then by running latency
+        for i in range(4):
+            checker.check_images([self.make_image(i)])
+        self.assertEqual(len(slow.requests), 1)
+        self.assertEqual(len(fast.requests), 3)
+        self.assertEqual([gateway.url for gateway in checker.ranked_gateways()], [fast.url, slow.url])
+
+    def test_unreachable_images_back_off(self):
+        missing = self.gateway(serves=set())
+        # Nothing listens here, so the connection is refused
+        down = StandInGateway()
+        down.close()
+        image = self.make_image(0)
+        checker = IPFSChecker(gateways=[down.url, missing.url], max_workers=1, timeout=2)
+
+        delays = []
+        for _ in range(4):
+            started = timezone.now()
+            self.assertEqual(checker.check_images([image]), 0)
+            image.refresh_from_db()
+            delays.append(round((image.next_check_at - started).total_seconds() / 60))
+        self.assertFalse(image.is_accessible)
+        self.assertEqual(image.check_failures, 4)
+        self.assertEqual(delays, [10, 20, 40, 40])
+        # A refused connection counts as a full timeout
+        self.assertEqual(checker.gateways[0].latency, 2)
+
+        missing.serves = None
+        self.assertEqual(checker.check_images([image]), 1)
+        image.refresh_from_db()
+        self.assertEqual((image.is_accessible, image.check_failures, image.ipfs_gateway), (True, 0, missing.url))
+
+    def test_command_reports_the_limited_count(self):
+        gateway = self.gateway()
+        for i in range(3):
+            self.make_image(i)
+        out = io.StringIO()
+        call_command('check_ipfs_accessibility', gateways=[gateway.url], limit=2, stdout=out)
+        self.assertIn('Checking 2 due images', out.getvalue())
+        self.assertIn('2 of 2 images accessible', out.getvalue())
+
+
+@override_settings(IPFS_RECHECK_SUCCESS_SECONDS=7 * 86400, IPFS_RECHECK_BASE_SECONDS=600, IPFS_RECHECK_MAX_SECONDS=3 * 3600)
+class RecheckScheduleTests(TestCase):
+    """Failed checks back off exponentially up to a cap, and a success resets the schedule"""
+
+    def test_backoff_cap_and_reset_with_a_frozen_clock(self):
+        start = timezone.now().replace(microsecond=0)
+        image = ArbiusImage.objects.create(
+            transaction_hash=f"0x{1:064x}", task_id=f"0x{2:064x}", block_number=1, timestamp=start, cid='QmBackoff',
+            ipfs_url='https://ipfs.io/ipfs/QmBackoff', image_url='https://ipfs.io/ipfs/QmBackoff/out-1.png',
+            model_id=MAIN_MODEL_ID, next_check_at=start,
+        )
+        checker = IPFSChecker(gateways=['https://gateway.test/ipfs/'])
+        gateway = None
+        checker.check = lambda path: gateway
+
+        def check_when_due():
+            # Jump the clock to the image's next check, and only then is it due
+            now = ArbiusImage.objects.get(pk=image.pk).next_check_at
+            with mock.patch('playground.ipfs.timezone.now', return_value=now - timedelta(seconds=1)):
+                self.assertFalse(due_images().exists())
+            with mock.patch('playground.ipfs.timezone.now', return_value=now):
+                checker.check_images(due_images())
+            checked = ArbiusImage.objects.get(pk=image.pk)
+            return checked.check_failures, checked.next_check_at - now
+
+        waits = [check_when_due() for _ in range(6)]
+        self.assertEqual(waits, [
+            (1, timedelta(minutes=10)),
+            (2, timedelta(minutes=20)),
+            (3, timedelta(minutes=40)),
+            (4, timedelta(minutes=80)),
+            (5, timedelta(minutes=160)),
+            (6, timedelta(hours=3)),
+        ])
+        self.assertFalse(ArbiusImage.objects.get(pk=image.pk).is_accessible)
+
+        gateway = 'https://gateway.test/ipfs/'
+        self.assertEqual(check_when_due(), (0, timedelta(days=7)))
+        gateway = None
+        self.assertEqual(check_when_due(), (1, timedelta(minutes=10)))
+
+
+class CheckpointedScanTests(TestCase):
+    """Checkpointed scans resume after the last committed chunk and stop when their lease is taken over"""
+
+    def setUp(self):
+        self.scanner = ArbitrumScanner(rpc_url='http://127.0.0.1:1')
+        self.scanned = []
+        self.fail_at = None
+
+        def iter_chunks(start_block, end_block, topics, strict=False):
+            for chunk_start in range(start_block, end_block + 1, 10):
+                if chunk_start == self.fail_at:
+                    raise RPCError(f'block {chunk_start} unavailable')
+                chunk_end = min(chunk_start + 9, end_block)
+                self.scanned.append((chunk_start, chunk_end))
+                yield chunk_start, chunk_end, list(range(chunk_start, chunk_end + 1))
+
+        self.scanner._iter_chunks = iter_chunks
+
+    def store(self, blocks):
+        # One miner row per chunk, so a rolled back chunk leaves no row behind
+        MinerAddress.objects.create(wallet_address=f"0x{blocks[0]:040x}")
+        return [blocks[0]]
+
+    def scan(self, decode=None):
+        return self.scanner._scan_checkpointed('test', 100, 149, decode or (lambda blocks: blocks), self.store)
+
+    def test_resumes_from_the_checkpoint(self):
+        self.fail_at = 120
+        self.assertEqual(self.scan(), [100, 110])
+        self.assertEqual(ScanStatus.objects.get(name='test').last_scanned_block, 119)
+
+        self.fail_at = None
+        self.scanned = []
+        self.assertEqual(self.scan(), [120, 130, 140])
+        self.assertEqual(self.scanned, [(120, 129), (130, 139), (140, 149)])
+        self.assertEqual(MinerAddress.objects.count(), 5)
+        self.assertFalse(ScanStatus.objects.get(name='test').scan_in_progress)
+
+        # Up to date, nothing is fetched
+        self.scanned = []
+        self.assertEqual(self.scan(), [])
+        self.assertEqual(self.scanned, [])
+
+    def test_stops_when_a_second_runner_takes_the_lease(self):
+        def decode(blocks):
+            if blocks[0] == 120:
+                # The lease lapsed while this run stalled and another run took it over
+                ScanStatus.objects.filter(name='test').update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+                self.assertIsNotNone(ScanStatus.acquire('test'))
+            return blocks
+
+        self.assertEqual(self.scan(decode), [100, 110])
+        status = ScanStatus.objects.get(name='test')
+        self.assertEqual(status.last_scanned_block, 119)
+        self.assertEqual(MinerAddress.objects.count(), 2)
+        # The second runner keeps its lease, so a third one is turned away
+        self.assertTrue(status.scan_in_progress)
+        self.assertEqual(self.scan(), [])
+
+
+class ImageStoreTests(TestCase):
+    """Storing a scanned chunk is idempotent, so overlapping and repeated scans add nothing"""
+
+    ENGINE = '0x5FbDB2315678afecb367f032d93F642f64180aa3'
+
+    def blocks(self):
+        # A task and its solution in one block, the solution to a second task in the next
+        task_id = '0x' + '11' * 32
+        solver = Web3.to_checksum_address(f"0x{7:040x}")
+        task = AttributeDict({
+            'hash': f"0x{1:064x}", 'from': StandInNode.SENDER, 'to': self.ENGINE, 'input': DecoderTests.SUBMIT_TASK,
+            'logs': [{'transactionHash': f"0x{1:064x}", 'topics': [TASK_SUBMITTED_TOPIC, task_id]}],
+        })
+        solution = AttributeDict({'hash': f"0x{2:064x}", 'from': solver, 'to': self.ENGINE, 'input': DecoderTests.SUBMIT_SOLUTION})
+        late = AttributeDict({
+            'hash': f"0x{3:064x}", 'from': solver, 'to': self.ENGINE,
+            'input': DecoderTests.SUBMIT_SOLUTION.replace('11' * 32, '44' * 32),
+        })
+        return [
+            AttributeDict({'number': 500, 'timestamp': 1700000000, 'transactions': [task, solution]}),
+            AttributeDict({'number': 501, 'timestamp': 1700000004, 'transactions': [late]}),
+        ]
+
+    def store(self, scanner=None):
+        scanner = scanner or ArbitrumScanner(rpc_url='http://127.0.0.1:1')
+        return scanner._store_images(scanner._decode_image_blocks(self.blocks()))
+
+    def state(self):
+        return (
+            list(ArbiusImage.objects.order_by('transaction_hash').values_list('transaction_hash', 'prompt', 'task_submitter')),
+            TaskRecord.objects.count(),
+            list(MinerAddress.objects.values_list('wallet_address', 'total_solutions')),
+            dict(PromptKeyword.objects.values_list('keyword', 'image_count')),
+            list(DailyImageStats.objects.values_list('day', 'image_count')),
+        )
+
+    def test_rerun_over_the_same_blocks_adds_nothing(self):
+        scanner = ArbitrumScanner(rpc_url='http://127.0.0.1:1')
+        self.assertEqual(len(self.store(scanner)), 2)
+        first = self.state()
+        self.assertEqual(first[0], [
+            (f"0x{2:064x}", 'a dragon', '0x5E33e2CeAd338b1224DDd34636DaC7563f97C300'),
+            (f"0x{3:064x}", None, None),
+        ])
+        self.assertEqual(first[1:3], (1, [(Web3.to_checksum_address(f"0x{7:040x}"), 2)]))
+
+        # The same scanner again, then a fresh one resolving the task from TaskRecord instead of its cache
+        self.assertEqual(self.store(scanner), [])
+        self.assertEqual(self.store(), [])
+        self.assertEqual(self.state(), first)
+
+
+class MinerActivityTests(TestCase):
+    """MinerActivity.apply() upserts a chunk's tallies with one insert and one CASE update"""
+
+    def test_known_miners_gain_counts_and_new_ones_are_flagged(self):
+        now = timezone.now()
+        behind = MinerAddress.objects.create(
+            wallet_address=f"0x{1:040x}", last_seen=now - timedelta(days=1), total_solutions=5, total_commitments=1, is_active=False,
+        )
+        ahead = MinerAddress.objects.create(wallet_address=f"0x{2:040x}", last_seen=now, total_solutions=3)
+        # Not in the chunk, so left alone
+        idle = MinerAddress.objects.create(wallet_address=f"0x{3:040x}", last_seen=now - timedelta(days=2), total_solutions=9, is_active=False)
+        newcomer = f"0x{4:040x}"
+        image = ArbiusImage.objects.create(
+            transaction_hash=f"0x{4:064x}", task_id=f"0x{5:064x}", block_number=10, timestamp=now, cid='QmMiner',
+            ipfs_url='https://ipfs.io/ipfs/QmMiner', image_url='https://ipfs.io/ipfs/QmMiner/out-1.png',
+            model_id=MAIN_MODEL_ID, task_submitter=newcomer,
+        )
+        self.assertFalse(image.is_automine)
+
+        activity = MinerActivity()
+        activity.record(behind.wallet_address, now - timedelta(hours=2))
+        activity.record(behind.wallet_address, now - timedelta(hours=1))
+        activity.record(behind.wallet_address, now - timedelta(hours=3), 'commitment')
+        # Seen earlier than its stored last_seen, which is kept
+        activity.record(ahead.wallet_address, now - timedelta(hours=5), 'commitment')
+        activity.record(newcomer, now - timedelta(minutes=1))
+        activity.record(newcomer, now - timedelta(minutes=2), 'commitment')
+        with self.assertRaises(ValueError):
+            activity.record(newcomer, now, 'vote')
+
+        # One lookup, one insert, one update, plus flagging the newcomer's images
+        with CaptureQueriesContext(connection) as queries:
+            activity.apply()
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE "playground_mineraddress"')]
+        self.assertEqual(len(updates), 1)
+
+        miners = {
+            miner.wallet_address: (miner.total_solutions, miner.total_commitments, miner.last_seen, miner.is_active)
+            for miner in MinerAddress.objects.all()
+        }
+        self.assertEqual(miners[behind.wallet_address], (7, 2, now - timedelta(hours=1), True))
+        self.assertEqual(miners[ahead.wallet_address], (3, 1, now, True))
+        self.assertEqual(miners[idle.wallet_address], (9, 0, now - timedelta(days=2), False))
+        self.assertEqual(miners[newcomer], (1, 1, now - timedelta(minutes=1), True))
+
+        image.refresh_from_db()
+        self.assertTrue(image.is_automine)
+
+
+class TaskIndexTests(TestCase):
+    """Solutions resolve their task from a bounded LRU, falling back to TaskRecord"""
+
+    def task(self, i):
+        return {
+            'task_id': f"0x{i:064x}", 'transaction_hash': f"0x{i + 100:064x}", 'block_number': 700 + i,
+            'timestamp': timezone.now(), 'submitter': f"0x{i:040x}", 'model_id': MAIN_MODEL_ID,
+            'input_cid': f"QmTask{i}", 'input_parameters': {'prompt': f"task {i}"}, 'prompt': f"task {i}",
+        }
+
+    def test_least_recently_used_tasks_are_evicted(self):
+        first, second, third = (self.task(i)['task_id'] for i in (1, 2, 3))
+        index = TaskIndex(max_size=2)
+        index.add([self.task(1), self.task(2)])
+        # Resolving the first task makes the second the least recently used
+        with self.assertNumQueries(0):
+            self.assertEqual(index.resolve([first])[first]['prompt'], 'task 1')
+        index.add([self.task(3)])
+        self.assertEqual(len(index), 2)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(set(index.resolve([first, third])), {first, third})
+        # The evicted task comes back from TaskRecord with one query, and evicts the next one
+        with self.assertNumQueries(1):
+            resolved = index.resolve([second])
+        self.assertEqual(resolved[second], {
+            'model_id': MAIN_MODEL_ID, 'prompt': 'task 2', 'input_parameters': {'prompt': 'task 2'}, 'task_submitter': f"0x{2:040x}",
+        })
+        self.assertEqual(len(index), 2)
+
+    def test_solutions_resolve_tasks_seen_in_an_earlier_run(self):
+        first, second = (self.task(i)['task_id'] for i in (1, 2))
+        unknown = f"0x{99:064x}"
+        TaskIndex().add([self.task(1), self.task(2)])
+
+        # A new run starts with an empty cache and looks every task up in one query
+        index = TaskIndex()
+        with self.assertNumQueries(1):
+            resolved = index.resolve([first, second, first, unknown])
+        self.assertEqual({task_id: task['prompt'] for task_id, task in resolved.items()}, {first: 'task 1', second: 'task 2'})
+        # Found tasks are cached; unknown ones are looked up again next time
+        with self.assertNumQueries(1):
+            self.assertEqual(set(index.resolve([first, unknown])), {first})
+
+        # Tasks seen again by an overlapping scan are not stored twice
+        index.add([self.task(1)])
+        self.assertEqual(TaskRecord.objects.count(), 2)
+
+
+class DelayedFetchPipeline(ScanPipeline):
+    """ScanPipeline whose fetchers return block numbers after a random delay instead of calling a node"""
+
+    def __init__(self, *args, fail_at=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.random = random.Random(7)
+        self.fail_at = fail_at
+        self.fetching = 0
+        self.most_fetching = 0
+        self.started_chunks = 0
+        # Most chunks fetched but not yet written, across every stage
+        self.most_outstanding = 0
+        # Appended to by the writer, which runs in another thread
+        self.written = []
+
+    async def _fetch_chunk(self, client, chunk_start, chunk_end):
+        self.fetching += 1
+        self.started_chunks += 1
+        self.most_fetching = max(self.most_fetching, self.fetching)
+        self.most_outstanding = max(self.most_outstanding, self.started_chunks - len(self.written))
+        try:
+            await asyncio.sleep(self.random.uniform(0, 0.02))
+            if chunk_start == self.fail_at:
+                raise RPCError(f'block {chunk_start} unavailable')
+            return list(range(chunk_start, chunk_end + 1))
+        finally:
+            self.fetching -= 1
+
+
+class ScanPipelineTests(TestCase):
+    """The concurrent scan pipeline writes chunks in block order, bounds its backlog and surfaces failures"""
+
+    def setUp(self):
+        self.scanner = ArbitrumScanner(rpc_url='http://127.0.0.1:1', window=5, concurrency=4)
+
+    def run_pipeline(self, decode=lambda blocks: blocks, write_delay=0.0, **kwargs):
+        def write(chunk_end, records):
+            time.sleep(write_delay)
+            self.written.append((records[0], chunk_end))
+            return [chunk_end]
+
+        pipeline = DelayedFetchPipeline(self.scanner, decode, write, topics=IMAGE_TOPICS, **kwargs)
+        self.written = pipeline.written
+        return pipeline, asyncio.run(pipeline.run(100, 199))
+
+    def test_chunks_are_written_in_block_order(self):
+        pipeline, results = self.run_pipeline()
+        self.assertEqual(self.written, [(start, start + 4) for start in range(100, 200, 5)])
+        self.assertEqual(results, list(range(104, 200, 5)))
+        self.assertEqual(self.scanner.blocks_scanned, 100)
+        self.assertGreater(pipeline.most_fetching, 1)
+
+    def test_slow_writer_holds_the_fetchers_back(self):
+        pipeline, _ = self.run_pipeline(write_delay=0.01)
+        self.assertEqual(len(self.written), 20)
+        # Never more than two chunks per fetcher between fetch and commit
+        self.assertLessEqual(pipeline.most_outstanding, 2 * self.scanner.concurrency)
+
+    def test_stage_failures_propagate(self):
+        with self.assertRaisesMessage(RPCError, 'block 150 unavailable'):
+            self.run_pipeline(fail_at=150)
+        # Only whole chunks before the failure were written, in order
+        self.assertEqual(self.written, [(start, start + 4) for start in range(100, 100 + 5 * len(self.written), 5)])
+        self.assertLess(len(self.written), 10)
+
+        def decode(blocks):
+            if blocks[0] == 120:
+                raise ValueError('undecodable block 120')
+            return blocks
+
+        with self.assertRaisesMessage(ValueError, 'undecodable block 120'):
+            self.run_pipeline(decode=decode)
+        self.assertLess(len(self.written), 4)
@@ -7,7 +7,8 @@ from django.contrib.auth import login, logout
 from django.core.cache import cache
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Count, Q, Avg, Min, Max, Case, When, IntegerField, Exists, OuterRef
+from django.db import transaction
+from django.db.models import Count, Q, Avg, Min, Max, Case, When, IntegerField, Exists, OuterRef, F
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
 from django.utils import timezone
 from django.urls import reverse
@@ -19,7 +20,12 @@ import re
 import time
 from eth_account.messages import encode_defunct
 from web3 import Web3
-from .models import Wallet, ArbiusImage, UserProfile, ImageUpvote, ImageComment, MinerAddress, ImageReaction
+from .models import GALLERY_MODEL_IDS, Wallet, ArbiusImage, DailyImageStats, RateLimitCounter, UserProfile, ImageUpvote, ImageComment, ImageReaction
+from .daily_stats import distinct_addresses, images_since
+from .keywords import top_keywords
+from .gallery_cache import bump_gallery_generation_on_commit, cached_gallery_page
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, gallery_ordering, keyset_filter, order_by_fields, resolve_gallery_sort
+from .search import search_images
 from django.core import serializers
 
 # Set up logging
@@ -27,10 +33,17 @@ logger = logging.getLogger(__name__)
 
 # Security constants
 MAX_SIGNATURE_ATTEMPTS = 5  # Max attempts per IP per hour
+RATE_LIMIT_WINDOW_SECONDS = 3600
 SIGNATURE_TIMEOUT = 300  # 5 minutes for signature validity
 MIN_MESSAGE_LENGTH = 10
 MAX_MESSAGE_LENGTH = 1000
 
+# Gallery totals are estimates; recount at most this often per filter combination
+GALLERY_COUNT_CACHE_SECONDS = 300
+
+# The keyword index only changes when the scanner runs
+POPULAR_KEYWORDS_CACHE_SECONDS = 300
+
 def is_valid_ethereum_address(address):
     """Validate Ethereum address format"""
     if not address or not isinstance(address, str):
@@ -52,12 +65,11 @@ def check_rate_limit(request, action):
     client_ip = request.META.get('HTTP_X_FORWARDED_FOR', request.META.get('REMOTE_ADDR'))
     cache_key = f"rate_limit:{action}:{client_ip}"
     
-    attempts = cache.get(cache_key, 0)
-    if attempts >= MAX_SIGNATURE_ATTEMPTS:
-        return False
-    
-    cache.set(cache_key, attempts + 1, 3600)  # 1 hour expiry
-    return True
+    # Counted in the database rather than the cache: the file and db cache
+    # backends implement incr() as get() then set(), which loses concurrent
+    # increments and resets the key's timeout
+    attempts = RateLimitCounter.hit(cache_key, RATE_LIMIT_WINDOW_SECONDS)
+    return attempts <= MAX_SIGNATURE_ATTEMPTS
 
 def validate_message_content(message):
     """Validate message content for security"""
@@ -96,57 +108,81 @@ def get_base_queryset(exclude_automine=False):
     """Get the base queryset for images with optimizations and filtering"""
     
     # Only allow the main image model - be very restrictive
-    ALLOWED_MODELS = [
-        '0xa473c70e9d7c872ac948d20546bc79db55fa64ca325a4b229aaffddb7f86aae0',  # Main image model only
-    ]
+    ALLOWED_MODELS = GALLERY_MODEL_IDS
     
-    queryset = ArbiusImage.objects.select_related().prefetch_related('upvotes', 'comments').filter(
+    queryset = ArbiusImage.objects.filter(
         is_accessible=True,  # Only show accessible images
         model_id__in=ALLOWED_MODELS  # Only allow whitelisted models
     )
     
-    # Filter out automine images if requested
+    # Filter out automine images if requested (flag maintained by the scanners, see playground.miners)
     if exclude_automine:
-        # Get ALL identified miner addresses (both active and inactive)
-        # Once a wallet is identified as a miner, it should always be filtered
-        miner_wallets = list(MinerAddress.objects.all().values_list('wallet_address', flat=True))
-        
-        # Fallback to hardcoded list if no miners found in database yet
-        if not miner_wallets:
-            miner_wallets = [
-                '0x5e33e2cead338b1224ddd34636dac7563f97c300',
-                '0xdc790a53e50207861591622d349e989fef6f84bc',
-                '0x4d826895b255a4f38d7ba87688604c358f4132b6',
-                '0xd04c1b09576aa4310e4768d8e9cd12fac3216f95',
-            ]
-        
-        queryset = queryset.exclude(task_submitter__in=miner_wallets)
+        queryset = queryset.filter(is_automine=False)
     
     return queryset
 
-def annotate_upvote_status(queryset, wallet_address):
-    """Annotate queryset with upvote status for the given wallet address"""
-    if not wallet_address:
-        # If no wallet address, just add a False annotation
-        return queryset.annotate(user_has_upvoted=Case(When(id__isnull=True, then=False), default=False, output_field=IntegerField()))
-    
-    # Annotate with whether the current user has upvoted each image
-    return queryset.annotate(
-        user_has_upvoted=Exists(
-            ImageUpvote.objects.filter(
-                image=OuterRef('pk'),
-                wallet_address__iexact=wallet_address
-            )
-        )
+def filter_gallery_images(search_query='', task_submitter='', model_id='', exclude_automine=False):
+    """Gallery images matching the search box and filter dropdowns, unsorted (annotated with search_rank when searching)"""
+    images = get_base_queryset(exclude_automine=exclude_automine)
+    
+    if search_query:
+        # Indexed lookup for hashes and CIDs, ranked full-text search for prompts
+        images = search_images(images, search_query)
+    
+    if task_submitter:
+        images = images.filter(task_submitter__iexact=task_submitter)
+    
+    if model_id:
+        images = images.filter(model_id=model_id)
+    
+    return images
+
+def cached_gallery_count(filters, timeout=GALLERY_COUNT_CACHE_SECONDS):
+    """Number of images matching the filter tuple, cached so scrolling doesn't recount the gallery"""
+    cache_key = 'gallery_count:' + hashlib.md5(repr(filters).encode()).hexdigest()
+    return cache.get_or_set(cache_key, lambda: filter_gallery_images(*filters).count(), timeout)
+
+def serialize_gallery_image(image, is_upvoted=False):
+    """JSON representation of a gallery image for the infinite-scroll API"""
+    return {
+        'id': image.id,
+        'transaction_hash': image.transaction_hash,
+        'task_id': image.task_id,
+        'cid': image.cid,
+        'ipfs_url': image.ipfs_url,
+        'image_url': image.image_url,
+        'is_accessible': image.is_accessible,
+        'prompt': image.prompt,
+        'model_id': image.model_id,
+        'task_submitter': image.task_submitter,
+        'solution_provider': image.solution_provider,
+        'timestamp': image.timestamp.isoformat(),
+        'upvote_count': image.upvote_count,
+        'comment_count': image.comment_count,
+        'is_upvoted': is_upvoted,
+        'reactions': image.reaction_counts,
+    }
+
+def upvoted_image_ids(wallet_address, image_ids):
+    """The ids among image_ids that the given wallet address has upvoted, in one query"""
+    if not wallet_address or not image_ids:
+        return set()
+    return set(
+        ImageUpvote.objects.filter(image_id__in=image_ids, wallet_address__iexact=wallet_address).values_list('image_id', flat=True)
     )
 
+def gallery_page_number(value):
+    """Normalize a page query parameter for cache keys; invalid pages mean the first page"""
+    try:
+        return max(int(value), 1)
+    except (TypeError, ValueError):
+        return 1
+
 def get_available_models_with_categories():
     """Get available models organized by categories with restrictive filtering"""
     
     # Only allow the main image model
-    ALLOWED_MODELS = [
-        '0xa473c70e9d7c872ac948d20546bc79db55fa64ca325a4b229aaffddb7f86aae0',  # Main image model only
-    ]
+    ALLOWED_MODELS = GALLERY_MODEL_IDS
     
     # Get model stats only for allowed models
     all_models = ArbiusImage.objects.values('model_id').annotate(
@@ -171,71 +207,13 @@ def get_available_models_with_categories():
     
     return filtered_models, categorized
 
-def get_popular_keywords(exclude_automine=True, limit=20):
-    """Get the most popular keywords from image prompts, excluding miner images"""
-    from collections import Counter
-    import re
-    
-    # Get base queryset
-    queryset = get_base_queryset(exclude_automine=exclude_automine)
-    
-    # Get all prompts
-    prompts = queryset.exclude(prompt__isnull=True).exclude(prompt='').values_list('prompt', flat=True)
-    
-    # Extract meaningful keywords (focus on nouns, proper nouns, and specific terms)
-    keywords = []
-    for prompt in prompts:
-        # Clean the prompt
-        clean_prompt = prompt.lower()
-        
-        # Remove the "Additional instruction" text that gets appended
-        if "additional instruction:" in clean_prompt:
-            clean_prompt = re.sub(r'additional instruction:.*?(?=\s|$)', '', clean_prompt, flags=re.IGNORECASE)
-        
-        # Extract words that are likely to be meaningful keywords
-        # Look for capitalized words (proper nouns), words with underscores (tags), and specific patterns
-        meaningful_words = []
-        
-        # Extract capitalized words (proper nouns like "Pikachu", "Dragon", etc.)
-        capitalized_words = re.findall(r'\b[A-Z][a-z]+\b', prompt)
-        meaningful_words.extend(capitalized_words)
-        
-        # Extract words with underscores (common in AI art prompts like "blue_hair", "dragon_scale")
-        underscore_words = re.findall(r'\b[a-z]+_[a-z]+\b', clean_prompt)
-        meaningful_words.extend(underscore_words)
-        
-        # Extract specific character names and objects (look for patterns)
-        # Common anime/game character patterns
-        character_patterns = [
-            r'\b(pikachu|charizard|bulbasaur|squirtle|misty|ash|goku|naruto|sasuke|link|zelda|mario|luigi|peach|bowser)\b',
-            r'\b(dragon|phoenix|unicorn|griffin|dragon|wizard|witch|knight|princess|prince|queen|king)\b',
-            r'\b(robot|cyborg|android|mecha|gundam|evangelion|transformers)\b',
-            r'\b(cat|dog|wolf|fox|bear|tiger|lion|elephant|giraffe|penguin|owl|eagle)\b',
-            r'\b(castle|tower|bridge|forest|mountain|ocean|desert|jungle|space|planet|star|moon|sun)\b',
-            r'\b(sword|shield|bow|arrow|gun|laser|lightsaber|magic|spell|fire|ice|lightning|thunder)\b',
-            r'\b(car|bike|plane|ship|spaceship|rocket|train|bus|helicopter)\b',
-            r'\b(flower|tree|grass|leaf|rose|tulip|sunflower|cherry|apple|orange|banana)\b',
-        ]
-        
-        for pattern in character_patterns:
-            matches = re.findall(pattern, clean_prompt, re.IGNORECASE)
-            meaningful_words.extend(matches)
-        
-        # Extract words that are 4+ characters and not common stop words
-        # This catches other meaningful terms
-        longer_words = re.findall(r'\b[a-z]{4,}\b', clean_prompt)
-        stop_words = {'this', 'that', 'with', 'have', 'will', 'from', 'they', 'know', 'want', 'been', 'good', 'much', 'some', 'time', 'very', 'when', 'come', 'just', 'into', 'than', 'more', 'other', 'about', 'many', 'then', 'them', 'these', 'people', 'only', 'well', 'even', 'back', 'after', 'use', 'two', 'how', 'our', 'work', 'first', 'over', 'think', 'also', 'your', 'could', 'would', 'there', 'their', 'what', 'said', 'each', 'which', 'she', 'do', 'how', 'if', 'will', 'up', 'out', 'many', 'then', 'them', 'these', 'so', 'some', 'her', 'would', 'make', 'like', 'into', 'him', 'time', 'has', 'two', 'more', 'go', 'no', 'way', 'could', 'my', 'than', 'first', 'been', 'call', 'who', 'its', 'now', 'find', 'long', 'down', 'day', 'did', 'get', 'come', 'made', 'may', 'part', 'over', 'new', 'sound', 'take', 'only', 'little', 'work', 'know', 'place', 'year', 'live', 'me', 'back', 'give', 'most', 'very', 'after', 'thing', 'our', 'just', 'name', 'good', 'sentence', 'man', 'think', 'say', 'great', 'where', 'help', 'through', 'much', 'before', 'line', 'right', 'too', 'mean', 'old', 'any', 'same', 'tell', 'boy', 'follow', 'came', 'want', 'show', 'also', 'around', 'form', 'three', 'small', 'set', 'put', 'end', 'does', 'another', 'well', 'large', 'must', 'big', 'even', 'such', 'because', 'turn', 'here', 'why', 'ask', 'went', 'men', 'read', 'need', 'land', 'different', 'home', 'us', 'move', 'try', 'kind', 'hand', 'picture', 'again', 'change', 'off', 'play', 'spell', 'air', 'away', 'animal', 'house', 'point', 'page', 'letter', 'mother', 'answer', 'found', 'study', 'still', 'learn', 'should', 'America', 'world', 'high', 'every', 'near', 'add', 'food', 'between', 'own', 'below', 'country', 'plant', 'last', 'school', 'father', 'keep', 'tree', 'never', 'start', 'city', 'earth', 'eye', 'light', 'thought', 'head', 'under', 'story', 'saw', 'left', 'don', 'few', 'while', 'along', 'might', 'close', 'something', 'seem', 'next', 'hard', 'open', 'example', 'begin', 'life', 'always', 'those', 'both', 'paper', 'together', 'got', 'group', 'often', 'run', 'important', 'until', 'children', 'side', 'feet', 'car', 'mile', 'night', 'walk', 'white', 'sea', 'began', 'grow', 'took', 'river', 'four', 'carry', 'state', 'once', 'book', 'hear', 'stop', 'without', 'second', 'late', 'miss', 'idea', 'enough', 'eat', 'face', 'watch', 'far', 'Indian', 'real', 'almost', 'let', 'above', 'girl', 'sometimes', 'mountain', 'cut', 'young', 'talk', 'soon', 'list', 'song', 'being', 'leave', 'family', 'it', 'body', 'music', 'color', 'stand', 'sun', 'questions', 'fish', 'area', 'mark', 'dog', 'horse', 'birds', 'problem', 'complete', 'room', 'knew', 'since', 'ever', 'piece', 'told', 'usually', 'didn', 'friends', 'easy', 'heard', 'order', 'red', 'door', 'sure', 'become', 'top', 'ship', 'across', 'today', 'during', 'short', 'better', 'best', 'however', 'low', 'hours', 'black', 'products', 'happened', 'whole', 'measure', 'remember', 'early', 'waves', 'reached', 'listen', 'wind', 'rock', 'space', 'covered', 'fast', 'several', 'hold', 'himself', 'toward', 'five', 'step', 'morning', 'passed', 'vowel', 'true', 'hundred', 'against', 'pattern', 'numeral', 'table', 'north', 'slowly', 'money', 'map', 'farm', 'pulled', 'draw', 'voice', 'seen', 'cold', 'cried', 'plan', 'notice', 'south', 'sing', 'war', 'ground', 'fall', 'king', 'town', 'I', 'unit', 'figure', 'certain', 'field', 'travel', 'wood', 'fire', 'upon'}
-        meaningful_words.extend([word for word in longer_words if word not in stop_words])
-        
-        # Add to keywords list
-        keywords.extend(meaningful_words)
-    
-    # Count and return most common
-    keyword_counts = Counter(keywords)
-    # Filter out very short keywords and return the most common ones
-    meaningful_keywords = [(keyword, count) for keyword, count in keyword_counts.most_common(limit*2) 
-                          if len(keyword) >= 3 and count >= 2]  # At least 3 chars and appears at least twice
-    return [keyword for keyword, count in meaningful_keywords[:limit]]
+def get_popular_keywords(limit=20, days=None):
+    """Get the most popular prompt keywords from the keyword index, excluding miner images"""
+    return cache.get_or_set(
+        f"popular_keywords:{limit}:{days or 'all'}",
+        lambda: top_keywords(limit=limit, days=days),
+        POPULAR_KEYWORDS_CACHE_SECONDS,
+    )
 
 # Create your views here.
 
@@ -252,7 +230,7 @@ def gallery_index(request):
     search_query = request.GET.get('q', '').strip()
     selected_task_submitter = request.GET.get('task_submitter', '').strip()
     selected_model = request.GET.get('model', '').strip()
-    sort_by = request.GET.get('sort', 'upvotes')  # Default to most upvoted
+    sort_by = resolve_gallery_sort(request.GET.get('sort', 'upvotes'), search_query)  # Default to most upvoted
     # Hide Automine ON by default for initial page loads
     # Check if this is a form submission (has any filter parameters) or initial load
     has_filter_params = bool(search_query or selected_task_submitter or selected_model or 
@@ -267,65 +245,61 @@ def gallery_index(request):
     
     # Get current user's wallet address
     current_wallet_address = getattr(request, 'wallet_address', None)
+    page_number = gallery_page_number(request.GET.get('page', 1))
+    
+    def build_page():
+        # Base queryset - now includes comprehensive filtering
+        images = filter_gallery_images(search_query, selected_task_submitter, selected_model, exclude_automine)
+        
+        # Apply sorting (unknown sorts fall back to most upvoted; counters are indexed with timestamp)
+        images = images.order_by(*order_by_fields(gallery_ordering(sort_by)))
+        
+        # Get available models with improved categorization
+        available_models, model_categories = get_available_models_with_categories()
+        
+        # Pagination
+        paginator = Paginator(images, 24)
+        page_obj = paginator.get_page(page_number)
+        page_images = list(page_obj)
+        
+        return {
+            'images': page_images,
+            'has_next': page_obj.has_next(),
+            # Infinite scroll continues from the last image on this page
+            'next_cursor': encode_cursor(sort_by, page_images[-1]) if page_obj.has_next() else None,
+            'available_models': available_models,
+            'model_categories': model_categories,
+            'total_images': ArbiusImage.objects.filter(is_accessible=True).count(),  # Use filtered count
+        }
     
-    # Base queryset - now includes comprehensive filtering
-    images = get_base_queryset(exclude_automine=exclude_automine)
-    
-    # Apply filters (existing logic)
-    if search_query:
-        images = images.filter(
-            Q(prompt__icontains=search_query) |
-            Q(cid__icontains=search_query) |
-            Q(transaction_hash__icontains=search_query) |
-            Q(task_id__icontains=search_query)
-        )
-    
-    if selected_task_submitter:
-        images = images.filter(task_submitter__iexact=selected_task_submitter)
-    
-    if selected_model:
-        images = images.filter(model_id=selected_model)
-    
-    # Apply sorting
-    if sort_by == 'upvotes':
-        images = images.annotate(upvote_count_db=Count('upvotes')).order_by('-upvote_count_db', '-timestamp')
-    elif sort_by == 'comments':
-        images = images.annotate(comment_count_db=Count('comments')).order_by('-comment_count_db', '-timestamp')
-    elif sort_by == 'newest':
-        images = images.order_by('-timestamp')
-    elif sort_by == 'oldest':
-        images = images.order_by('timestamp')
-    else:
-        # Default fallback to most upvoted
-        images = images.annotate(upvote_count_db=Count('upvotes')).order_by('-upvote_count_db', '-timestamp')
-    
-    # Annotate with upvote status for current user
-    images = annotate_upvote_status(images, current_wallet_address)
-    
-    # Get available models with improved categorization
-    available_models, model_categories = get_available_models_with_categories()
+    # The page is the same for every visitor, so it is cached per filter combination
+    page = cached_gallery_page('index', (
+        search_query, selected_task_submitter.lower(), selected_model, sort_by, exclude_automine, page_number,
+    ), build_page)
     
-    # Get popular keywords (excluding miner images)
-    popular_keywords = get_popular_keywords(exclude_automine=True, limit=15)
+    # Layer the current user's upvotes on top of the shared page
+    upvoted = upvoted_image_ids(current_wallet_address, [image.id for image in page['images']])
+    for image in page['images']:
+        image.user_has_upvoted = image.id in upvoted
     
-    # Pagination
-    paginator = Paginator(images, 24)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Get popular keywords (excluding miner images), trending over POPULAR_KEYWORDS_DAYS if set
+    popular_keywords = get_popular_keywords(limit=15, days=settings.POPULAR_KEYWORDS_DAYS)
     
     context = {
-        'page_obj': page_obj,
+        'images': page['images'],
+        'has_next': page['has_next'],
         'search_query': search_query,
         'selected_task_submitter': selected_task_submitter,
         'selected_model': selected_model,
         'sort_by': sort_by,
         'exclude_automine': exclude_automine,
-        'available_models': available_models,
-        'model_categories': model_categories,
-        'total_images': ArbiusImage.objects.filter(is_accessible=True).count(),  # Use filtered count
+        'available_models': page['available_models'],
+        'model_categories': page['model_categories'],
+        'total_images': page['total_images'],
         'wallet_address': current_wallet_address,
         'user_profile': getattr(request, 'user_profile', None),
         'popular_keywords': popular_keywords,
+        'next_cursor': page['next_cursor'],
     }
     return render(request, 'gallery/index.html', context)
 
@@ -423,27 +397,33 @@ def toggle_upvote(request, image_id):
         # Get the image
         image = get_object_or_404(ArbiusImage, id=image_id, is_accessible=True)
         
-        # Check if user already upvoted
-        existing_upvote = ImageUpvote.objects.filter(
-            image=image,
-            wallet_address__iexact=wallet_address
-        ).first()
-        
-        if existing_upvote:
-            # Remove upvote
-            existing_upvote.delete()
-            action = 'removed'
-        else:
-            # Add upvote
-            ImageUpvote.objects.create(
+        with transaction.atomic():
+            # Check if user already upvoted
+            existing_upvote = ImageUpvote.objects.filter(
                 image=image,
-                wallet_address=wallet_address
-            )
-            action = 'added'
+                wallet_address__iexact=wallet_address
+            ).first()
+            
+            images = ArbiusImage.objects.filter(pk=image.pk)
+            if existing_upvote:
+                # Remove upvote
+                existing_upvote.delete()
+                images.filter(upvote_count__gt=0).update(upvote_count=F('upvote_count') - 1)
+                action = 'removed'
+            else:
+                # Add upvote
+                ImageUpvote.objects.create(
+                    image=image,
+                    wallet_address=wallet_address
+                )
+                images.update(upvote_count=F('upvote_count') + 1)
+                action = 'added'
+            bump_gallery_generation_on_commit()
         
         # Get updated counts
+        image.refresh_from_db(fields=['upvote_count'])
         upvote_count = image.upvote_count
-        user_has_upvoted = image.has_upvoted(wallet_address)
+        user_has_upvoted = action == 'added'
         
         return JsonResponse({
             'success': True,
@@ -492,11 +472,14 @@ def add_comment(request, image_id):
             }, status=400)
         
         # Create comment
-        comment = ImageComment.objects.create(
-            image=image,
-            wallet_address=wallet_address,
-            content=content
-        )
+        with transaction.atomic():
+            comment = ImageComment.objects.create(
+                image=image,
+                wallet_address=wallet_address,
+                content=content
+            )
+            ArbiusImage.objects.filter(pk=image.pk).update(comment_count=F('comment_count') + 1)
+            bump_gallery_generation_on_commit()
         
         return JsonResponse({
             'success': True,
@@ -702,28 +685,37 @@ def toggle_reaction(request, image_id):
                 'error': 'Invalid emoji'
             }, status=400)
         
-        # Check if user already reacted with this emoji
-        existing_reaction = ImageReaction.objects.filter(
-            image=image,
-            wallet_address__iexact=wallet_address,
-            emoji=emoji
-        ).first()
-        
-        if existing_reaction:
-            # Remove reaction
-            existing_reaction.delete()
-            action = 'removed'
-        else:
-            # Add reaction
-            ImageReaction.objects.create(
+        with transaction.atomic():
+            # Lock the image row so concurrent reactions can't overwrite each other's counts
+            image = ArbiusImage.objects.select_for_update().only('pk', 'reaction_counts').get(pk=image.pk)
+            
+            # Check if user already reacted with this emoji
+            existing_reaction = ImageReaction.objects.filter(
                 image=image,
-                wallet_address=wallet_address,
+                wallet_address__iexact=wallet_address,
                 emoji=emoji
-            )
-            action = 'added'
-        
-        # Get updated reactions
-        reactions = image.reactions
+            ).first()
+            
+            if existing_reaction:
+                # Remove reaction
+                existing_reaction.delete()
+                action = 'removed'
+            else:
+                # Add reaction
+                ImageReaction.objects.create(
+                    image=image,
+                    wallet_address=wallet_address,
+                    emoji=emoji
+                )
+                action = 'added'
+            
+            # Recount just this emoji and store the updated per-emoji counts
+            counts = dict(image.reaction_counts)
+            counts[emoji] = ImageReaction.objects.filter(image=image, emoji=emoji).count()
+            reactions = {choice: counts[choice] for choice in valid_emojis if counts.get(choice)}
+            image.reaction_counts = reactions
+            image.save(update_fields=['reaction_counts'])
+            bump_gallery_generation_on_commit()
         
         return JsonResponse({
             'success': True,
@@ -739,154 +731,151 @@ def toggle_reaction(request, image_id):
         }, status=500)
 
 def gallery_images_api(request):
-    """API endpoint for infinite scroll: returns a page of images as JSON"""
+    """
+    API endpoint for infinite scroll: returns a page of images as JSON.
+    
+    Pass `cursor` (empty for the first page, then each response's
+    next_cursor) to page by keyset, which costs the same at any depth; add
+    include_total=1 for a cached total. Without a cursor, `page` selects a
+    numbered page as before. Responses are cached per filter combination
+    until the gallery generation changes (see playground.gallery_cache).
+    """
     search_query = request.GET.get('q', '').strip()
     selected_task_submitter = request.GET.get('task_submitter', '').strip()
     selected_model = request.GET.get('model', '').strip()
-    sort_by = request.GET.get('sort', 'upvotes')
+    sort_by = resolve_gallery_sort(request.GET.get('sort', 'upvotes'), search_query)
     exclude_automine = request.GET.get('exclude_automine', '').lower() in ['true', '1', 'on']  # Default to False
     
-    # Get base queryset with filtering
-    images = get_base_queryset(exclude_automine=exclude_automine)
+    filters = (search_query, selected_task_submitter, selected_model, exclude_automine)
+    ordering = gallery_ordering(sort_by)
     
-    # Apply filters
-    if search_query:
-        images = images.filter(
-            Q(prompt__icontains=search_query) |
-            Q(cid__icontains=search_query) |
-            Q(transaction_hash__icontains=search_query) |
-            Q(task_id__icontains=search_query)
-        )
-    
-    if selected_task_submitter:
-        images = images.filter(task_submitter__iexact=selected_task_submitter)
-    
-    if selected_model:
-        images = images.filter(model_id=selected_model)
-    
-    # Apply sorting
-    if sort_by == 'upvotes':
-        images = images.annotate(upvote_count_db=Count('upvotes')).order_by('-upvote_count_db', '-timestamp')
-    elif sort_by == 'comments':
-        images = images.annotate(comment_count_db=Count('comments')).order_by('-comment_count_db', '-timestamp')
-    elif sort_by == 'newest':
-        images = images.order_by('-timestamp')
-    elif sort_by == 'oldest':
-        images = images.order_by('timestamp')
-    else:
-        images = images.annotate(upvote_count_db=Count('upvotes')).order_by('-upvote_count_db', '-timestamp')
+    try:
+        page_size = min(max(int(request.GET.get('page_size', 20)), 1), 100)
+    except ValueError:
+        page_size = 20
+    
+    # Cursor mode: seek past the last image of the previous page instead of counting and offsetting
+    cursor_mode = 'cursor' in request.GET
+    cursor = request.GET.get('cursor', '')
+    after = None
+    if cursor_mode and cursor:
+        try:
+            after = decode_cursor(sort_by, cursor)
+        except InvalidCursor:
+            return JsonResponse({
+                'success': False,
+                'error': 'Invalid cursor'
+            }, status=400)
+    include_total = request.GET.get('include_total', '').lower() in ['true', '1']
+    page = gallery_page_number(request.GET.get('page', 1))
     
-    # Pagination
-    page = request.GET.get('page', 1)
-    paginator = Paginator(images, 20)  # 20 images per page
+    def build_response():
+        # Get base queryset with filtering
+        images = filter_gallery_images(*filters)
+        
+        # Apply sorting (unknown sorts fall back to most upvoted; counters are indexed with timestamp)
+        images = images.order_by(*order_by_fields(ordering))
+        
+        if cursor_mode:
+            if after is not None:
+                images = images.filter(keyset_filter(ordering, after))
+            
+            page_images = list(images[:page_size + 1])
+            has_next = len(page_images) > page_size
+            page_images = page_images[:page_size]
+            
+            response = {
+                'images': [serialize_gallery_image(image) for image in page_images],
+                'has_next': has_next,
+                'next_cursor': encode_cursor(sort_by, page_images[-1]) if has_next else None,
+            }
+            if include_total:
+                response['total_count'] = cached_gallery_count(filters)
+            return response
+        
+        # Pagination
+        paginator = Paginator(images, page_size)
+        
+        try:
+            page_obj = paginator.page(page)
+        except (PageNotAnInteger, EmptyPage):
+            page_obj = paginator.page(1)
+        
+        return {
+            'images': [serialize_gallery_image(image) for image in page_obj],
+            'has_next': page_obj.has_next(),
+            'next_page': page_obj.next_page_number() if page_obj.has_next() else None,
+            'total_pages': paginator.num_pages,
+            'total_count': paginator.count,
+        }
     
-    try:
-        page_obj = paginator.page(page)
-    except (PageNotAnInteger, EmptyPage):
-        page_obj = paginator.page(1)
-    
-    # Serialize images
-    images_data = []
-    for image in page_obj:
-        images_data.append({
-            'id': image.id,
-            'transaction_hash': image.transaction_hash,
-            'task_id': image.task_id,
-            'cid': image.cid,
-            'ipfs_url': image.ipfs_url,
-            'image_url': image.image_url,
-            'prompt': image.prompt,
-            'model_id': image.model_id,
-            'task_submitter': image.task_submitter,
-            'solution_provider': image.solution_provider,
-            'timestamp': image.timestamp.isoformat(),
-            'upvote_count': image.upvotes.count(),
-            'comment_count': image.comments.count(),
-            'is_upvoted': image.upvotes.filter(wallet_address=getattr(request, 'wallet_address', None)).exists(),
-            'reactions': image.reactions,
-        })
+    # The response is the same for every visitor, so it is cached per filter combination and page
+    response = cached_gallery_page('api', (
+        search_query, selected_task_submitter.lower(), selected_model, sort_by, exclude_automine, page_size,
+        ('cursor', cursor, include_total) if cursor_mode else ('page', page),
+    ), build_response)
     
-    return JsonResponse({
-        'images': images_data,
-        'has_next': page_obj.has_next(),
-        'next_page': page_obj.next_page_number() if page_obj.has_next() else None,
-        'total_pages': paginator.num_pages,
-        'total_count': paginator.count,
-    })
+    # Layer the current user's upvotes on top of the shared response
+    upvoted = upvoted_image_ids(getattr(request, 'wallet_address', None), [image['id'] for image in response['images']])
+    for image in response['images']:
+        image['is_upvoted'] = image['id'] in upvoted
+    
+    return JsonResponse(response)
 
 
-def stats_dashboard(request):
-    """Live Statistics Dashboard - shows image generation and user activity stats"""
-    from django.db.models import Count, Q
-    from django.db.models.functions import TruncDate
-    from datetime import datetime, timedelta
-    import json
-    
-    # Get current user's wallet address
-    current_wallet_address = getattr(request, 'wallet_address', None)
+def dashboard_stats():
+    """The stats dashboard's totals and chart data, computed from the daily rollup"""
+    from datetime import timedelta
     
     # Calculate time periods
     now = timezone.now()
     one_week_ago = now - timedelta(days=7)
     one_day_ago = now - timedelta(days=1)
     
-    # Get base queryset (accessible images only)
-    base_queryset = get_base_queryset(exclude_automine=False)
+    # Image totals come from the daily rollup (one row per day, see playground.daily_stats);
+    # the provider sketch and exact daily counts aren't shown here
+    rollups = {
+        rollup.day: rollup
+        for rollup in DailyImageStats.objects.only('day', 'image_count', 'model_counts', 'submitter_sketch').order_by('day')
+    }
     
     # Calculate statistics
-    total_images = base_queryset.count()
-    images_week = base_queryset.filter(timestamp__gte=one_week_ago).count()
-    images_24h = base_queryset.filter(timestamp__gte=one_day_ago).count()
+    total_images = sum(rollup.image_count for rollup in rollups.values())
+    images_week = images_since(one_week_ago, rollups)
+    images_24h = images_since(one_day_ago, rollups)
     
-    # Unique users (task submitters)
-    unique_users = base_queryset.values('task_submitter').distinct().count()
-    users_week = base_queryset.filter(timestamp__gte=one_week_ago).values('task_submitter').distinct().count()
+    # Unique users (task submitters), approximated by merging the days' HyperLogLog sketches;
+    # the week covers whole days from the day a week ago. Images without a known submitter aren't counted as a user
+    unique_users = distinct_addresses(rollups)
+    users_week = distinct_addresses(rollups, since=one_week_ago)
     
     # Unique models
-    unique_models = base_queryset.values('model_id').distinct().count()
+    unique_models = len(set().union(*(rollup.model_counts for rollup in rollups.values())))
     
     # Get cumulative images over time data (last 30 days)
-    thirty_days_ago = now - timedelta(days=30)
+    thirty_days_ago = timezone.localdate(now) - timedelta(days=30)
     cumulative_data = []
     
-    # Get daily counts for the last 30 days
-    daily_counts = base_queryset.filter(
-        timestamp__gte=thirty_days_ago
-    ).annotate(
-        date=TruncDate('timestamp')
-    ).values('date').annotate(
-        count=Count('id')
-    ).order_by('date')
-    
     # Create cumulative data
     cumulative_count = 0
-    for day_data in daily_counts:
-        cumulative_count += day_data['count']
+    for day, rollup in rollups.items():
+        if day < thirty_days_ago:
+            continue
+        cumulative_count += rollup.image_count
         cumulative_data.append({
-            'date': day_data['date'].strftime('%m/%d'),
+            'date': day.strftime('%m/%d'),
             'count': cumulative_count
         })
     
     # Get daily images for last 25 days
-    twenty_five_days_ago = now - timedelta(days=25)
-    daily_images_data = []
-    
-    daily_images = base_queryset.filter(
-        timestamp__gte=twenty_five_days_ago
-    ).annotate(
-        date=TruncDate('timestamp')
-    ).values('date').annotate(
-        count=Count('id')
-    ).order_by('date')
-    
-    # Create daily images data
-    for day_data in daily_images:
-        daily_images_data.append({
-            'date': day_data['date'].strftime('%m/%d'),
-            'count': day_data['count']
-        })
+    twenty_five_days_ago = timezone.localdate(now) - timedelta(days=25)
+    daily_images_data = [
+        {'date': day.strftime('%m/%d'), 'count': rollup.image_count}
+        for day, rollup in rollups.items()
+        if day >= twenty_five_days_ago
+    ]
     
-    context = {
+    return {
         'total_images': total_images,
         'images_week': images_week,
         'images_24h': images_24h,
@@ -895,8 +884,18 @@ def stats_dashboard(request):
         'unique_models': unique_models,
         'cumulative_data': json.dumps(cumulative_data),
         'daily_images_data': json.dumps(daily_images_data),
+    }
+
+def stats_dashboard(request):
+    """Live Statistics Dashboard - shows image generation and user activity stats"""
+    # Get current user's wallet address
+    current_wallet_address = getattr(request, 'wallet_address', None)
+    
+    # Shared by every visitor, so computed once per gallery generation (see playground.gallery_cache)
+    context = dict(cached_gallery_page('stats', (), dashboard_stats))
+    context.update({
         'wallet_address': current_wallet_address,
         'user_profile': getattr(request, 'user_profile', None),
-    }
+    })
     
     return render(request, 'playground/stats_dashboard.html', context)